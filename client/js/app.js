@@ -33,7 +33,7 @@ var state = {
   session: { id: null, active: false },
   recognition: null,
   isRecording: false,
-  ws: { socket: null, reconnectAttempts: 0, connected: false, heartbeatTimer: null },
+  ws: { socket: null, reconnectAttempts: 0, connected: false, heartbeatTimer: null, requestSeq: 0 },
   // Recording timer
   recStartTime: null,
   recElapsed: 0,
@@ -589,6 +589,7 @@ function startRecording() {
     originalText.textContent = transcript;
     latestTranscript = transcript.trim();
     console.log('Speech:', transcript, 'isFinal:', result.isFinal);
+    if (!result.isFinal) sendInterim(latestTranscript);
   };
 
   rec.onerror = function (event) {
@@ -659,7 +660,9 @@ function sendForTranslation(text) {
       text: text,
       from: state.direction.from,
       to: state.direction.to,
-      session_id: state.session.id
+      session_id: state.session.id,
+      stream: true,
+      request_id: String(++state.ws.requestSeq)
     }));
   } else {
     showToast('Not connected to server');
@@ -667,6 +670,17 @@ function sendForTranslation(text) {
   }
 }
 
+// Interim transcripts let the server start translating before the final result
+function sendInterim(text) {
+  if (!text || !state.ws.connected || !state.ws.socket || state.ws.socket.readyState !== WebSocket.OPEN) return;
+  state.ws.socket.send(JSON.stringify({
+    type: 'interim',
+    text: text,
+    from: state.direction.from,
+    to: state.direction.to
+  }));
+}
+
 function startHeartbeat(ws) {
   stopHeartbeat();
   state.ws.heartbeatTimer = setInterval(function () {
@@ -699,6 +713,7 @@ function connectWebSocket() {
         ws.send(JSON.stringify({
           type: 'start_session',
           session_id: state.session.id,
+          pin: state.pin,
           from: state.direction.from,
           to: state.direction.to
         }));
@@ -710,6 +725,11 @@ function connectWebSocket() {
           var msg = JSON.parse(event.data);
           if (msg.type === 'pong') return; // ignore heartbeat replies
           console.log('WS:', msg);
+          if (msg.type === 'translation_partial' || msg.type === 'translation_interim') {
+            // Streamed tokens or a speculative translation — show progress, final 'translation' frame follows
+            translatedText.textContent = msg.text;
+            return;
+          }
           if (msg.type === 'translation') {
             var origText = originalText.textContent;
             translatedText.textContent = msg.text;
@@ -806,36 +826,37 @@ function playBrowserVoice(text, lang) {
 
 function playFishAudio(text, lang) {
   setStatus('speaking');
-  fetch('/api/tts', {
+  // The text goes in a POST body (it may be PHI, and URLs end up in logs);
+  // the server answers with an opaque URL that an <audio> element can GET.
+  // That GET streams chunked audio, so playback starts after the first sentence.
+  // <audio> sends Accept: */*, so ask for MP3 explicitly; the server falls
+  // back to WAV when its TTS backend cannot encode MP3.
+  var audio = new Audio();
+  var body = { text: text, lang: lang, stream: true };
+  if (audio.canPlayType('audio/mpeg')) body.format = 'mp3';
+  var fellBack = false;
+  function fallBack(reason) {
+    if (fellBack) return;
+    fellBack = true;
+    console.warn('Fish Audio ' + reason + ', falling back to browser voice');
+    playBrowserVoice(text, lang);
+  }
+  fetch('/api/tts/tickets', {
     method: 'POST',
     headers: { 'Content-Type': 'application/json' },
-    body: JSON.stringify({ text: text, lang: lang })
+    body: JSON.stringify(body)
   })
     .then(function (res) {
-      if (!res.ok) throw new Error('TTS failed: ' + res.status);
-      return res.blob();
+      if (!res.ok) throw new Error('TTS ticket failed: ' + res.status);
+      return res.json();
     })
-    .then(function (blob) {
-      var url = URL.createObjectURL(blob);
-      var audio = new Audio(url);
-      audio.onended = function () {
-        URL.revokeObjectURL(url);
-        handlePostSpeech();
-      };
-      audio.onerror = function () {
-        URL.revokeObjectURL(url);
-        console.warn('Fish Audio playback failed, falling back to browser voice');
-        playBrowserVoice(text, lang);
-      };
-      audio.play().catch(function () {
-        console.warn('Fish Audio play() blocked, falling back to browser voice');
-        playBrowserVoice(text, lang);
-      });
+    .then(function (ticket) {
+      audio.src = ticket.url;
+      audio.onended = handlePostSpeech;
+      audio.onerror = function () { fallBack('playback failed'); };
+      return audio.play().catch(function () { fallBack('play() blocked'); });
     })
-    .catch(function (err) {
-      console.warn('Fish Audio fetch failed:', err, '— falling back to browser voice');
-      playBrowserVoice(text, lang);
-    });
+    .catch(function (err) { fallBack('request failed (' + err.message + ')'); });
 }
 
 /* ── Interview Flow ── */
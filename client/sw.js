@@ -1,5 +1,9 @@
 // MedTranslate Service Worker — network-first for API, cache-first for static
-const CACHE_NAME = 'medtranslate-v31';
+const CACHE_NAME = 'medtranslate-v32';
+// v1 also held live-utterance audio; renaming drops it on activate
+const TTS_CACHE_NAME = 'medtranslate-tts-v2';
+const TTS_CACHE_MAX_ENTRIES = 200;
+const TTS_CACHE_MAX_AGE_MS = 7 * 24 * 60 * 60 * 1000;
 const STATIC_ASSETS = [
   '/', '/index.html', '/styles/app.css?direct', '/js/app.js',
   '/manifest.json', '/icons/icon.svg'
@@ -16,12 +20,65 @@ self.addEventListener('install', (e) => {
 self.addEventListener('activate', (e) => {
   e.waitUntil(
     caches.keys()
-      .then(keys => Promise.all(keys.filter(k => k !== CACHE_NAME).map(k => caches.delete(k))))
+      .then(keys => Promise.all(keys.filter(k => k !== CACHE_NAME && k !== TTS_CACHE_NAME).map(k => caches.delete(k))))
       .then(() => self.clients.claim())
   );
 });
 
+// TTS audio is content-addressed (ETag = hash of text/lang/voice): revalidate
+// with If-None-Match and replay the cached copy on 304 or when offline.
+// Only phrase-library audio is stored: the server sends live utterances
+// (possible PHI) as no-store. Entries expire after TTS_CACHE_MAX_AGE_MS and
+// the oldest are dropped past TTS_CACHE_MAX_ENTRIES.
+function ttsFresh(cached) {
+  const storedAt = Number(cached.headers.get('X-SW-Stored-At'));
+  return storedAt > 0 && Date.now() - storedAt < TTS_CACHE_MAX_AGE_MS;
+}
+
+function storeTTS(cache, url, resp) {
+  return resp.blob().then(blob => {
+    const headers = new Headers(resp.headers);
+    headers.set('X-SW-Stored-At', String(Date.now()));
+    return cache.put(url, new Response(blob, { status: resp.status, headers: headers }));
+  })
+    .then(() => cache.keys())
+    // keys() lists entries oldest first
+    .then(keys => Promise.all(keys.slice(0, Math.max(0, keys.length - TTS_CACHE_MAX_ENTRIES)).map(k => cache.delete(k))));
+}
+
+function revalidateTTS(e) {
+  const url = e.request.url;
+  return caches.open(TTS_CACHE_NAME).then(cache =>
+    cache.match(url).then(cached => {
+      if (cached && !ttsFresh(cached)) {
+        cache.delete(url);
+        cached = undefined;
+      }
+      const headers = new Headers();
+      const etag = cached && cached.headers.get('ETag');
+      if (etag) headers.set('If-None-Match', etag);
+      return fetch(url, { headers: headers }).then(resp => {
+        if (resp.status === 304 && cached) return cached;
+        const cacheControl = resp.headers.get('Cache-Control') || '';
+        if (resp.ok && !cacheControl.includes('no-store')) {
+          e.waitUntil(storeTTS(cache, url, resp.clone()));
+        }
+        return resp;
+      }).catch(err => {
+        if (cached) return cached;
+        throw err;
+      });
+    })
+  );
+}
+
 self.addEventListener('fetch', (e) => {
+  const url = new URL(e.request.url);
+  if (e.request.method === 'GET' && url.pathname.startsWith('/api/tts/audio/')) {
+    e.respondWith(revalidateTTS(e));
+    return;
+  }
+
   // Network-first for API calls and WebSockets
   if (e.request.url.includes('/api/') || e.request.url.includes('wss://')) return;
 
@@ -0,0 +1,275 @@
+"""
+Upstream Admission — rate limits and priorities for NIM calls.
+Every translation that has to go upstream first takes a token from its
+provider PIN's bucket (so one busy ward can't use up the quota of every
+clinic) and then from a global bucket sized to the API quota. Callers
+waiting on the global bucket are served live first, then speculative, then
+background work (cache pre-warming), so background traffic only ever uses
+quota nobody is waiting for.
+
+Rate limiting from the provider is handled adaptively: a 429 pauses all
+admissions for its Retry-After (or an exponential backoff when it sends
+none) and halves the global rate; successes raise it back step by step.
+A live request that would wait longer than its limit is refused with a
+retry hint instead of queueing behind an overloaded provider.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import time
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Deque, Dict, List, Optional, Tuple
+
+from .metrics import UPSTREAM_RATE, UPSTREAM_SHED, UPSTREAM_WAIT_SECONDS
+
+logger = logging.getLogger("medtranslate.admission")
+
+LIVE, SPECULATIVE, BACKGROUND = 0, 1, 2
+PRIORITIES = ("live", "speculative", "background")
+
+SPECULATIVE_MAX_WAIT = 1.0  # a speculation that waits longer is stale before it starts
+MAX_PAUSE = 60.0  # cap on a provider's Retry-After
+MAX_BACKOFF = 30.0
+RECOVERY_STEP = 0.05  # fraction of the configured rate regained per successful call
+MIN_RATE_FRACTION = 0.1
+_MAX_IDLE_PINS = 1024
+
+
+class UpstreamBusy(Exception):
+    """The request would wait too long for upstream quota; retry after `retry_after` seconds."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"upstream quota exhausted, retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class UpstreamRateLimited(Exception):
+    """This upstream call failed, and at least one backend it tried answered 429."""
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds from a Retry-After header (delta-seconds or HTTP-date), or None."""
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            when = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        seconds = (when - datetime.now(timezone.utc)).total_seconds()
+    return min(max(seconds, 0.0), MAX_PAUSE)
+
+
+class TokenBucket:
+    """`rate` tokens per second up to `burst`. Tokens may go negative: that reserves future ones."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, now: float, tokens: float = 1.0) -> float:
+        """Seconds until `tokens` more can be taken."""
+        self._refill(now)
+        return max(0.0, (tokens - self.tokens) / self.rate)
+
+    def take(self, now: float):
+        self._refill(now)
+        self.tokens -= 1.0
+
+    def idle(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.burst
+
+
+class UpstreamScheduler:
+    """Per-PIN and global token buckets with a priority queue and adaptive 429 backoff."""
+
+    def __init__(
+        self,
+        rate: float = 0.0,
+        burst: int = 10,
+        pin_rate: float = 0.0,
+        pin_burst: int = 5,
+        max_wait: float = 5.0,
+    ):
+        self._rate = rate  # configured global rate; 0 = no global limit (429 pauses still apply)
+        self._bucket = TokenBucket(rate, burst) if rate > 0 else None
+        self._pin_rate = pin_rate
+        self._pin_burst = pin_burst
+        self._pins: Dict[str, TokenBucket] = {}
+        self._max_wait = (max_wait, min(max_wait, SPECULATIVE_MAX_WAIT), math.inf)
+        self._queue: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._paused_until = 0.0
+        self._cut_until = 0.0
+        self._backoff = 0.0
+        self.throttles = 0  # 429s seen
+        self.admitted = [0, 0, 0]
+        self.shed = [0, 0, 0]
+        self._waits: Tuple[Deque[float], ...] = tuple(deque(maxlen=500) for _ in PRIORITIES)
+        UPSTREAM_RATE.set(rate)
+
+    @property
+    def throttling(self) -> bool:
+        """True while paused by a 429 or still running below the configured rate."""
+        return (time.monotonic() < self._paused_until
+                or (self._bucket is not None and self._bucket.rate < self._rate))
+
+    # ── Admission ──────────────────────────────────────────────────
+    async def acquire(self, priority: int = LIVE, pin: Optional[str] = None):
+        """
+        Wait until this call may go upstream. Raises UpstreamBusy straight
+        away if the expected wait is over this priority's limit.
+        """
+        t0 = time.monotonic()
+        max_wait = self._max_wait[priority]
+        if pin and self._pin_rate > 0:
+            bucket = self._pin_bucket(pin, t0)
+            wait = bucket.wait_time(t0)
+            if wait > max_wait:
+                self._shed(priority, wait)
+            bucket.take(t0)  # reserves the token we are about to wait for
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+        now = time.monotonic()
+        if not self._queue and self._delay(now) == 0:
+            if self._bucket is not None:
+                self._bucket.take(now)
+        else:
+            expected = self._expected_wait(priority, now)
+            if now - t0 + expected > max_wait:
+                self._shed(priority, expected)
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._queue, (priority, next(self._seq), future))
+            if self._dispatcher is None:
+                self._dispatcher = asyncio.create_task(self._dispatch())
+            await future  # cancelling the caller cancels this; the dispatcher skips it
+
+        waited = time.monotonic() - t0
+        self.admitted[priority] += 1
+        self._waits[priority].append(waited)
+        UPSTREAM_WAIT_SECONDS.labels(PRIORITIES[priority]).observe(waited)
+
+    def try_acquire(self, priority: int = LIVE, pin: Optional[str] = None) -> bool:
+        """Admit a call only if quota is free right now, never waiting (e.g. for a hedge)."""
+        now = time.monotonic()
+        bucket = self._pin_bucket(pin, now) if pin and self._pin_rate > 0 else None
+        if self._queue or self._delay(now) > 0 or (bucket is not None and bucket.wait_time(now) > 0):
+            return False
+        if bucket is not None:
+            bucket.take(now)
+        if self._bucket is not None:
+            self._bucket.take(now)
+        self.admitted[priority] += 1
+        self._waits[priority].append(0.0)
+        UPSTREAM_WAIT_SECONDS.labels(PRIORITIES[priority]).observe(0.0)
+        return True
+
+    def _delay(self, now: float) -> float:
+        pause = self._paused_until - now
+        bucket = self._bucket.wait_time(now) if self._bucket is not None else 0.0
+        return max(0.0, pause, bucket)
+
+    def _expected_wait(self, priority: int, now: float) -> float:
+        ahead = sum(1 for p, _, f in self._queue if p <= priority and not f.done())
+        pause = max(0.0, self._paused_until - now)
+        if self._bucket is None:
+            return pause
+        return max(pause, self._bucket.wait_time(now, ahead + 1))
+
+    def _shed(self, priority: int, wait: float):
+        self.shed[priority] += 1
+        UPSTREAM_SHED.labels(PRIORITIES[priority]).inc()
+        logger.warning("Shedding %s upstream call (expected wait %.1fs)", PRIORITIES[priority], wait)
+        raise UpstreamBusy(wait)
+
+    async def _dispatch(self):
+        """Hand out global tokens to the best-priority waiter as they become available."""
+        try:
+            while self._queue:
+                now = time.monotonic()
+                delay = self._delay(now)
+                if delay > 0:
+                    await asyncio.sleep(delay)  # re-checked after: a 429 may have extended the pause
+                    continue
+                _, _, future = heapq.heappop(self._queue)
+                if future.done():
+                    continue
+                if self._bucket is not None:
+                    self._bucket.take(now)
+                future.set_result(None)
+        finally:
+            self._dispatcher = None
+
+    def _pin_bucket(self, pin: str, now: float) -> TokenBucket:
+        bucket = self._pins.get(pin)
+        if bucket is None:
+            if len(self._pins) >= _MAX_IDLE_PINS:
+                self._pins = {k: b for k, b in self._pins.items() if not b.idle(now)}
+            bucket = self._pins[pin] = TokenBucket(self._pin_rate, self._pin_burst)
+        return bucket
+
+    # ── Feedback from upstream responses ───────────────────────────
+    def throttled(self, retry_after: Optional[float] = None):
+        """The provider answered 429: pause admissions and cut the rate (once per episode)."""
+        now = time.monotonic()
+        self.throttles += 1
+        if retry_after is None:
+            self._backoff = min(MAX_BACKOFF, self._backoff * 2 or 1.0)
+            retry_after = self._backoff
+        self._paused_until = max(self._paused_until, now + retry_after)
+        if self._bucket is not None and now >= self._cut_until:
+            self._bucket.rate = max(self._rate * MIN_RATE_FRACTION, self._bucket.rate / 2)
+            self._bucket.tokens = min(self._bucket.tokens, 0.0)  # no burst straight after the pause
+            self._cut_until = self._paused_until
+            UPSTREAM_RATE.set(self._bucket.rate)
+        logger.warning("Upstream rate limited: pausing %.1fs, rate now %s/s", retry_after,
+                       f"{self._bucket.rate:.2f}" if self._bucket is not None else "unlimited")
+
+    def succeeded(self):
+        """An upstream call went through: reset the backoff and recover some rate."""
+        self._backoff = 0.0
+        if self._bucket is not None and self._bucket.rate < self._rate:
+            self._bucket.rate = min(self._rate, self._bucket.rate + self._rate * RECOVERY_STEP)
+            UPSTREAM_RATE.set(self._bucket.rate)
+
+    def stats(self) -> Dict[str, object]:
+        now = time.monotonic()
+        queued = [0, 0, 0]
+        for priority, _, future in self._queue:
+            if not future.done():
+                queued[priority] += 1
+        waits = {}
+        for name, samples in zip(PRIORITIES, self._waits):
+            ordered = sorted(samples)
+            waits[name] = {
+                "avg_ms": round(sum(ordered) / len(ordered) * 1000, 1) if ordered else 0.0,
+                "p95_ms": round(ordered[int(0.95 * (len(ordered) - 1))] * 1000, 1) if ordered else 0.0,
+            }
+        return {
+            "rate": self._rate,
+            "current_rate": round(self._bucket.rate, 3) if self._bucket is not None else None,
+            "paused_for_s": round(max(0.0, self._paused_until - now), 2),
+            "throttles": self.throttles,
+            "pins": len(self._pins),
+            "queued": dict(zip(PRIORITIES, queued)),
+            "admitted": dict(zip(PRIORITIES, self.admitted)),
+            "shed": dict(zip(PRIORITIES, self.shed)),
+            "wait": waits,
+        }
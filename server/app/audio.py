@@ -0,0 +1,113 @@
+"""
+Audio helpers shared by LocalTTS, the Modal TTS function and the /api/tts proxy.
+Depends only on the standard library so the Modal image and the cloud
+deployment (no numpy/torch) can both import it.
+"""
+import re
+import struct
+from typing import Iterable, List, Optional
+
+# Sizes used in the header of a WAV streamed before its length is known
+STREAMING_SIZE = 0xFFFFFFFF
+
+# Output formats the TTS backends can produce, with their Content-Type
+AUDIO_FORMATS = {"wav": "audio/wav", "opus": "audio/ogg", "mp3": "audio/mpeg"}
+# Formats that can be streamed as independently encoded per-sentence pieces
+STREAMABLE_FORMATS = ("wav", "mp3")
+# Smallest first: breaks ties between equally preferred Accept entries
+_FORMAT_PREFERENCE = ("opus", "mp3", "wav")
+_ACCEPT_TYPES = {
+    "audio/wav": "wav", "audio/wave": "wav", "audio/x-wav": "wav", "audio/vnd.wave": "wav",
+    "audio/ogg": "opus", "audio/opus": "opus", "application/ogg": "opus",
+    "audio/mpeg": "mp3", "audio/mp3": "mp3",
+}
+
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+")
+_CLAUSE_END = re.compile(r"(?<=[,;:])\s+")
+
+
+def split_for_tts(text: str, max_chars: int = 180) -> List[str]:
+    """
+    Split text at sentence boundaries, and long sentences at clause
+    boundaries, so each piece can be synthesized and played on its own.
+    """
+    chunks: List[str] = []
+    for sentence in _SENTENCE_END.split(text.strip()):
+        if not sentence:
+            continue
+        if len(sentence) <= max_chars:
+            chunks.append(sentence)
+            continue
+        current = ""
+        for clause in _CLAUSE_END.split(sentence):
+            if current and len(current) + 1 + len(clause) > max_chars:
+                chunks.append(current)
+                current = clause
+            else:
+                current = f"{current} {clause}".strip()
+        if current:
+            chunks.append(current)
+    return chunks
+
+
+def wav_header(
+    sample_rate: int,
+    data_bytes: Optional[int] = None,
+    channels: int = 1,
+    sample_width: int = 2,
+) -> bytes:
+    """
+    44-byte PCM WAV header. With data_bytes=None the RIFF and data sizes are
+    set to 0xFFFFFFFF, which players treat as "read until the stream ends".
+    """
+    byte_rate = sample_rate * channels * sample_width
+    if data_bytes is None:
+        riff_size = data_size = STREAMING_SIZE
+    else:
+        riff_size, data_size = 36 + data_bytes, data_bytes
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", riff_size, b"WAVE",
+        b"fmt ", 16, 1, channels, sample_rate, byte_rate,
+        channels * sample_width, sample_width * 8,
+        b"data", data_size,
+    )
+
+
+def finalize_wav(wav: bytes) -> bytes:
+    """Fill in the real sizes of a streamed WAV (44-byte header) once its length is known."""
+    if len(wav) < 44:
+        return wav
+    buf = bytearray(wav)
+    struct.pack_into("<I", buf, 4, len(buf) - 8)
+    struct.pack_into("<I", buf, 40, len(buf) - 44)
+    return bytes(buf)
+
+
+def negotiate_format(accept: Optional[str], available: Iterable[str]) -> str:
+    """
+    Pick an output format from an Accept header. Only explicitly listed
+    audio types count: wildcards (audio/*, */*) get WAV, which every
+    browser can play, so compressed audio is strictly opt-in.
+    """
+    available = set(available) | {"wav"}
+    best, best_q = "wav", 0.0
+    for part in (accept or "").split(","):
+        media, *params = [p.strip() for p in part.split(";")]
+        fmt = _ACCEPT_TYPES.get(media.lower())
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            name = name.strip().lower()
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+            elif name == "codecs" and fmt == "opus" and "opus" not in value.lower():
+                fmt = None  # e.g. audio/ogg; codecs=vorbis
+        if fmt not in available or q <= 0:
+            continue
+        if q > best_q or (q == best_q and _FORMAT_PREFERENCE.index(fmt) < _FORMAT_PREFERENCE.index(best)):
+            best, best_q = fmt, q
+    return best
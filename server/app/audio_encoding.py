@@ -0,0 +1,153 @@
+"""
+Audio Encoding — float waveforms to WAV, Ogg Opus or MP3 bytes.
+Shared by LocalTTS and the Modal TTS function (both have numpy; the cloud
+server only needs the stdlib helpers in audio.py). WAV is written straight
+into one preallocated buffer: scale, dither and round in a float scratch
+array, then cast into the int16 view behind the header — no BytesIO/wave
+round trip, and the buffer is returned as is. Opus and MP3 go through
+libsndfile via the optional `soundfile` package; without it only WAV is
+offered. Downsampling always low-pass filters first, with scipy's polyphase
+filter or, without scipy, a windowed-sinc FIR ahead of linear interpolation.
+"""
+import io
+import math
+from typing import List, Optional, Union
+
+import numpy as np
+
+from .audio import wav_header
+
+try:
+    import soundfile as sf
+except ImportError:  # compressed formats unavailable
+    sf = None
+
+try:
+    from scipy.signal import resample_poly
+except ImportError:  # fall back to FIR low-pass + linear interpolation
+    resample_poly = None
+
+# libsndfile (major format, subtype) per compressed output format
+_SNDFILE_FORMATS = {"opus": ("OGG", "OPUS"), "mp3": ("MP3", "MPEG_LAYER_III")}
+# Opus only encodes at these rates
+_OPUS_RATES = (8000, 12000, 16000, 24000, 48000)
+_FIR_TAPS_PER_RATIO = 16  # fallback anti-alias filter length per unit of decimation ratio
+
+_rng = np.random.default_rng()
+
+
+def available_formats() -> List[str]:
+    """Output formats this process can encode."""
+    formats = ["wav"]
+    if sf is not None:
+        majors = sf.available_formats()
+        for name, (major, subtype) in _SNDFILE_FORMATS.items():
+            if major in majors and subtype in sf.available_subtypes(major):
+                formats.append(name)
+    return formats
+
+
+def pcm16(waveform: np.ndarray, out: Optional[np.ndarray] = None, dither: bool = True) -> np.ndarray:
+    """
+    Scale to int16 with TPDF dither (±1 LSB, so quantization error is noise
+    rather than distortion on quiet passages), round and clip, writing into
+    `out` when given.
+    """
+    scratch = np.asarray(waveform, dtype=np.float32).reshape(-1) * np.float32(32767.0)
+    if dither and scratch.size:
+        scratch += _rng.random(scratch.size, dtype=np.float32)
+        scratch -= _rng.random(scratch.size, dtype=np.float32)
+    np.rint(scratch, out=scratch)
+    np.clip(scratch, -32767.0, 32767.0, out=scratch)
+    if out is None:
+        return scratch.astype(np.int16)
+    out[...] = scratch
+    return out
+
+
+def _lowpass(waveform: np.ndarray, cutoff: float, ratio: float) -> np.ndarray:
+    """Hamming-windowed sinc FIR; `cutoff` in cycles per sample (0-0.5)."""
+    taps = 2 * math.ceil(_FIR_TAPS_PER_RATIO * ratio / 2) + 1
+    n = np.arange(taps, dtype=np.float64) - (taps - 1) / 2
+    kernel = np.sinc(2 * cutoff * n) * np.hamming(taps)
+    kernel /= kernel.sum()
+    return np.convolve(waveform, kernel.astype(np.float32), mode="same")
+
+
+def resample(waveform: np.ndarray, from_rate: int, to_rate: int) -> np.ndarray:
+    """
+    Polyphase resampling (scipy), or linear interpolation without scipy. The
+    fallback low-pass filters below the new Nyquist first when downsampling,
+    since interpolation alone would fold everything above it back as aliasing.
+    """
+    waveform = np.asarray(waveform, dtype=np.float32).reshape(-1)
+    if from_rate == to_rate or waveform.size == 0:
+        return waveform
+    if resample_poly is not None:
+        g = math.gcd(from_rate, to_rate)
+        return resample_poly(waveform, to_rate // g, from_rate // g).astype(np.float32, copy=False)
+    if to_rate < from_rate:
+        # Pass band up to 90% of the new Nyquist, leaving room for the transition
+        waveform = _lowpass(waveform, 0.45 * to_rate / from_rate, from_rate / to_rate)
+    n = int(round(waveform.size * to_rate / from_rate))
+    positions = np.linspace(0, waveform.size - 1, n, dtype=np.float32)
+    return np.interp(positions, np.arange(waveform.size, dtype=np.float32), waveform).astype(np.float32)
+
+
+def encode_wav(waveform: np.ndarray, sample_rate: int) -> memoryview:
+    """
+    16-bit mono WAV with the PCM written directly behind the header. Returns
+    a view of that buffer rather than copying it into bytes (Starlette
+    responses, the TTS cache and file writes all take a memoryview).
+    """
+    samples = int(np.size(waveform))
+    buf = bytearray(44 + 2 * samples)
+    buf[:44] = wav_header(sample_rate, 2 * samples)
+    pcm16(waveform, out=np.frombuffer(buf, dtype="<i2", offset=44))
+    return memoryview(buf)
+
+
+def output_rate(sample_rate: int, fmt: str, target_rate: int = 0) -> int:
+    """The rate audio is actually encoded at: target_rate if lower, snapped up to an Opus rate."""
+    rate = target_rate if 0 < target_rate < sample_rate else sample_rate
+    if fmt == "opus" and rate not in _OPUS_RATES:
+        rate = next((r for r in _OPUS_RATES if r >= rate), _OPUS_RATES[-1])
+    return rate
+
+
+def encode(
+    waveform: np.ndarray, sample_rate: int, fmt: str = "wav", target_rate: int = 0
+) -> Union[bytes, memoryview]:
+    """
+    A complete audio file in `fmt` (a memoryview for WAV, see encode_wav).
+    target_rate > 0 downsamples first (e.g. 8000 for narrowband playback);
+    it never upsamples.
+    """
+    rate = output_rate(sample_rate, fmt, target_rate)
+    waveform = resample(waveform, sample_rate, rate)
+    if fmt == "wav":
+        return encode_wav(waveform, rate)
+    if sf is None or fmt not in _SNDFILE_FORMATS:
+        raise ValueError(f"audio format not available: {fmt}")
+    major, subtype = _SNDFILE_FORMATS[fmt]
+    buf = io.BytesIO()
+    sf.write(buf, pcm16(waveform), rate, format=major, subtype=subtype)
+    return buf.getvalue()
+
+
+def stream_header(sample_rate: int, fmt: str = "wav", target_rate: int = 0) -> bytes:
+    """What a streamed response starts with: a WAV header, or nothing for MP3."""
+    if fmt == "wav":
+        return wav_header(output_rate(sample_rate, fmt, target_rate))
+    return b""
+
+
+def encode_segment(waveform: np.ndarray, sample_rate: int, fmt: str = "wav", target_rate: int = 0) -> bytes:
+    """
+    One streamed sentence: bare PCM after the WAV stream header, or a
+    self-contained MP3 (MPEG frames concatenate into one playable stream).
+    """
+    if fmt == "wav":
+        rate = output_rate(sample_rate, fmt, target_rate)
+        return pcm16(resample(waveform, sample_rate, rate)).tobytes()
+    return encode(waveform, sample_rate, fmt, target_rate)
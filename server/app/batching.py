@@ -0,0 +1,87 @@
+"""
+Micro-batching for translation requests.
+Requests for the same language pair that arrive within a few milliseconds
+of each other are sent upstream as one completion, so under load we pay
+the system prompt and HTTP overhead once per batch instead of per utterance.
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger("medtranslate.batching")
+
+BatchHandler = Callable[[List[str], str, str], Awaitable[List[Optional[str]]]]
+
+
+class TranslationBatcher:
+    """Collects concurrent requests per (from, to) pair and flushes them together."""
+
+    def __init__(self, handler: BatchHandler, max_batch_size: int = 8, max_wait_ms: float = 10.0):
+        self._handler = handler
+        self._max_batch_size = max_batch_size
+        self._max_wait = max_wait_ms / 1000.0
+        self._pending: Dict[Tuple[str, str], List[Tuple[str, asyncio.Future]]] = {}
+        self._timers: Dict[Tuple[str, str], asyncio.TimerHandle] = {}
+        self._tasks: Set[asyncio.Task] = set()  # strong refs: the loop only keeps weak ones
+        self.batches_sent = 0
+        self.requests_batched = 0
+        self.batches_abandoned = 0
+
+    async def submit(self, text: str, from_lang: str, to_lang: str) -> Optional[str]:
+        """Queue one text and wait for its translation from the next flushed batch."""
+        pair = (from_lang, to_lang)
+        future = asyncio.get_running_loop().create_future()
+        pending = self._pending.setdefault(pair, [])
+        pending.append((text, future))
+
+        if len(pending) >= self._max_batch_size:
+            self._flush(pair)
+        elif pair not in self._timers:
+            self._timers[pair] = asyncio.get_running_loop().call_later(
+                self._max_wait, self._flush, pair
+            )
+        return await future
+
+    def _flush(self, pair: Tuple[str, str]):
+        timer = self._timers.pop(pair, None)
+        if timer:
+            timer.cancel()
+        batch = self._pending.pop(pair, [])
+        if batch:
+            task = asyncio.create_task(self._run(pair, batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, pair: Tuple[str, str], batch: List[Tuple[str, asyncio.Future]]):
+        texts = [text for text, _ in batch]
+        self.batches_sent += 1
+        self.requests_batched += len(batch)
+        upstream = asyncio.ensure_future(self._handler(texts, *pair))
+
+        def abandon(_):
+            # Every caller gave up (e.g. their WebSockets closed): stop the upstream call
+            if all(future.done() for _, future in batch):
+                upstream.cancel()
+
+        for _, future in batch:
+            future.add_done_callback(abandon)
+        try:
+            results = await upstream
+        except asyncio.CancelledError:
+            self.batches_abandoned += 1
+            return
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "batches_sent": self.batches_sent,
+            "requests_batched": self.requests_batched,
+            "batches_abandoned": self.batches_abandoned,
+        }
@@ -0,0 +1,233 @@
+"""
+Translation Cache — bounded in-memory LRU with an optional encrypted disk tier.
+Clinics repeat the same phrases constantly; a hit skips the LLM call entirely.
+Keys are hashes of (normalized text, from, to, model), so no plaintext ever
+lands on disk: entries there are AES-256-GCM encrypted via EncryptionManager.
+The disk tier is bounded too: past disk_bytes the oldest entries are
+evicted, and expired files are swept at startup and then hourly (without a
+persistent key, leftovers from an earlier process can't be read and go too).
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .hipaa.encryption import EncryptionManager
+
+logger = logging.getLogger("medtranslate.cache")
+
+_WHITESPACE = re.compile(r"\s+")
+SWEEP_INTERVAL = 3600.0  # seconds between sweeps of expired disk entries
+
+
+def normalize_text(text: str) -> str:
+    """Case- and whitespace-insensitive form used for cache keys."""
+    text = unicodedata.normalize("NFC", text)
+    return _WHITESPACE.sub(" ", text).strip().casefold()
+
+
+class TranslationCache:
+    """LRU + TTL translation cache with hit/miss counters."""
+
+    def __init__(
+        self,
+        max_entries: int = 2048,
+        ttl_seconds: int = 86400,
+        disk_dir: str = "",
+        encryption_key: str = "",
+        disk_bytes: int = 64 * 1024 * 1024,
+    ):
+        self._max_entries = max_entries
+        self._ttl = ttl_seconds
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._disk_dir: Optional[Path] = None
+        self._crypto: Optional[EncryptionManager] = None
+        self._created = time.time()
+        self._persistent = bool(encryption_key)
+        self._disk: "OrderedDict[str, int]" = OrderedDict()  # key -> file size, oldest first
+        self._disk_bytes = 0
+        self._disk_limit = disk_bytes
+        self._next_sweep = time.monotonic() + SWEEP_INTERVAL  # the first sweep is the caller's, at startup
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.swept = 0
+
+        if disk_dir:
+            self._disk_dir = Path(disk_dir)
+            self._disk_dir.mkdir(parents=True, exist_ok=True)
+            if encryption_key:
+                key = base64.b64decode(encryption_key)
+            else:
+                key = None
+                logger.warning("No cache encryption key set — disk cache will not survive restarts")
+            self._crypto = EncryptionManager(key)
+            logger.info("Translation disk cache enabled at %s", self._disk_dir)
+
+    @staticmethod
+    def make_key(text: str, from_lang: str, to_lang: str, model: str) -> str:
+        raw = "\x1f".join((normalize_text(text), from_lang, to_lang, model))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    async def get(self, text: str, from_lang: str, to_lang: str, model: str) -> Optional[str]:
+        key = self.make_key(text, from_lang, to_lang, model)
+        now = time.time()
+
+        entry = self._memory.get(key)
+        if entry is not None:
+            translation, expires_at = entry
+            if expires_at > now:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return translation
+            del self._memory[key]
+
+        if self._disk_dir is not None:
+            entry = await asyncio.to_thread(self._read_disk, key)
+            if entry is not None and entry[1] > now:
+                self._remember(key, *entry)
+                self.hits += 1
+                self.disk_hits += 1
+                return entry[0]
+
+        self.misses += 1
+        return None
+
+    async def put(self, text: str, from_lang: str, to_lang: str, model: str, translation: str):
+        key = self.make_key(text, from_lang, to_lang, model)
+        expires_at = time.time() + self._ttl
+        self._remember(key, translation, expires_at)
+        if self._disk_dir is None:
+            return
+        size = await asyncio.to_thread(self._write_disk, key, translation, expires_at)
+        if size is None:
+            return
+        self._disk_bytes += size - self._disk.pop(key, 0)
+        self._disk[key] = size
+        victims = []
+        while self._disk_bytes > self._disk_limit and self._disk:
+            old_key, old_size = self._disk.popitem(last=False)
+            self._disk_bytes -= old_size
+            victims.append(self._disk_path(old_key))
+        if victims:
+            self.evicted += len(victims)
+            await asyncio.to_thread(self._unlink, victims)
+        if time.monotonic() >= self._next_sweep:
+            await self.sweep()
+
+    async def sweep(self) -> int:
+        """
+        Delete expired disk entries (and, without a persistent key, any written
+        before this cache existed) and index the rest, oldest first. Call it at
+        startup; put() then repeats it every SWEEP_INTERVAL. Returns how many
+        files were removed.
+        """
+        if self._disk_dir is None:
+            return 0
+        self._next_sweep = time.monotonic() + SWEEP_INTERVAL
+        live, removed = await asyncio.to_thread(self._scan)
+        # Rebuilt from the scan, oldest first; entries written while it ran are kept
+        fresh = [(key, size) for key, size in self._disk.items() if key not in live and key not in removed]
+        oldest_first = sorted(live.items(), key=lambda item: item[1][1])
+        self._disk = OrderedDict((key, size) for key, (size, _) in oldest_first)
+        self._disk.update(fresh)
+        self._disk_bytes = sum(self._disk.values())
+        self.swept += len(removed)
+        if removed:
+            logger.info("Translation disk cache swept %d expired entries", len(removed))
+        return len(removed)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._memory),
+            "max_entries": self._max_entries,
+            "disk_entries": len(self._disk),
+            "disk_bytes": self._disk_bytes,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evicted": self.evicted,
+            "swept": self.swept,
+        }
+
+    def _remember(self, key: str, translation: str, expires_at: float):
+        self._memory[key] = (translation, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self._max_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_path(self, key: str) -> Path:
+        return self._disk_dir / key[:2] / f"{key}.bin"
+
+    def _read_disk(self, key: str) -> Optional[Tuple[str, float]]:
+        path = self._disk_path(key)
+        try:
+            blob = path.read_bytes()
+            record = json.loads(self._crypto.decrypt(blob[:12], blob[12:]))
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning("Dropping unreadable cache entry %s: %s", key[:8], e)
+            path.unlink(missing_ok=True)
+            return None
+        if record["expires_at"] <= time.time():
+            path.unlink(missing_ok=True)
+            return None
+        return record["text"], record["expires_at"]
+
+    def _write_disk(self, key: str, translation: str, expires_at: float) -> Optional[int]:
+        """Write one entry. Returns its size in bytes, or None if the write failed."""
+        path = self._disk_path(key)
+        try:
+            path.parent.mkdir(exist_ok=True)
+            record = json.dumps({"text": translation, "expires_at": expires_at}).encode("utf-8")
+            nonce, ciphertext = self._crypto.encrypt(record)
+            blob = nonce + ciphertext
+            tmp = path.with_suffix(f".{os.urandom(4).hex()}.tmp")
+            tmp.write_bytes(blob)
+            os.replace(tmp, path)
+            return len(blob)
+        except Exception as e:
+            logger.warning("Cache disk write failed: %s", e)
+            return None
+
+    def _scan(self) -> Tuple[Dict[str, Tuple[int, float]], set]:
+        """
+        Walk the disk tier: remove expired entries (by write time + TTL; reads
+        check the exact expiry) and stray temp files. Returns the live entries
+        as key -> (size, mtime) and the set of removed keys.
+        """
+        live: Dict[str, Tuple[int, float]] = {}
+        removed = set()
+        cutoff = time.time() - self._ttl
+        if not self._persistent:
+            cutoff = max(cutoff, self._created)  # an earlier process's key is gone
+        for path in self._disk_dir.glob("*/*"):
+            try:
+                stat = path.stat()
+                if path.suffix == ".tmp":
+                    if stat.st_mtime < time.time() - 60:  # not a write in progress
+                        path.unlink(missing_ok=True)
+                    continue
+                if stat.st_mtime <= cutoff:
+                    path.unlink(missing_ok=True)
+                    removed.add(path.stem)
+                else:
+                    live[path.stem] = (stat.st_size, stat.st_mtime)
+            except OSError as e:
+                logger.warning("Cache sweep skipped %s: %s", path.name, e)
+        return live, removed
+
+    @staticmethod
+    def _unlink(paths: List[Path]):
+        for path in paths:
+            path.unlink(missing_ok=True)
@@ -15,6 +15,38 @@ class Settings(BaseSettings):
     # NVIDIA Riva NIM
     riva_api_url: str = ""
     riva_api_key: str = ""
+    translation_backends: str = ""  # JSON list of {name, url, api_key, model}, interchangeable; default is the NIM above
+    translation_hedge_enabled: bool = True  # duplicate to the next backend past the primary's p95
+    translation_hedge_min_delay_ms: float = 150.0
+    translation_streaming: bool = True  # honour "stream": true on /ws translate messages
+    ws_max_in_flight: int = 4  # concurrent translate requests per WebSocket
+    translation_interim_enabled: bool = True  # speculatively translate "interim" transcripts on /ws
+    translation_interim_min_words: int = 3  # stable words needed before speculating
+    translation_context_tokens: int = 512  # per-session rolling history sent with each request; 0 disables
+
+    # Translation cache
+    translation_cache_size: int = 2048  # in-memory entries, 0 disables the cache
+    translation_cache_ttl_seconds: int = 7 * 24 * 3600
+    translation_cache_dir: str = ""  # set to enable the encrypted on-disk tier
+    translation_cache_key: str = ""  # base64 AES-256 key so the disk tier survives restarts
+    translation_cache_disk_mb: int = 64  # disk tier cap; oldest entries are evicted past it
+    translation_cache_prewarm_pairs: str = "en-es,en-ht"  # custom phrases warmed at startup
+
+    # Medical glossary (bundled term files + custom_phrases rows with a translation)
+    glossary_enabled: bool = True
+    glossary_dir: str = ""  # directory of <from>-<to>.tsv term files; default is the bundled set
+
+    # Translation micro-batching (same language pair, arriving within max_wait_ms)
+    translation_batch_enabled: bool = False
+    translation_batch_max_size: int = 8
+    translation_batch_max_wait_ms: float = 10.0
+
+    # Upstream admission (NIM quota): per-PIN and global token buckets, live before background
+    translation_quota_rps: float = 0.0  # global upstream requests/s, matched to the API quota; 0 = unlimited
+    translation_quota_burst: int = 10
+    translation_quota_pin_rps: float = 0.0  # per provider PIN; 0 = no per-PIN limit
+    translation_quota_pin_burst: int = 5
+    translation_quota_max_wait_seconds: float = 5.0  # live requests expected to wait longer are refused
 
     # Fish Audio TTS (legacy, kept for future voice cloning)
     fish_audio_api_key: str = ""
@@ -22,18 +54,49 @@ class Settings(BaseSettings):
 
     # Modal TTS (Haitian Creole via Meta MMS)
     modal_tts_url: str = ""
+    local_tts_enabled: bool = False  # serve Haitian Creole TTS in-process (needs torch + transformers)
+    local_tts_lazy: bool = False  # load the model on the first Haitian Creole TTS request, not at startup
+    local_tts_executor: str = "thread"  # "thread" (one shared model) or "process" (one model per worker)
+    local_tts_workers: int = 1
+    local_tts_threads_per_worker: int = 0  # torch intra-op threads per worker; 0 = cores / workers
+    local_tts_max_queue: int = 8  # requests waiting beyond this get 503 + Retry-After
+    local_tts_batch_size: int = 1  # >1 synthesizes queued texts together in one padded pass
+    local_tts_batch_wait_ms: float = 5.0
+    local_tts_engine: str = "torch"  # "torch" (eager fp32), "onnx" or "onnx-int8" (need onnx + onnxruntime)
+    local_tts_engine_dir: str = ""  # exported ONNX models are cached here; "" = ~/.cache/medtranslate/onnx
+    local_tts_parity_min_snr_db: float = 20.0  # exported engine must match eager this closely, else torch is used
+    tts_voice_id: str = "facebook/mms-tts-hat"  # part of the TTS cache key; change when the voice changes
+    tts_formats: str = "wav"  # formats the TTS backend can encode, e.g. "wav,opus,mp3" (needs soundfile)
+    tts_sample_rate: int = 0  # downsample TTS output to this rate (e.g. 8000); 0 = model native
+    tts_cache_memory_mb: int = 32
+    tts_cache_dir: str = ""  # enables the disk tier (phrase library audio)
+    tts_cache_disk_mb: int = 512
+    tts_cache_persist_live: bool = False  # also write live utterances to disk (may contain PHI)
+    tts_ticket_key: str = ""  # base64 AES-256 key shared by all workers so TTS audio URLs work on any of them
 
     # Supabase
     supabase_url: str = ""
     supabase_anon_key: str = ""
     supabase_service_key: str = ""
+    supabase_max_connections: int = 20
+    training_upload_max_bytes: int = 50 * 1024 * 1024
+
+    # Audit trail writer
+    audit_table: str = "audit_trail"
+    audit_batch_size: int = 50
+    audit_flush_interval_seconds: float = 2.0
+    audit_wal_path: str = ""  # encrypted spill file used while Supabase is down
+    audit_wal_key: str = ""  # base64 AES-256 key so spilled events survive restarts
 
     # Server
     server_port: int = 8443
     session_timeout_minutes: int = 30
     max_session_duration_minutes: int = 120
+    session_backend: str = "memory"  # "memory" (single worker) or "redis" (shared across workers)
+    redis_url: str = "redis://localhost:6379/0"
     supported_languages: str = "en,es,ht,fr,pt,ru,zh,ar,vi,tl"
     default_language_pair: str = "en-es"
+    admin_token: str = ""  # X-Admin-Token required by admin endpoints (TTS presynthesis); unset disables them
 
     # TLS
     tls_cert_path: str = ""
@@ -0,0 +1,68 @@
+"""
+Conversation Context — rolling window of recent turns for one session.
+Gives the model the preceding source/target pairs so pronouns and gender
+agreement stay consistent across turns, within a token budget. Held in
+process memory only and dropped when the session ends — never persisted.
+
+History is rendered as prior user/assistant messages in a fixed format and
+only ever appended to, so consecutive requests share a byte-identical
+prefix that OpenAI-compatible backends can serve from their prefix (KV)
+cache. When the budget is exceeded the window is trimmed to half of it in
+one go, which keeps the prefix stable for many turns instead of shifting on
+every request.
+"""
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List
+
+_MESSAGE_OVERHEAD = 4  # role/separator tokens per chat message
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough BPE token count (~4 UTF-8 bytes per token) — no tokenizer dependency."""
+    return len(text.encode("utf-8")) // 4 + 1
+
+
+@dataclass
+class Turn:
+    user: str
+    assistant: str
+    tokens: int
+
+
+class ConversationContext:
+    """Token-budgeted window of recent translations, rendered as chat history."""
+
+    def __init__(self, max_tokens: int = 512):
+        self._max_tokens = max_tokens
+        self._turns: Deque[Turn] = deque()
+        self._messages: List[Dict[str, str]] = []
+        self.tokens = 0
+
+    def __len__(self) -> int:
+        return len(self._turns)
+
+    def add(self, user: str, target: str):
+        """Append a completed request/translation, trimming the oldest turns once over budget."""
+        if self._max_tokens <= 0:
+            return
+        turn = Turn(user, target, estimate_tokens(user) + estimate_tokens(target) + 2 * _MESSAGE_OVERHEAD)
+        self._turns.append(turn)
+        self.tokens += turn.tokens
+        self._messages += [{"role": "user", "content": user}, {"role": "assistant", "content": target}]
+        if self.tokens > self._max_tokens:
+            while self._turns and self.tokens > self._max_tokens // 2:
+                self.tokens -= self._turns.popleft().tokens
+            self._messages = [
+                m for t in self._turns
+                for m in ({"role": "user", "content": t.user}, {"role": "assistant", "content": t.assistant})
+            ]
+
+    def messages(self) -> List[Dict[str, str]]:
+        """History messages to place between the system prompt and the new request."""
+        return list(self._messages)
+
+    def clear(self):
+        self._turns.clear()
+        self._messages = []
+        self.tokens = 0
@@ -0,0 +1,290 @@
+"""
+Medical Glossary — fixed translations for drug names, dosages and anatomy.
+Terms come from bundled per-pair files (glossary_terms/<from>-<to>.tsv; the
+reverse pair is derived, except for rows marked one-way) and Supabase
+custom_phrases rows that carry a translation. Custom rows are an overlay per
+provider PIN, used only on that PIN's sessions, and never replace a bundled
+term. Each language pair compiles to an Aho-Corasick automaton, so finding
+every term in an utterance is one pass over the text. Only the matched
+entries go into the prompt, the output is checked (and repaired where the
+model left a term untranslated), and an utterance that is itself a glossary
+entry is answered without calling the LLM.
+"""
+import logging
+import unicodedata
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .cache import normalize_text
+
+logger = logging.getLogger("medtranslate.glossary")
+
+BUNDLED_DIR = Path(__file__).parent / "glossary_terms"
+
+
+def _fold(text: str) -> str:
+    """Lowercase without changing length, so match offsets index the original text."""
+    text = unicodedata.normalize("NFC", text)
+    folded = text.lower()
+    if len(folded) == len(text):
+        return folded
+    return "".join(c if len(c.lower()) != 1 else c.lower() for c in text)
+
+
+def _find_word(folded: str, word: str) -> int:
+    """Offset of the first whole-word occurrence of word, or -1."""
+    pos = folded.find(word)
+    while pos >= 0:
+        end = pos + len(word)
+        if (pos == 0 or not folded[pos - 1].isalnum()) and (end == len(folded) or not folded[end].isalnum()):
+            return pos
+        pos = folded.find(word, pos + 1)
+    return -1
+
+
+@dataclass(frozen=True)
+class Term:
+    source: str
+    target: str
+
+
+class TermMatcher:
+    """Aho-Corasick automaton over folded terms; finds leftmost-longest whole-word matches."""
+
+    def __init__(self, keys: Iterable[str]):
+        self._keys: List[str] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[int, ...]] = [()]
+        for key in keys:
+            self._insert(key)
+        self._link()
+
+    def _insert(self, key: str):
+        node = 0
+        for ch in key:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            node = nxt
+        self._out[node] += (len(self._keys),)
+        self._keys.append(key)
+
+    def _link(self):
+        """Breadth-first pass setting failure links and merging their outputs."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] += self._out[self._fail[nxt]]
+
+    def find(self, folded: str) -> List[str]:
+        """Keys occurring in the folded text as whole words, non-overlapping, in order."""
+        goto, fail, out, keys = self._goto, self._fail, self._out, self._keys
+        hits = []
+        node = 0
+        for i, ch in enumerate(folded):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for idx in out[node]:
+                hits.append((i + 1 - len(keys[idx]), i + 1, idx))
+
+        found = []
+        last_end = 0
+        for start, end, idx in sorted(hits, key=lambda h: (h[0], -h[1])):
+            if start < last_end:
+                continue
+            if start > 0 and folded[start - 1].isalnum():
+                continue
+            if end < len(folded) and folded[end].isalnum():
+                continue
+            found.append(keys[idx])
+            last_end = end
+        return found
+
+
+class MedicalGlossary:
+    """Per-language-pair term tables (bundled, plus per-PIN custom overlays) with compiled matchers."""
+
+    def __init__(self):
+        # "en-es" -> normalized source -> Term
+        self._terms: Dict[str, Dict[str, Term]] = {}
+        # provider PIN -> "en-es" -> normalized source -> Term
+        self._custom: Dict[str, Dict[str, Dict[str, Term]]] = {}
+        # (PIN or None for bundled, "en-es") -> compiled matcher
+        self._matchers: Dict[Tuple[Optional[str], str], Tuple[TermMatcher, Dict[str, Term]]] = {}
+        self.exact_hits = 0
+        self.prompted = 0
+        self.repaired = 0
+        self.missing = 0
+
+    # ── Loading ────────────────────────────────────────────────────
+    def add(self, from_lang: str, to_lang: str, source: str, target: str, overwrite: bool = True):
+        key = normalize_text(source)
+        if not key or not target.strip():
+            return
+        terms = self._terms.setdefault(f"{from_lang}-{to_lang}", {})
+        if overwrite or key not in terms:
+            terms[key] = Term(source.strip(), target.strip())
+            self._matchers.pop((None, f"{from_lang}-{to_lang}"), None)
+
+    def add_custom(self, pin: str, from_lang: str, to_lang: str, source: str, target: str) -> bool:
+        """Add one PIN's custom entry. A source the bundled glossary already has is refused (False)."""
+        pair = f"{from_lang}-{to_lang}"
+        key = normalize_text(source)
+        if not pin or not key or not target.strip():
+            return False
+        if key in self._terms.get(pair, {}):
+            logger.warning("Custom %s glossary entry ignored: the bundled glossary already has that term", pair)
+            return False
+        self._custom.setdefault(pin, {}).setdefault(pair, {})[key] = Term(source.strip(), target.strip())
+        self._matchers.pop((pin, pair), None)
+        return True
+
+    def load_dir(self, path: Path = BUNDLED_DIR) -> int:
+        """
+        Load <from>-<to>.tsv files (source<TAB>target[<TAB>oneway]). Returns
+        entries read. A "oneway" row is not reversed: its target also means
+        other things (ht "san" is blood but also "without" and "hundred"), so
+        matching it in ordinary sentences would inject a wrong hint.
+        """
+        loaded = []
+        for file in sorted(Path(path).glob("*.tsv")):
+            from_lang, _, to_lang = file.stem.partition("-")
+            for line in file.read_text(encoding="utf-8").splitlines():
+                if not line.strip() or line.startswith("#"):
+                    continue
+                source, _, rest = line.partition("\t")
+                target, _, flag = rest.partition("\t")
+                loaded.append((from_lang, to_lang, source, target, flag.strip() == "oneway"))
+        for from_lang, to_lang, source, target, _ in loaded:
+            self.add(from_lang, to_lang, source, target)
+        # Derived reverse pairs never override an explicit file
+        for from_lang, to_lang, source, target, oneway in loaded:
+            if not oneway:
+                self.add(to_lang, from_lang, target, source, overwrite=False)
+        logger.info("Glossary loaded %d bundled entries from %s", len(loaded), path)
+        return len(loaded)
+
+    def load_custom_phrases(self, rows: Iterable[dict]) -> int:
+        """Add custom_phrases rows that have a translation, each to its provider_pin's overlay."""
+        count = 0
+        for row in rows:
+            translated = row.get("translated_text")
+            if not translated or not row.get("phrase_text"):
+                continue
+            count += self.add_custom(
+                row.get("provider_pin") or "",
+                row.get("from_lang") or "en",
+                row.get("to_lang") or "es",
+                row["phrase_text"],
+                translated,
+            )
+        return count
+
+    def _table(self, pair: str, pin: Optional[str]) -> Dict[str, Term]:
+        if pin is None:
+            return self._terms.get(pair, {})
+        return self._custom.get(pin, {}).get(pair, {})
+
+    def _matcher(self, pair: str, pin: Optional[str] = None) -> Optional[Tuple[TermMatcher, Dict[str, Term]]]:
+        compiled = self._matchers.get((pin, pair))
+        terms = self._table(pair, pin)
+        if compiled is None and terms:
+            by_key = {_fold(" ".join(t.source.split())): t for t in terms.values()}
+            compiled = self._matchers[(pin, pair)] = (TermMatcher(by_key), by_key)
+        return compiled
+
+    # ── Translation hooks ──────────────────────────────────────────
+    def lookup(self, text: str, from_lang: str, to_lang: str, pin: Optional[str] = None) -> Optional[str]:
+        """The glossary translation if the whole utterance is an entry (bundled, then pin's), else None."""
+        key = normalize_text(text).rstrip(".")
+        pair = f"{from_lang}-{to_lang}"
+        term = self._terms.get(pair, {}).get(key)
+        if term is None and pin:
+            term = self._table(pair, pin).get(key)
+        if term is None:
+            return None
+        self.exact_hits += 1
+        target = term.target
+        if text.strip()[:1].isupper():
+            target = target[:1].upper() + target[1:]
+        return target
+
+    def find(self, text: str, from_lang: str, to_lang: str, pin: Optional[str] = None) -> List[Term]:
+        """Bundled terms in the text, then the pin's custom ones."""
+        terms = self._find(text, f"{from_lang}-{to_lang}", None)
+        if pin:
+            terms += self._find(text, f"{from_lang}-{to_lang}", pin)
+        return terms
+
+    def has_custom(self, text: str, from_lang: str, to_lang: str, pin: Optional[str]) -> bool:
+        """True if the pin's custom entries shape this text's translation (so it is not shareable)."""
+        if not pin or pin not in self._custom:
+            return False
+        pair = f"{from_lang}-{to_lang}"
+        return normalize_text(text).rstrip(".") in self._table(pair, pin) or bool(self._find(text, pair, pin))
+
+    def _find(self, text: str, pair: str, pin: Optional[str]) -> List[Term]:
+        compiled = self._matcher(pair, pin)
+        if compiled is None:
+            return []
+        matcher, by_key = compiled
+        return list({key: by_key[key] for key in matcher.find(_fold(text))}.values())
+
+    def prompt_hint(self, texts: Iterable[str], from_lang: str, to_lang: str, pin: Optional[str] = None) -> str:
+        """Glossary lines for just the terms in these texts ("" when none match)."""
+        found: Dict[str, Term] = {}
+        for text in texts:
+            for term in self.find(text, from_lang, to_lang, pin):
+                found.setdefault(term.source, term)
+        if not found:
+            return ""
+        self.prompted += 1
+        lines = "\n".join(f"- {t.source} = {t.target}" for t in found.values())
+        return f"Use these glossary translations for the medical terms:\n{lines}"
+
+    def enforce(self, text: str, translation: str, from_lang: str, to_lang: str, pin: Optional[str] = None) -> str:
+        """
+        Check every glossary term in the source made it into the translation.
+        A term the model copied through untranslated is replaced in place;
+        anything else missing is only counted, since rewriting a sentence
+        around it needs the model.
+        """
+        folded = _fold(translation)
+        for term in self.find(text, from_lang, to_lang, pin):
+            if _fold(term.target) in folded:
+                continue
+            pos = _find_word(folded, _fold(term.source))
+            if pos < 0:
+                self.missing += 1
+                logger.debug("Glossary term missing from %s-%s output", from_lang, to_lang)
+                continue
+            translation = translation[:pos] + term.target + translation[pos + len(term.source):]
+            folded = _fold(translation)
+            self.repaired += 1
+        return translation
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "pairs": len(self._terms),
+            "terms": sum(len(t) for t in self._terms.values()),
+            "custom_pins": len(self._custom),
+            "custom_terms": sum(len(t) for pairs in self._custom.values() for t in pairs.values()),
+            "exact_hits": self.exact_hits,
+            "prompted": self.prompted,
+            "repaired": self.repaired,
+            "missing": self.missing,
+        }
@@ -1,9 +1,23 @@
 """
 HIPAA Audit Trail — logs session events locally (Supabase optional).
+Events are queued and written in bulk by a background task so logging never
+blocks the event loop. While Supabase is unreachable, batches spill to an
+encrypted local write-ahead file and are replayed once it recovers. A replay
+first moves the file aside under a unique name, and picks up files an
+interrupted replay left behind, so a crash mid-replay loses nothing.
 """
+import asyncio
+import base64
+import json
 import logging
+import os
+import uuid
 from datetime import datetime, timezone
-from typing import Any, Dict, Optional
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from ..metrics import AUDIT_WAL_ERRORS
+from .encryption import EncryptionManager
 
 logger = logging.getLogger("medtranslate.audit")
 
@@ -11,25 +25,62 @@ logger = logging.getLogger("medtranslate.audit")
 class AuditLogger:
     """Logs HIPAA-required audit events. Falls back to local logging if Supabase unavailable."""
 
-    def __init__(self):
-        self._supabase = None
-        self._init_attempted = False
+    def __init__(
+        self,
+        gateway=None,
+        table: str = "audit_trail",
+        batch_size: int = 50,
+        flush_interval: float = 2.0,
+        queue_size: int = 10000,
+        wal_path: str = "",
+        wal_key: str = "",
+        max_backoff: float = 300.0,
+    ):
+        self._gateway = gateway
+        self._table = table
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._task: Optional[asyncio.Task] = None
+        self._max_backoff = max_backoff
+        self._failures = 0
+        self._retry_at = 0.0
+        self._wal_path = Path(wal_path) if wal_path else None
+        self._crypto: Optional[EncryptionManager] = None
+        if self._wal_path:
+            if not wal_key:
+                logger.warning("No audit WAL key set — spilled events can only be replayed by this process")
+            self._crypto = EncryptionManager(base64.b64decode(wal_key) if wal_key else None)
+        self.written = 0
+        self.spilled = 0
+        self.dropped = 0
+
+    @property
+    def _persisting(self) -> bool:
+        return self._gateway is not None and self._gateway.configured
 
-    def _try_init_supabase(self):
-        if self._init_attempted:
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    async def start(self):
+        """Start the background writer. Called once during server startup."""
+        if self._persisting and self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info("Audit writer started (table=%s)", self._table)
+
+    async def shutdown(self, timeout: float = 30.0):
+        """Flush everything still queued, then stop the writer."""
+        if self._task is None:
             return
-        self._init_attempted = True
+        await self._queue.put(None)  # sentinel: writer exits once it reaches this
         try:
-            from supabase import create_client
-            from ..config import settings
-            if settings.supabase_url and settings.supabase_service_key:
-                self._supabase = create_client(
-                    settings.supabase_url,
-                    settings.supabase_service_key,
-                )
-                logger.info("Supabase audit logger connected")
-        except Exception as e:
-            logger.warning("Supabase not available: %s — audit logs local only", e)
+            await asyncio.wait_for(self._task, timeout)
+        except asyncio.TimeoutError:
+            logger.error("Audit writer did not drain within %.0fs", timeout)
+        self._task = None
+        logger.info("Audit writer stopped (%d written, %d spilled, %d dropped)",
+                    self.written, self.spilled, self.dropped)
 
     async def log(
         self,
@@ -41,14 +92,141 @@ class AuditLogger:
         """Log a HIPAA audit event. Never crashes — always logs locally."""
         logger.info("AUDIT: %s | session=%s | %s", event, session_id[:8], details)
 
-        # Optionally persist to Supabase
+        if not self._persisting:
+            return
+        row = {
+            "session_id": session_id,
+            "event_type": event,
+            "details": {**(details or {}), "logged_at": datetime.now(timezone.utc).isoformat()},
+        }
+        try:
+            self._queue.put_nowait(row)
+        except asyncio.QueueFull:
+            await self._spill([row])
+
+    # ── Background writer ──────────────────────────────────────────
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        await self._replay()  # anything spilled before the last restart
+        stopping = False
+        while not stopping:
+            first = await self._queue.get()
+            if first is None:
+                break
+            deadline = loop.time() + self._flush_interval
+            batch = [first]
+            while len(batch) < self._batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    row = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if row is None:
+                    stopping = True
+                    break
+                batch.append(row)
+            await self._write(batch)
+
+    async def _write(self, rows: List[Dict[str, Any]]):
+        """Bulk insert, or spill to the WAL while Supabase is failing / backing off."""
+        if asyncio.get_running_loop().time() < self._retry_at:
+            await self._spill(rows)
+            return
         try:
-            self._try_init_supabase()
-            if self._supabase:
-                self._supabase.table("audit_trail").insert({
-                    "session_id": session_id,
-                    "event_type": event,
-                    "details": details or {},
-                }).execute()
+            await self._gateway.insert(self._table, rows)
         except Exception as e:
-            logger.warning("Supabase audit write failed: %s", e)
+            self._failures += 1
+            backoff = min(self._max_backoff, self._flush_interval * 2 ** self._failures)
+            self._retry_at = asyncio.get_running_loop().time() + backoff
+            logger.warning("Supabase audit write failed (%d in a row, backing off %.0fs): %s",
+                           self._failures, backoff, e)
+            await self._spill(rows)
+            return
+
+        self.written += len(rows)
+        if self._failures:
+            logger.info("Supabase audit writes recovered after %d failures", self._failures)
+            self._failures = 0
+            await self._replay()
+
+    # ── Encrypted write-ahead file ─────────────────────────────────
+    async def _spill(self, rows: List[Dict[str, Any]]):
+        """Append rows to the WAL. A disk error is logged and counted, never raised."""
+        if self._wal_path is None:
+            self.dropped += len(rows)
+            return
+        nonce, ciphertext = self._crypto.encrypt(json.dumps(rows).encode("utf-8"))
+        line = base64.b64encode(nonce + ciphertext) + b"\n"
+        try:
+            await asyncio.to_thread(self._append_wal, line)
+        except OSError as e:
+            self.dropped += len(rows)
+            AUDIT_WAL_ERRORS.labels("spill").inc()
+            logger.error("Audit WAL write failed, %d events lost: %s", len(rows), e)
+            return
+        self.spilled += len(rows)
+
+    def _append_wal(self, line: bytes):
+        self._wal_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self._wal_path, "ab") as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+    async def _replay(self):
+        """Re-send spilled batches now that Supabase accepts writes again."""
+        if self._wal_path is None:
+            return
+        try:
+            if self._wal_path.exists():
+                # New spills go to a fresh WAL while this one is replayed
+                claimed = self._wal_path.with_name(f"{self._wal_path.name}.{uuid.uuid4().hex[:12]}.replay")
+                await asyncio.to_thread(os.replace, self._wal_path, claimed)
+            for path in await asyncio.to_thread(self._replay_files):
+                if not await self._replay_file(path):
+                    break
+        except OSError as e:
+            AUDIT_WAL_ERRORS.labels("replay").inc()
+            logger.error("Audit WAL replay failed, will retry after the next recovery: %s", e)
+
+    def _replay_files(self) -> List[Path]:
+        """Files waiting to be replayed, oldest first (including ones an interrupted replay left)."""
+        wal = self._wal_path
+        files = list(wal.parent.glob(f"{wal.name}.*.replay"))
+        legacy = wal.with_suffix(".replay")  # the single fixed name used before
+        if legacy.exists():
+            files.append(legacy)
+        return sorted(files, key=lambda path: path.stat().st_mtime)
+
+    async def _replay_file(self, replaying: Path) -> bool:
+        """Send one moved-aside WAL. Returns False if Supabase failed again (the rest stays on disk)."""
+        lines = (await asyncio.to_thread(replaying.read_bytes)).splitlines()
+        for index, line in enumerate(lines):
+            try:
+                blob = base64.b64decode(line)
+                rows = json.loads(self._crypto.decrypt(blob[:12], blob[12:]))
+            except Exception as e:
+                logger.error("Skipping unreadable audit WAL entry: %s", e)
+                continue
+            try:
+                await self._gateway.insert(self._table, rows)
+                self.written += len(rows)
+            except Exception as e:
+                logger.warning("Audit WAL replay interrupted: %s", e)
+                # Keep only what was not sent, in place, for the next replay
+                await asyncio.to_thread(self._rewrite, replaying, lines[index:])
+                return False
+        await asyncio.to_thread(replaying.unlink)
+        logger.info("Audit WAL replayed (%s)", replaying.name)
+        return True
+
+    @staticmethod
+    def _rewrite(path: Path, lines: List[bytes]):
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(b"".join(line + b"\n" for line in lines))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
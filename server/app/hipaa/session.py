@@ -1,69 +1,244 @@
 """
 Session Manager — in-memory session tracking with HIPAA-compliant cleanup.
-No PHI is stored in sessions — only metadata (IDs, languages, timestamps).
+No PHI is persisted — sessions hold metadata (IDs, languages, timestamps)
+plus an in-memory ConversationContext of recent turns that dies with them.
+Sessions expire after session_timeout_minutes without activity or
+max_session_duration_minutes in total, whichever comes first. Expiry is
+driven by a min-heap of deadlines drained by a background reaper, so each
+eviction is O(log n) and nothing scans the whole table. Recently closed
+session IDs remember why they closed (ended by a user, or timed out), so a
+late message on one gets the right error.
+This is the single-process backend; session_redis.RedisSessionManager has
+the same interface for running several workers behind a load balancer.
 """
+import asyncio
+import heapq
 import logging
+import time
+from collections import OrderedDict
 from datetime import datetime, timezone
-from dataclasses import dataclass, field
-from typing import Dict, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from ..context import ConversationContext
 
 logger = logging.getLogger("medtranslate.session")
 
+ENDED = "ended"  # close reason for end()/release(); expiry uses "idle" or "max_duration"
+_MAX_CLOSED = 10000  # closed session IDs remembered for closed_reason()
+
 
-@dataclass
 class Session:
-    session_id: str
-    from_lang: str
-    to_lang: str
-    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
-    active: bool = True
-    _end_time: datetime = None
+    __slots__ = (
+        "session_id", "from_lang", "to_lang", "created_at", "active",
+        "connections", "context", "_end_time", "_started", "_last_activity",
+    )
+
+    def __init__(self, session_id: str, from_lang: str, to_lang: str, context_tokens: int = 512):
+        self.session_id = session_id
+        self.from_lang = from_lang
+        self.to_lang = to_lang
+        self.created_at = datetime.now(timezone.utc)
+        self.active = True
+        self.connections = 0  # devices (WebSockets) currently attached
+        self.context = ConversationContext(context_tokens)
+        self._end_time: Optional[datetime] = None
+        # Monotonic clocks for expiry, immune to wall-clock jumps
+        self._started = time.monotonic()
+        self._last_activity = self._started
 
     @property
     def duration_seconds(self) -> int:
         end = self._end_time or datetime.now(timezone.utc)
         return int((end - self.created_at).total_seconds())
 
+    def deadline(self, idle_timeout: float, max_duration: float) -> Tuple[float, str]:
+        """When this session expires, and why."""
+        idle = self._last_activity + idle_timeout
+        hard = self._started + max_duration
+        return (idle, "idle") if idle < hard else (hard, "max_duration")
 
-class SessionManager:
-    """Manages active translation sessions in-memory."""
+
+class SessionEvents:
+    """Fans session messages out to the subscribers in this process."""
 
     def __init__(self):
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+
+    def deliver(self, session_id: str, message: Dict[str, Any]):
+        for queue in self._subscribers.get(session_id, ()):
+            queue.put_nowait(message)
+
+    async def subscribe(self, session_id: str) -> AsyncIterator[Dict[str, Any]]:
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(session_id, set()).add(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            subscribers = self._subscribers.get(session_id)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[session_id]
+
+
+class SessionManager:
+    """Manages active translation sessions in-memory (one worker process)."""
+
+    def __init__(
+        self,
+        timeout_minutes: float = 30,
+        max_duration_minutes: float = 120,
+        audit=None,
+        reap_interval: float = 30.0,
+        context_tokens: int = 512,
+    ):
         self._sessions: Dict[str, Session] = {}
+        self._context_tokens = context_tokens
+        self._idle_timeout = timeout_minutes * 60
+        self._max_duration = max_duration_minutes * 60
+        self._audit = audit
+        self._reap_interval = reap_interval
+        # (deadline, session_id); entries go stale when a session is touched
+        # or ended and are re-checked against the live session when popped
+        self._expiry: List[Tuple[float, str]] = []
+        self._reaper: Optional[asyncio.Task] = None
+        self._events = SessionEvents()
+        self._closed: "OrderedDict[str, str]" = OrderedDict()  # session id -> close reason, oldest first
+        self.timed_out = 0
+
+    async def start(self):
+        self._reaper = asyncio.create_task(self._reap_loop())
+
+    async def shutdown(self):
+        if self._reaper:
+            self._reaper.cancel()
+            try:
+                await self._reaper
+            except asyncio.CancelledError:
+                pass
 
     async def create(self, session_id: str, from_lang: str, to_lang: str) -> Session:
+        session = self._sessions.get(session_id)
+        if session is not None:
+            # Reconnect with the same ID: keep the original start time so
+            # the max-duration limit can't be reset by reconnecting
+            session.from_lang, session.to_lang = from_lang, to_lang
+            session.connections += 1
+            await self.touch(session_id)
+            return session
+
+        self._closed.pop(session_id, None)  # the ID is being reused
         session = Session(
             session_id=session_id,
             from_lang=from_lang,
             to_lang=to_lang,
+            context_tokens=self._context_tokens,
         )
+        session.connections = 1
         self._sessions[session_id] = session
+        heapq.heappush(self._expiry, (session.deadline(self._idle_timeout, self._max_duration)[0], session_id))
         logger.info(f"Session created: {session_id[:8]}… ({from_lang}→{to_lang})")
         return session
 
-    def is_active(self, session_id: str) -> bool:
+    async def touch(self, session_id: str) -> bool:
+        """Record activity. Returns False if the session is unknown or has expired."""
         session = self._sessions.get(session_id)
-        return session is not None and session.active
+        if session is None:
+            return False
+        # The heap entry is not moved: the reaper reschedules it lazily
+        session._last_activity = time.monotonic()
+        return True
 
-    async def end(self, session_id: str):
+    async def is_active(self, session_id: str) -> bool:
         session = self._sessions.get(session_id)
+        return session is not None and session.active
+
+    async def end(self, session_id: str, reason: str = ENDED):
+        session = self._sessions.pop(session_id, None)
         if session:
+            self._closed[session_id] = reason
+            if len(self._closed) > _MAX_CLOSED:
+                self._closed.popitem(last=False)
             session.active = False
             session._end_time = datetime.now(timezone.utc)
+            session.context.clear()
             logger.info(f"Session ended: {session_id[:8]}… ({session.duration_seconds}s)")
 
-    def get_duration(self, session_id: str) -> int:
+    async def release(self, session_id: str) -> bool:
+        """
+        Detach one connection (e.g. a WebSocket closing). The session ends
+        when its last device leaves. Returns True if it ended.
+        """
+        session = self._sessions.get(session_id)
+        if session is None:
+            return False
+        session.connections -= 1
+        if session.connections > 0:
+            return False
+        await self.end(session_id)
+        return True
+
+    async def closed_reason(self, session_id: str) -> Optional[str]:
+        """Why a recently closed session closed: ENDED, "idle" or "max_duration"; None if not known."""
+        return self._closed.get(session_id)
+
+    async def get_duration(self, session_id: str) -> int:
         session = self._sessions.get(session_id)
         return session.duration_seconds if session else 0
 
-    def cleanup_expired(self, max_age_minutes: int = 120):
-        """Remove sessions older than max_age_minutes."""
-        now = datetime.now(timezone.utc)
-        expired = [
-            sid for sid, s in self._sessions.items()
-            if not s.active and (now - s.created_at).total_seconds() > max_age_minutes * 60
-        ]
-        for sid in expired:
-            del self._sessions[sid]
+    async def active_count(self) -> int:
+        return len(self._sessions)
+
+    def context(self, session_id: str) -> Optional[ConversationContext]:
+        """The session's rolling translation context, or None if it has ended."""
+        session = self._sessions.get(session_id)
+        return session.context if session else None
+
+    # ── Session event stream ───────────────────────────────────────
+    async def publish(self, session_id: str, message: Dict[str, Any]):
+        """Send a message to every connection subscribed to the session."""
+        self._events.deliver(session_id, message)
+
+    def subscribe(self, session_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """Messages published to the session, until the consumer stops iterating."""
+        return self._events.subscribe(session_id)
+
+    async def reap(self, now: Optional[float] = None) -> int:
+        """Expire every session whose deadline has passed. Returns how many were expired."""
+        now = time.monotonic() if now is None else now
+        expired = 0
+        while self._expiry and self._expiry[0][0] <= now:
+            _, session_id = heapq.heappop(self._expiry)
+            session = self._sessions.get(session_id)
+            if session is None:
+                continue  # ended normally; stale entry
+            deadline, reason = session.deadline(self._idle_timeout, self._max_duration)
+            if deadline > now:
+                heapq.heappush(self._expiry, (deadline, session_id))  # touched since scheduled
+                continue
+            duration = session.duration_seconds
+            await self.end(session_id, reason)
+            expired += 1
+            self.timed_out += 1
+            if self._audit is not None:
+                await self._audit.log("session_timeout", session_id, {
+                    "reason": reason,
+                    "duration_seconds": duration,
+                })
         if expired:
-            logger.info(f"Cleaned up {len(expired)} expired sessions")
+            logger.info(f"Expired {expired} sessions")
+        return expired
+
+    async def _reap_loop(self):
+        while True:
+            # New deadlines are never earlier than the current heap top, so
+            # sleeping until it is exact; the interval just bounds the wait
+            delay = self._reap_interval
+            if self._expiry:
+                delay = min(delay, max(0.0, self._expiry[0][0] - time.monotonic()))
+            await asyncio.sleep(delay)
+            try:
+                await self.reap()
+            except Exception as e:
+                logger.error("Session reaper error: %s", e)
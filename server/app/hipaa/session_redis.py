@@ -0,0 +1,259 @@
+"""
+Redis Session Manager — shared session state for several server workers.
+Same interface as SessionManager, backed by Redis so any worker (or node
+behind a load balancer) sees every session:
+
+  {prefix}:session:<id>    hash: from, to, created, last, connections
+  {prefix}:deadlines       sorted set: session id scored by expiry time
+  {prefix}:events:<id>     pub/sub channel carrying the session's messages
+  {prefix}:closed:<id>     why a recently closed session closed (expires)
+
+Every worker runs a reaper over the deadline set; ZREM decides which one
+handles an expiry, so each session_timeout is audited exactly once. Each
+worker holds one pattern subscription to all session channels and fans
+messages out to its local WebSockets. Translation text crosses pub/sub but
+is never stored in Redis — keep Redis inside the HIPAA boundary and use
+TLS (rediss://) between nodes. For the same reason each worker keeps its
+own ConversationContext per session, covering the turns it translated.
+Requires the optional `redis` package (redis.asyncio).
+"""
+import asyncio
+import json
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+import redis.asyncio as redis
+
+from ..context import ConversationContext
+from .session import ENDED, SessionEvents
+
+logger = logging.getLogger("medtranslate.session")
+
+_REAP_BATCH = 100
+
+
+class RedisSessionManager:
+    """Manages active translation sessions in Redis, shared by all workers."""
+
+    def __init__(
+        self,
+        url: str,
+        timeout_minutes: float = 30,
+        max_duration_minutes: float = 120,
+        audit=None,
+        reap_interval: float = 5.0,
+        prefix: str = "medtranslate",
+        client: Optional["redis.Redis"] = None,
+        context_tokens: int = 512,
+    ):
+        self._url = url
+        self._redis: Optional[redis.Redis] = client
+        self._idle_timeout = timeout_minutes * 60
+        self._max_duration = max_duration_minutes * 60
+        self._audit = audit
+        self._reap_interval = reap_interval
+        self._prefix = prefix
+        self._deadlines = f"{prefix}:deadlines"
+        self._events = SessionEvents()
+        self._context_tokens = context_tokens
+        # session id -> (local connections, context); worker-local, never in Redis
+        self._contexts: Dict[str, Tuple[int, ConversationContext]] = {}
+        self._pubsub = None
+        self._tasks = []
+        self.timed_out = 0
+
+    async def start(self):
+        if self._redis is None:
+            self._redis = redis.from_url(self._url, decode_responses=True)
+        await self._redis.ping()
+        self._pubsub = self._redis.pubsub()
+        await self._pubsub.psubscribe(self._channel("*"))
+        self._tasks = [
+            asyncio.create_task(self._reap_loop()),
+            asyncio.create_task(self._listen()),
+        ]
+        logger.info("Redis session store ready (prefix=%s)", self._prefix)
+
+    async def shutdown(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+        if self._redis is not None:
+            await self._redis.aclose()
+
+    # ── Keys ───────────────────────────────────────────────────────
+    def _key(self, session_id: str) -> str:
+        return f"{self._prefix}:session:{session_id}"
+
+    def _channel(self, session_id: str) -> str:
+        return f"{self._prefix}:events:{session_id}"
+
+    def _closed_key(self, session_id: str) -> str:
+        return f"{self._prefix}:closed:{session_id}"
+
+    @property
+    def _retention(self) -> int:
+        """Seconds a session key (or its closed marker) may outlive the reapers."""
+        return int(self._max_duration) + 3600
+
+    def _deadline(self, created: float, last: float) -> Tuple[float, str]:
+        idle = last + self._idle_timeout
+        hard = created + self._max_duration
+        return (idle, "idle") if idle < hard else (hard, "max_duration")
+
+    # ── Sessions ───────────────────────────────────────────────────
+    async def create(self, session_id: str, from_lang: str, to_lang: str) -> None:
+        """Create the session, or attach another device to an existing one."""
+        key = self._key(session_id)
+        now = time.time()
+        async with self._redis.pipeline(transaction=True) as pipe:
+            # HSETNX keeps the original start time on reconnects / second devices
+            pipe.hsetnx(key, "created", now)
+            pipe.hset(key, mapping={"from": from_lang, "to": to_lang, "last": now})
+            pipe.hincrby(key, "connections", 1)
+            pipe.hget(key, "created")
+            # Backstop so a key can't outlive every reaper (e.g. all workers down)
+            pipe.expire(key, self._retention)
+            pipe.delete(self._closed_key(session_id))  # the ID is being reused
+            is_new, _, _, created, _, _ = await pipe.execute()
+        await self._redis.zadd(self._deadlines, {session_id: self._deadline(float(created), now)[0]})
+        local, context = self._contexts.get(session_id, (0, None))
+        self._contexts[session_id] = (local + 1, context or ConversationContext(self._context_tokens))
+        if is_new:
+            logger.info(f"Session created: {session_id[:8]}… ({from_lang}→{to_lang})")
+
+    async def touch(self, session_id: str) -> bool:
+        """Record activity. Returns False if the session is unknown or has expired."""
+        key = self._key(session_id)
+        created = await self._redis.hget(key, "created")
+        if created is None:
+            return False
+        now = time.time()
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.hset(key, "last", now)
+            pipe.expire(key, self._retention)  # in case end() raced us
+            pipe.zadd(self._deadlines, {session_id: self._deadline(float(created), now)[0]})
+            await pipe.execute()
+        return True
+
+    async def is_active(self, session_id: str) -> bool:
+        return bool(await self._redis.exists(self._key(session_id)))
+
+    async def end(self, session_id: str, reason: str = ENDED):
+        duration = await self.get_duration(session_id)
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.delete(self._key(session_id))
+            pipe.zrem(self._deadlines, session_id)
+            deleted, _ = await pipe.execute()
+        self._contexts.pop(session_id, None)
+        if deleted:
+            await self._redis.set(self._closed_key(session_id), reason, ex=self._retention)
+            logger.info(f"Session ended: {session_id[:8]}… ({duration}s)")
+
+    async def release(self, session_id: str) -> bool:
+        """Detach one connection; the session ends when its last device leaves."""
+        key = self._key(session_id)
+        local, context = self._contexts.pop(session_id, (0, None))
+        if local > 1:
+            self._contexts[session_id] = (local - 1, context)
+        if not await self._redis.exists(key):
+            return False
+        if await self._redis.hincrby(key, "connections", -1) > 0:
+            return False
+        await self.end(session_id)
+        return True
+
+    async def closed_reason(self, session_id: str) -> Optional[str]:
+        """Why a recently closed session closed: ENDED, "idle" or "max_duration"; None if not known."""
+        return await self._redis.get(self._closed_key(session_id))
+
+    async def get_duration(self, session_id: str) -> int:
+        created = await self._redis.hget(self._key(session_id), "created")
+        return int(time.time() - float(created)) if created is not None else 0
+
+    async def active_count(self) -> int:
+        return await self._redis.zcard(self._deadlines)
+
+    def context(self, session_id: str) -> Optional[ConversationContext]:
+        """This worker's rolling translation context for the session, if it has a connection on it."""
+        entry = self._contexts.get(session_id)
+        return entry[1] if entry else None
+
+    # ── Session event stream ───────────────────────────────────────
+    async def publish(self, session_id: str, message: Dict[str, Any]):
+        """Send a message to every connection on the session, on any worker."""
+        await self._redis.publish(self._channel(session_id), json.dumps(message))
+
+    def subscribe(self, session_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """Messages published to the session, until the consumer stops iterating."""
+        return self._events.subscribe(session_id)
+
+    async def _listen(self):
+        prefix = self._channel("")
+        while True:
+            try:
+                async for message in self._pubsub.listen():
+                    if message.get("type") != "pmessage":
+                        continue
+                    session_id = message["channel"][len(prefix):]
+                    self._events.deliver(session_id, json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Session pub/sub listener error: %s", e)
+                await asyncio.sleep(1.0)
+
+    # ── Expiry ─────────────────────────────────────────────────────
+    async def reap(self, now: Optional[float] = None) -> int:
+        """Expire every due session this worker manages to claim."""
+        now = time.time() if now is None else now
+        expired = 0
+        while True:
+            due = await self._redis.zrangebyscore(self._deadlines, "-inf", now, start=0, num=_REAP_BATCH)
+            if not due:
+                break
+            for session_id in due:
+                if not await self._redis.zrem(self._deadlines, session_id):
+                    continue  # another worker claimed it
+                key = self._key(session_id)
+                created, last = await self._redis.hmget(key, "created", "last")
+                if created is None:
+                    continue
+                deadline, reason = self._deadline(float(created), float(last))
+                if deadline > now:
+                    await self._redis.zadd(self._deadlines, {session_id: deadline})  # touched meanwhile
+                    continue
+                async with self._redis.pipeline(transaction=True) as pipe:
+                    pipe.delete(key)
+                    pipe.set(self._closed_key(session_id), reason, ex=self._retention)
+                    await pipe.execute()
+                self._contexts.pop(session_id, None)
+                expired += 1
+                self.timed_out += 1
+                logger.info(f"Session expired: {session_id[:8]}… ({reason})")
+                if self._audit is not None:
+                    await self._audit.log("session_timeout", session_id, {
+                        "reason": reason,
+                        "duration_seconds": int(now - float(created)),
+                    })
+            if len(due) < _REAP_BATCH:
+                break
+        return expired
+
+    async def _reap_loop(self):
+        while True:
+            delay = self._reap_interval
+            try:
+                head = await self._redis.zrange(self._deadlines, 0, 0, withscores=True)
+                if head:
+                    delay = min(delay, max(0.0, head[0][1] - time.time()))
+            except Exception as e:
+                logger.error("Session reaper error: %s", e)
+            await asyncio.sleep(delay)
+            try:
+                await self.reap()
+            except Exception as e:
+                logger.error("Session reaper error: %s", e)
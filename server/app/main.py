@@ -3,40 +3,185 @@ MedTranslate — FastAPI Server
 WebSocket endpoint for real-time medical translation.
 Client does ASR via Web Speech API, server translates via NVIDIA NIM.
 """
+import asyncio
+import hashlib
+import hmac
 import logging
+import math
+import time
 from datetime import datetime, timezone
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, File, Form, UploadFile, HTTPException, Response
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, File, Form, UploadFile, HTTPException, Request, Response
 from pydantic import BaseModel
 import httpx
 import uuid
+from typing import AsyncIterator
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
 
 from .config import settings
 from .hipaa.audit import AuditLogger
-from .hipaa.session import SessionManager
+from .hipaa.session import ENDED, SessionManager
+from . import metrics
+from .supabase_gateway import SupabaseGateway
 from .translation import TranslationPipeline
+from .audio import AUDIO_FORMATS, STREAMABLE_FORMATS, finalize_wav, negotiate_format
+from .tts_cache import TTSCache
+from .tts_executor import TTSOverloaded
+from .tts_tickets import TTSTickets
+from .uploads import TUS_CHUNK_SIZE, ResumableUploadRegistry, UploadTooLarge, iter_body, iter_upload_file
+from .admission import BACKGROUND, UpstreamBusy
+from .singleflight import SingleFlight
+from .speculation import SpeculativeTranslator
+from .startup import StartupProfile, shared_ssl_context
+from .ws_scheduler import ConnectionScheduler
+
+_IMPORT_CPU_SECONDS = time.process_time()  # interpreter start + everything imported above
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
 logger = logging.getLogger("medtranslate")
 
+TRAINING_BUCKET = "voice-training-bucket"
+
 
 @asynccontextmanager
 async def lifespan(app):
     logger.info("MedTranslate server starting...")
+    profile = app.state.startup = StartupProfile(_IMPORT_CPU_SECONDS)
     app.state.translation = TranslationPipeline()
-    await app.state.translation.initialize()
-    app.state.audit = AuditLogger()
-    app.state.sessions = SessionManager()
-    app.state.http = httpx.AsyncClient(timeout=30.0)
+    app.state.background = set()
+    app.state.presynthesis = {}  # lang -> running phrase-library synthesis task
+    app.state.tts_cache = TTSCache(
+        memory_bytes=settings.tts_cache_memory_mb * 1024 * 1024,
+        disk_dir=settings.tts_cache_dir,
+        disk_bytes=settings.tts_cache_disk_mb * 1024 * 1024,
+    )
+    app.state.tts_flights = SingleFlight("tts")
+    app.state.tts_tickets = TTSTickets(settings.tts_ticket_key)
+    app.state.local_tts = None
+    if settings.local_tts_enabled:
+        from .tts import LocalTTS  # needs numpy (torch/transformers load later, with the model)
+        app.state.local_tts = LocalTTS(
+            model_id=settings.tts_voice_id,
+            executor=settings.local_tts_executor,
+            workers=settings.local_tts_workers,
+            threads_per_worker=settings.local_tts_threads_per_worker,
+            max_queue=settings.local_tts_max_queue,
+            max_batch_size=settings.local_tts_batch_size,
+            max_batch_wait_ms=settings.local_tts_batch_wait_ms,
+            output_rate=settings.tts_sample_rate,
+            engine=settings.local_tts_engine,
+            engine_dir=settings.local_tts_engine_dir,
+            parity_min_snr_db=settings.local_tts_parity_min_snr_db,
+        )
+        # Without a Modal fallback there is no Haitian Creole TTS until the model is loaded
+        # (lazy loading opts out: nothing would ever route the first request here)
+        profile.register("local_tts", required=not settings.modal_tts_url and not settings.local_tts_lazy)
+    app.state.http = httpx.AsyncClient(timeout=30.0, verify=shared_ssl_context())
+    app.state.supabase = SupabaseGateway(
+        settings.supabase_url,
+        settings.supabase_service_key,
+        max_connections=settings.supabase_max_connections,
+    )
+    app.state.uploads = ResumableUploadRegistry()
+    app.state.audit = AuditLogger(
+        app.state.supabase,
+        table=settings.audit_table,
+        batch_size=settings.audit_batch_size,
+        flush_interval=settings.audit_flush_interval_seconds,
+        wal_path=settings.audit_wal_path,
+        wal_key=settings.audit_wal_key,
+    )
+    if settings.session_backend == "redis":
+        from .hipaa.session_redis import RedisSessionManager  # needs the optional redis package
+        app.state.sessions = RedisSessionManager(
+            settings.redis_url,
+            timeout_minutes=settings.session_timeout_minutes,
+            max_duration_minutes=settings.max_session_duration_minutes,
+            audit=app.state.audit,
+            context_tokens=settings.translation_context_tokens,
+        )
+    else:
+        app.state.sessions = SessionManager(
+            timeout_minutes=settings.session_timeout_minutes,
+            max_duration_minutes=settings.max_session_duration_minutes,
+            audit=app.state.audit,
+            context_tokens=settings.translation_context_tokens,
+        )
+
+    # Independent services start concurrently; the audit writer needs the gateway up first
+    async def storage():
+        await profile.run("supabase", app.state.supabase.initialize())
+        await profile.run("audit", app.state.audit.start())
+
+    await asyncio.gather(
+        profile.run("translation", app.state.translation.initialize()),
+        storage(),
+        profile.run("sessions", app.state.sessions.start()),
+    )
+    profile.background("phrases", _load_custom_phrases(app), app.state.background)
+    if app.state.local_tts is not None and not settings.local_tts_lazy:
+        _warm_local_tts(app)
+    profile.serving()
     logger.info("All services initialized")
     yield
+    for task in list(app.state.background):
+        task.cancel()
+    await app.state.sessions.shutdown()
+    await app.state.audit.shutdown()
+    await app.state.supabase.shutdown()
     await app.state.http.aclose()
+    if app.state.local_tts is not None:
+        await app.state.local_tts.shutdown()
     await app.state.translation.shutdown()
     logger.info("MedTranslate server stopped")
 
 
+def _warm_local_tts(app):
+    """Start loading the local TTS model in the background, once. Until it is ready TTS goes to Modal."""
+    if app.state.startup.state("local_tts") == "pending":
+        app.state.startup.background("local_tts", _start_local_tts(app.state.local_tts), app.state.background)
+
+
+async def _start_local_tts(local_tts):
+    await local_tts.initialize()
+    if not local_tts.is_ready:
+        raise RuntimeError("MMS model failed to load")
+
+
+async def _load_custom_phrases(app):
+    """Background: add translated custom phrases to their PINs' glossaries, then pre-warm the cache."""
+    glossary = app.state.translation.glossary
+    if glossary is not None and app.state.supabase.configured:
+        try:
+            rows = await app.state.supabase.select(
+                "custom_phrases",
+                {
+                    "select": "provider_pin,phrase_text,translated_text,from_lang,to_lang",
+                    "translated_text": "not.is.null",
+                },
+            )
+            logger.info("Glossary loaded %d custom phrases", glossary.load_custom_phrases(rows))
+        except Exception as e:
+            logger.warning("Custom phrase glossary load failed: %s", e)
+    await _prewarm_translation_cache(app)
+
+
+async def _prewarm_translation_cache(app):
+    """Background: translate the Supabase custom phrase list so it is served from cache."""
+    pipeline = app.state.translation
+    pairs = [p.strip() for p in settings.translation_cache_prewarm_pairs.split(",") if p.strip()]
+    if not pipeline.cache or not pairs or not app.state.supabase.configured:
+        return
+    try:
+        rows = await app.state.supabase.select("custom_phrases", {"select": "phrase_text"})
+        phrases = sorted({row["phrase_text"] for row in rows if row.get("phrase_text")})
+        await pipeline.prewarm(phrases, pairs)
+    except Exception as e:
+        logger.warning("Translation cache pre-warm failed: %s", e)
+
+
 app = FastAPI(
     title="MedTranslate",
     description="HIPAA-Compliant Real-Time Medical Translation",
@@ -61,43 +206,338 @@ async def health():
     }
 
 
+@app.get("/ready")
+async def ready():
+    """Readiness: 200 once every required subsystem is warm, else 503. Lists each subsystem's state."""
+    report = app.state.startup.report()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Prometheus scrape endpoint. Gauges owned by other components are sampled here."""
+    metrics.SESSIONS_ACTIVE.set(await app.state.sessions.active_count())
+    metrics.AUDIT_QUEUE_DEPTH.set(app.state.audit.queue_depth)
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.get("/api/stats")
+async def service_stats():
+    pipeline = app.state.translation
+    return {
+        "translation_cache": pipeline.cache.stats() if pipeline.cache else None,
+        "translation_batching": pipeline.batcher.stats() if pipeline.batcher else None,
+        "translation_router": pipeline.router.stats(),
+        "translation_prompts": pipeline.stats(),
+        "glossary": pipeline.glossary.stats() if pipeline.glossary else None,
+        "supabase_pool": app.state.supabase.stats(),
+        "audit_queue_depth": app.state.audit.queue_depth,
+        "sessions": {
+            "active": await app.state.sessions.active_count(),
+            "timed_out": app.state.sessions.timed_out,
+        },
+        "tts_cache": app.state.tts_cache.stats(),
+        "coalescing": {
+            "translation": pipeline.flights.stats(),
+            "tts": app.state.tts_flights.stats(),
+        },
+        "upstream_admission": pipeline.admission.stats(),
+        "local_tts": app.state.local_tts.executor.stats() if app.state.local_tts else None,
+        "startup": app.state.startup.report(),
+    }
+
+
 # ── TTS Proxy (forwards to Modal serverless function) ───────────────
 class TTSRequest(BaseModel):
     text: str
     lang: str = "ht"
+    stream: bool = False
+    format: str | None = None  # "wav" | "opus" | "mp3"; default: negotiated from Accept
 
 
 @app.post("/api/tts")
-async def text_to_speech(req: TTSRequest):
+async def text_to_speech(req: TTSRequest, request: Request):
     """
     Proxy TTS requests to Modal serverless endpoint.
     Modal runs the Meta MMS model on-demand (scales to zero when idle).
+    With "stream": true the audio is relayed sentence by sentence as it is synthesized.
+    """
+    fmt = _tts_format(request, req.format, req.lang, req.stream)
+    return await _synthesize_speech(req.text, req.lang, req.stream, fmt, request.headers.get("if-none-match"))
+
+
+@app.post("/api/tts/tickets")
+async def create_tts_ticket(req: TTSRequest, request: Request):
     """
+    Seal a TTS request into a URL, so an <audio> element can start playing
+    while the stream arrives. The text stays in this POST body; the URL only
+    carries the encrypted ticket (the same one every time for the same
+    request, on every worker). Media elements send Accept: */*,
+    so pick a compressed format with "format" instead.
+    """
+    fmt = _tts_format(request, req.format, req.lang, req.stream)
+    ticket = app.state.tts_tickets.issue(req.text, req.lang, req.stream, fmt)
+    return {"ticket": ticket, "url": f"/api/tts/audio/{ticket}", "format": fmt}
+
+
+@app.get("/api/tts/audio/{ticket}")
+async def text_to_speech_ticket(ticket: str, request: Request):
+    """Audio for a request registered with POST /api/tts/tickets."""
+    pending = app.state.tts_tickets.get(ticket)
+    if pending is None:
+        raise HTTPException(status_code=404, detail="Unknown TTS ticket")
+    return await _synthesize_speech(
+        pending.text, pending.lang, pending.stream, pending.fmt, request.headers.get("if-none-match")
+    )
+
+
+@app.post("/api/tts/presynthesize")
+async def presynthesize_phrases(request: Request, lang: str = "ht"):
+    """
+    Kick off background synthesis of the phrase library into the persistent
+    TTS cache. Admin only; while a run for the language is going, repeated
+    calls report it instead of starting another.
+    """
+    _require_admin(request)
+    running = app.state.presynthesis.get(lang)
+    if running is not None:
+        return {"status": "running", "lang": lang}
+    task = asyncio.create_task(_presynthesize_phrase_library(lang))
+    app.state.presynthesis[lang] = task
+    app.state.background.add(task)
+    task.add_done_callback(app.state.background.discard)
+    task.add_done_callback(lambda _: app.state.presynthesis.pop(lang, None))
+    return {"status": "started", "lang": lang}
+
+
+def _require_admin(request: Request):
+    """403 unless the request carries the configured admin token."""
+    token = request.headers.get("x-admin-token", "")
+    if not settings.admin_token or not hmac.compare_digest(token.encode(), settings.admin_token.encode()):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+def _tts_format(request: Request, requested: str | None, lang: str, stream: bool) -> str:
+    """Output format: the explicit request if the backend can produce it, else negotiated from Accept."""
+    available = [f.strip() for f in settings.tts_formats.split(",") if f.strip() in AUDIO_FORMATS]
+    if _use_local_tts(lang):
+        available = [f for f in available if f in app.state.local_tts.formats]
+    if stream:
+        available = [f for f in available if f in STREAMABLE_FORMATS]
+    if requested:
+        return requested if requested in available else "wav"
+    return negotiate_format(request.headers.get("accept"), available)
+
+
+async def _synthesize_speech(
+    text: str, lang: str, stream: bool, fmt: str = "wav", if_none_match: str | None = None
+):
+    """
+    Serve TTS through the content-addressed cache. The ETag is derived from
+    the request alone, so a matching If-None-Match is answered with 304
+    before touching any tier. A freshly streamed WAV carries no ETag: its
+    header has open-ended sizes, so its bytes differ from the finalized copy
+    that gets cached, and only those final bytes are ever tagged.
+    """
+    cache = app.state.tts_cache
+    key = cache.make_key(text, lang, settings.tts_voice_id, fmt, settings.tts_sample_rate)
+    media_type = AUDIO_FORMATS[fmt]
+    # Clients may keep phrase-library audio (always revalidated; 304s are cheap).
+    # Live utterances may be PHI and are not stored on the device at all.
+    phrase = not settings.tts_cache_persist_live and cache.persisted(key)
+    headers = {
+        "Content-Disposition": "inline",
+        "ETag": cache.etag(key),
+        "Cache-Control": "private, no-cache" if phrase else "no-store",
+        "Vary": "Accept",
+    }
+    if if_none_match and cache.etag(key) in if_none_match:
+        cache.not_modified += 1
+        return Response(status_code=304, headers=headers)
+
+    audio = cache.get(key)
+    if audio is not None:
+        return Response(content=audio, media_type=media_type, headers=headers)
+    path = cache.get_path(key)
+    if path is not None:
+        return FileResponse(path, media_type=media_type, headers=headers)
+
+    persist = settings.tts_cache_persist_live
+    backend = "local" if _use_local_tts(lang) else "modal"
+    t0 = time.perf_counter()
+    if stream:
+        finalize = finalize_wav if fmt == "wav" else None
+
+        async def open_stream():
+            chunks = _measure_tts_stream(await _open_speech_stream(text, lang, fmt), backend, t0)
+            return cache.tee(key, chunks, persist, finalize)
+
+        # Identical concurrent requests share one synthesis (keyed like the cache)
+        chunks = await app.state.tts_flights.stream(key, open_stream)
+        if finalize is not None:
+            del headers["ETag"]
+        return StreamingResponse(chunks, media_type=media_type, headers=headers)
+
+    async def generate(_notify):
+        audio = await _generate_speech(text, lang, fmt)
+        metrics.TTS_SECONDS.labels(backend, "full").observe(time.perf_counter() - t0)
+        metrics.TTS_BYTES.labels(backend).observe(len(audio))
+        await cache.put(key, audio, persist)
+        return audio
+
+    audio = await app.state.tts_flights.do(key, generate)
+    return Response(content=audio, media_type=media_type, headers=headers)
+
+
+async def _measure_tts_stream(chunks: AsyncIterator[bytes], backend: str, t0: float) -> AsyncIterator[bytes]:
+    """Pass chunks through, recording time to first byte, total time and size."""
+    size = 0
+    async for chunk in chunks:
+        if not size:
+            metrics.TTS_SECONDS.labels(backend, "first_byte").observe(time.perf_counter() - t0)
+        size += len(chunk)
+        yield chunk
+    metrics.TTS_SECONDS.labels(backend, "stream").observe(time.perf_counter() - t0)
+    metrics.TTS_BYTES.labels(backend).observe(size)
+
+
+def _use_local_tts(lang: str) -> bool:
+    local_tts = app.state.local_tts
+    if local_tts is None or lang != "ht":
+        return False
+    if not local_tts.is_ready:
+        _warm_local_tts(app)  # LOCAL_TTS_LAZY: the first request starts the load
+        return False
+    return True
+
+
+async def _generate_speech(text: str, lang: str, fmt: str = "wav") -> bytes:
+    """Synthesize a complete audio file with LocalTTS or Modal."""
+    if _use_local_tts(lang):
+        try:
+            return await app.state.local_tts.generate_async(text, fmt)
+        except TTSOverloaded:
+            raise _tts_busy()
+
     if not settings.modal_tts_url:
         raise HTTPException(status_code=503, detail="TTS endpoint not configured")
 
     try:
         resp = await app.state.http.post(
             settings.modal_tts_url,
-            json={"text": req.text, "lang": req.lang},
+            json={"text": text, "lang": lang, "format": fmt, "sample_rate": settings.tts_sample_rate},
         )
         resp.raise_for_status()
-
-        return Response(
-            content=resp.content,
-            media_type=resp.headers.get("content-type", "audio/wav"),
-            headers={"Content-Disposition": "inline"},
-        )
+        return resp.content
     except httpx.HTTPStatusError as e:
         logger.error("Modal TTS error: %s %s", e.response.status_code, e.response.text[:200])
+        metrics.TTS_FAILURES.labels("modal", "http").inc()
         raise HTTPException(status_code=502, detail="TTS generation failed")
     except httpx.TimeoutException:
         logger.error("Modal TTS timeout")
+        metrics.TTS_FAILURES.labels("modal", "timeout").inc()
+        raise HTTPException(status_code=504, detail="TTS request timed out")
+    except Exception as e:
+        logger.error("TTS proxy error: %s", e)
+        metrics.TTS_FAILURES.labels("modal", "error").inc()
+        raise HTTPException(status_code=500, detail="TTS error")
+
+
+async def _open_speech_stream(text: str, lang: str, fmt: str = "wav") -> AsyncIterator[bytes]:
+    """Start a streamed WAV/MP3 from LocalTTS or Modal and return its chunk iterator."""
+    if _use_local_tts(lang):
+        try:
+            return app.state.local_tts.generate_stream_async(text, fmt)
+        except TTSOverloaded:
+            raise _tts_busy()
+
+    if not settings.modal_tts_url:
+        raise HTTPException(status_code=503, detail="TTS endpoint not configured")
+    return await _proxy_tts_stream(text, lang, fmt)
+
+
+def _tts_busy() -> HTTPException:
+    logger.warning("Local TTS queue full, rejecting request")
+    metrics.TTS_FAILURES.labels("local", "overloaded").inc()
+    return HTTPException(status_code=503, detail="TTS busy, retry shortly", headers={"Retry-After": "1"})
+
+
+async def _proxy_tts_stream(text: str, lang: str, fmt: str = "wav") -> AsyncIterator[bytes]:
+    """Relay Modal's chunked audio to the client without buffering it."""
+    client = app.state.http
+    request = client.build_request(
+        "POST",
+        settings.modal_tts_url,
+        json={"text": text, "lang": lang, "stream": True, "format": fmt, "sample_rate": settings.tts_sample_rate},
+    )
+    try:
+        upstream = await client.send(request, stream=True)
+    except httpx.TimeoutException:
+        logger.error("Modal TTS timeout")
+        metrics.TTS_FAILURES.labels("modal", "timeout").inc()
         raise HTTPException(status_code=504, detail="TTS request timed out")
     except Exception as e:
         logger.error("TTS proxy error: %s", e)
+        metrics.TTS_FAILURES.labels("modal", "error").inc()
         raise HTTPException(status_code=500, detail="TTS error")
 
+    if upstream.status_code != 200:
+        body = await upstream.aread()
+        await upstream.aclose()
+        logger.error("Modal TTS error: %s %s", upstream.status_code, body[:200])
+        metrics.TTS_FAILURES.labels("modal", "http").inc()
+        raise HTTPException(status_code=502, detail="TTS generation failed")
+
+    async def relay():
+        try:
+            async for chunk in upstream.aiter_bytes():
+                yield chunk
+        finally:
+            await upstream.aclose()
+
+    return relay()
+
+
+async def _presynthesize_phrase_library(lang: str) -> int:
+    """
+    Translate the training and custom phrase lists from English and store
+    their audio in the persistent (disk) TTS cache. Phrase-library text is
+    not PHI, so unlike live audio it is always written to disk.
+    """
+    supabase = app.state.supabase
+    if not supabase.configured:
+        return 0
+    cache = app.state.tts_cache
+    phrases = set()
+    for table in ("training_phrases", "custom_phrases"):
+        try:
+            rows = await supabase.select(table, {"select": "phrase_text"})
+            phrases.update(row["phrase_text"] for row in rows if row.get("phrase_text"))
+        except Exception as e:
+            logger.warning("Could not load %s for pre-synthesis: %s", table, e)
+
+    formats = [f.strip() for f in settings.tts_formats.split(",") if f.strip() in AUDIO_FORMATS]
+    done = 0
+    for phrase in sorted(phrases):
+        if lang == "en":
+            text = phrase
+        else:
+            # Spare quota only: this must never hold up live translation
+            text = await app.state.translation.translate(phrase, "en", lang, priority=BACKGROUND)
+        if not text:
+            continue
+        for fmt in formats:
+            key = cache.make_key(text, lang, settings.tts_voice_id, fmt, settings.tts_sample_rate)
+            if cache.get(key) is not None or cache.get_path(key) is not None:
+                continue
+            try:
+                await cache.put(key, await _generate_speech(text, lang, fmt), persist=True)
+                done += 1
+            except HTTPException as e:
+                logger.warning("Pre-synthesis failed for a phrase: %s", e.detail)
+    logger.info("Pre-synthesized %d phrases (%s)", done, lang)
+    return done
+
 
 @app.post("/api/train")
 async def handle_training_upload(
@@ -110,91 +550,195 @@ async def handle_training_upload(
     Receives optimized .webm audio from the frontend Training Portal,
     and pipes it directly into the HIPAA-compliant Supabase Storage bucket.
     """
-    if not settings.supabase_url or not settings.supabase_service_key:
+    supabase = app.state.supabase
+    if not supabase.configured:
         logger.warning(f"Audio received from {pin} but Supabase is not configured.")
         return {"status": "mock_success", "message": "Audio received. Configure Supabase to persist."}
 
-    headers = {
-        "apikey": settings.supabase_service_key,
-        "Authorization": f"Bearer {settings.supabase_service_key}"
-    }
+    max_bytes = settings.training_upload_max_bytes
+    if audio.size is not None and audio.size > max_bytes:
+        raise HTTPException(status_code=413, detail="Recording too large")
 
     try:
-        audio_bytes = await audio.read()
         file_id = str(uuid.uuid4())
         file_path = f"{lang}/{pin}/{file_id}.webm"
-        
-        # 1. Upload audio to Supabase Storage
-        upload_url = f"{settings.supabase_url}/storage/v1/object/voice-training-bucket/{file_path}"
-        async with httpx.AsyncClient() as client:
-            upload_res = await client.post(
-                upload_url,
-                headers={**headers, "Content-Type": "audio/webm"},
-                content=audio_bytes
-            )
-            upload_res.raise_for_status()
-        
-        public_audio_url = f"{settings.supabase_url}/storage/v1/object/public/voice-training-bucket/{file_path}"
+        digest = hashlib.sha256()
+
+        # 1. Stream audio to Supabase Storage chunk by chunk (never fully in memory)
+        await supabase.upload(
+            TRAINING_BUCKET, file_path, iter_upload_file(audio, max_bytes, digest), "audio/webm"
+        )
 
         # 2. Mock Phrase Lookup / Insertion
-        insert_url = f"{settings.supabase_url}/rest/v1/voice_contributions"
-        payload = {
-            "phrase_id": None, 
-            "provider_pin": pin,
-            "language_code": lang,
-            "audio_url": public_audio_url,
-            "is_approved": None
-        }
-        async with httpx.AsyncClient() as client:
-            await client.post(insert_url, headers={**headers, "Content-Type": "application/json", "Prefer": "return=minimal"}, json=payload)
+        await _record_contribution(file_path, lang, pin)
             
-        return {"status": "success", "file_id": file_id}
+        return {"status": "success", "file_id": file_id, "sha256": digest.hexdigest()}
 
+    except UploadTooLarge:
+        raise HTTPException(status_code=413, detail="Recording too large")
     except Exception as e:
         logger.error(f"Error processing training audio: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def _record_contribution(file_path: str, lang: str, pin: str):
+    supabase = app.state.supabase
+    await supabase.insert("voice_contributions", {
+        "phrase_id": None, 
+        "provider_pin": pin,
+        "language_code": lang,
+        "audio_url": supabase.public_url(TRAINING_BUCKET, file_path),
+        "is_approved": None
+    })
+
+
+# ── Resumable (TUS) training uploads for long recordings ────────────
+@app.post("/api/train/uploads")
+async def create_resumable_upload(
+    length: int = Form(...),
+    lang: str = Form("ht"),
+    pin: str = Form("000000"),
+):
+    """
+    Start a resumable upload. The client then PATCHes raw chunks of exactly
+    `chunk_size` bytes (the last may be shorter) with an Upload-Offset header.
+    """
+    supabase = app.state.supabase
+    if not supabase.configured:
+        raise HTTPException(status_code=503, detail="Supabase is not configured")
+    if length <= 0 or length > settings.training_upload_max_bytes:
+        raise HTTPException(status_code=413, detail="Recording too large")
+
+    file_path = f"{lang}/{pin}/{uuid.uuid4()}.webm"
+    try:
+        location = await supabase.resumable_create(TRAINING_BUCKET, file_path, length, "audio/webm")
+    except httpx.HTTPError as e:
+        logger.error("Resumable upload create failed: %s", e)
+        raise HTTPException(status_code=502, detail="Storage unavailable")
+    upload = app.state.uploads.add(location, file_path, lang, pin, length)
+    return {"upload_id": upload.upload_id, "offset": 0, "chunk_size": TUS_CHUNK_SIZE}
+
+
+@app.head("/api/train/uploads/{upload_id}")
+async def resumable_upload_offset(upload_id: str):
+    upload = app.state.uploads.get(upload_id)
+    if upload is None:
+        raise HTTPException(status_code=404, detail="Unknown upload")
+    try:
+        offset = await app.state.supabase.resumable_offset(upload.location)
+    except httpx.HTTPError as e:
+        logger.error("Resumable upload offset query failed: %s", e)
+        raise HTTPException(status_code=502, detail="Storage unavailable")
+    if not upload.rewind(offset):
+        # Storage holds a byte count we never confirmed, so no checksum covers it
+        raise HTTPException(status_code=409, detail="Upload out of sync with storage; start a new upload")
+    return Response(headers={"Upload-Offset": str(upload.offset), "Upload-Length": str(upload.length)})
+
+
+@app.patch("/api/train/uploads/{upload_id}")
+async def append_resumable_upload(upload_id: str, request: Request):
+    upload = app.state.uploads.get(upload_id)
+    if upload is None:
+        raise HTTPException(status_code=404, detail="Unknown upload")
+    offset = int(request.headers.get("Upload-Offset", "-1"))
+    if offset != upload.offset:
+        return Response(status_code=409, headers={"Upload-Offset": str(upload.offset)})
+
+    # Hash into a copy so a failed chunk doesn't corrupt the running checksum
+    digest = upload.digest.copy()
+    remaining = min(TUS_CHUNK_SIZE, upload.length - upload.offset)
+    received = 0
+
+    async def body():
+        nonlocal received
+        async for chunk in iter_body(request.stream(), remaining, digest):
+            received += len(chunk)
+            yield chunk
+
+    try:
+        new_offset = await app.state.supabase.resumable_patch(upload.location, offset, body())
+    except UploadTooLarge:
+        raise HTTPException(status_code=413, detail="Chunk too large")
+    except httpx.HTTPError as e:
+        logger.error("Resumable upload chunk failed: %s", e)
+        raise HTTPException(status_code=502, detail="Storage unavailable")
+    if new_offset != offset + received:
+        # Storage kept a different number of bytes than were hashed
+        logger.error("Resumable upload %s: storage offset %d, expected %d", upload_id, new_offset, offset + received)
+        if upload.rewind(new_offset):
+            return Response(status_code=409, headers={"Upload-Offset": str(upload.offset)})
+        raise HTTPException(status_code=409, detail="Upload out of sync with storage; start a new upload")
+    upload.commit(new_offset, digest)
+
+    if not upload.complete:
+        return {"upload_id": upload_id, "offset": upload.offset}
+
+    try:
+        await _record_contribution(upload.object_path, upload.lang, upload.pin)
+    except Exception as e:
+        logger.error("Resumable upload %s stored but not recorded: %s", upload_id, e)
+        raise HTTPException(status_code=502, detail="Upload stored but not recorded")
+    finally:
+        app.state.uploads.remove(upload_id)
+    return {
+        "status": "success",
+        "upload_id": upload_id,
+        "offset": upload.offset,
+        "sha256": upload.digest.hexdigest(),
+    }
 
 
 @app.get("/api/train/queue")
 async def get_training_queue():
-    if not settings.supabase_url: return []
-    headers = {"apikey": settings.supabase_service_key, "Authorization": f"Bearer {settings.supabase_service_key}"}
-    url = f"{settings.supabase_url}/rest/v1/voice_contributions?is_approved=is.null&limit=10"
-    async with httpx.AsyncClient() as client:
-        res = await client.get(url, headers=headers)
-        return res.json() if res.status_code == 200 else []
+    supabase = app.state.supabase
+    if not supabase.configured: return []
+    try:
+        return await supabase.select("voice_contributions", {"is_approved": "is.null", "limit": 10})
+    except httpx.HTTPError:
+        return []
 
 @app.post("/api/train/review")
 async def submit_training_review(record_id: str = Form(...), is_approved: bool = Form(...), pin: str = Form(...)):
-    if not settings.supabase_url: return {"status": "error"}
-    headers = {"apikey": settings.supabase_service_key, "Authorization": f"Bearer {settings.supabase_service_key}", "Content-Type": "application/json"}
-    url = f"{settings.supabase_url}/rest/v1/voice_contributions?id=eq.{record_id}"
-    payload = {"is_approved": is_approved, "reviewed_by": pin}
-    async with httpx.AsyncClient() as client:
-        res = await client.patch(url, headers=headers, json=payload)
-        res.raise_for_status()
+    supabase = app.state.supabase
+    if not supabase.configured: return {"status": "error"}
+    await supabase.update(
+        "voice_contributions",
+        {"id": f"eq.{record_id}"},
+        {"is_approved": is_approved, "reviewed_by": pin},
+    )
     return {"status": "success"}
 
 @app.get("/api/phrases/custom")
 async def get_custom_phrases(pin: str):
-    if not settings.supabase_url: return []
-    headers = {"apikey": settings.supabase_service_key, "Authorization": f"Bearer {settings.supabase_service_key}"}
-    url = f"{settings.supabase_url}/rest/v1/custom_phrases?provider_pin=eq.{pin}&order=created_at.desc"
-    async with httpx.AsyncClient() as client:
-        res = await client.get(url, headers=headers)
-        return res.json() if res.status_code == 200 else []
+    supabase = app.state.supabase
+    if not supabase.configured: return []
+    try:
+        return await supabase.select(
+            "custom_phrases", {"provider_pin": f"eq.{pin}", "order": "created_at.desc"}
+        )
+    except httpx.HTTPError:
+        return []
 
 @app.post("/api/phrases/custom")
-async def add_custom_phrase(pin: str = Form(...), phrase: str = Form(...)):
-    if not settings.supabase_url: return {"status": "error"}
-    headers = {"apikey": settings.supabase_service_key, "Authorization": f"Bearer {settings.supabase_service_key}", "Content-Type": "application/json", "Prefer": "return=minimal"}
-    url = f"{settings.supabase_url}/rest/v1/custom_phrases"
-    payload = {"provider_pin": pin, "phrase_text": phrase, "category": "Custom"}
-    async with httpx.AsyncClient() as client:
-        res = await client.post(url, headers=headers, json=payload)
-        res.raise_for_status()
+async def add_custom_phrase(
+    pin: str = Form(...),
+    phrase: str = Form(...),
+    translation: str | None = Form(None),
+    from_lang: str = Form("en"),
+    to_lang: str = Form("es"),
+):
+    """
+    Save a phrase preset. With a translation it also becomes a glossary entry
+    (no LLM call) on this PIN's sessions only, unless it names a bundled term.
+    """
+    supabase = app.state.supabase
+    if not supabase.configured: return {"status": "error"}
+    row = {"provider_pin": pin, "phrase_text": phrase, "category": "Custom"}
+    if translation:
+        row.update(translated_text=translation, from_lang=from_lang, to_lang=to_lang)
+    await supabase.insert("custom_phrases", row)
+    if translation and app.state.translation.glossary is not None:
+        app.state.translation.glossary.load_custom_phrases([row])
     return {"status": "success"}
 @app.websocket("/ws")
 async def translation_session(ws: WebSocket):
@@ -202,21 +746,41 @@ async def translation_session(ws: WebSocket):
     Text-based translation WebSocket.
     
     Client sends JSON:
-      { "type": "translate", "text": "...", "from": "en", "to": "es", "session_id": "..." }
-      { "type": "start_session", "from": "en", "to": "es", "session_id": "..." }
+      { "type": "translate", "text": "...", "from": "en", "to": "es", "session_id": "...",
+        "stream": true, "request_id": "..." }
+      { "type": "interim", "text": "...", "from": "en", "to": "es", "request_id": "..." }
+          (a not-yet-final transcript; its stable words are translated speculatively
+          and reused if the final "translate" text matches)
+      { "type": "start_session", "from": "en", "to": "es", "session_id": "...", "pin": "..." }
+          (pin: the provider's PIN; upstream quota is shared per PIN)
       { "type": "end_session", "session_id": "..." }
     
     Server responds JSON:
+      { "type": "translation_partial", "original": "...", "text": "..." }  (stream only, cumulative)
+      { "type": "translation_interim", "original": "...", "text": "..." }  (speculative, may change)
       { "type": "translation", "original": "...", "text": "..." }
+      { "type": "session_translation", "original": "...", "text": "...", "from": "..", "to": ".." }
+          (a translation made by another device on the same session, possibly on another worker)
       { "type": "error", "message": "..." }
+      { "type": "error", "message": "...", "retry_after": 2.5 }  (upstream quota exhausted)
+
+    Translate requests run concurrently; every reply to one carries its
+    "request_id" (if supplied). Replies for the same from->to direction
+    arrive in the order the requests were sent.
     """
     await ws.accept()
     session_id = None
     pipeline = app.state.translation
     sessions = app.state.sessions
     audit = app.state.audit
+    scheduler = ConnectionScheduler(ws, max_in_flight=settings.ws_max_in_flight)
+    speculator = SpeculativeTranslator(pipeline, min_words=settings.translation_interim_min_words)
+    connection_id = uuid.uuid4().hex
+    pin = connection_id  # quota key until start_session names the provider
+    relay = None
 
     logger.info("WebSocket connected")
+    metrics.WS_CONNECTIONS.inc()
 
     try:
         while True:
@@ -224,53 +788,161 @@ async def translation_session(ws: WebSocket):
             msg_type = data.get("type", "")
 
             if msg_type == "start_session":
+                if session_id:  # switching sessions on this connection
+                    relay.cancel()
+                    await sessions.release(session_id)
                 session_id = data.get("session_id", "unknown")
+                pin = data.get("pin") or connection_id
                 from_lang = data.get("from", "en")
                 to_lang = data.get("to", "es")
                 await sessions.create(session_id, from_lang, to_lang)
+                relay = asyncio.create_task(_relay_session(sessions, session_id, connection_id, scheduler))
                 await audit.log("session_start", session_id, {"from": from_lang, "to": to_lang})
-                await ws.send_json({"type": "session_started", "session_id": session_id})
+                await scheduler.send({"type": "session_started", "session_id": session_id})
                 logger.info("Session %s started: %s->%s", session_id[:8], from_lang, to_lang)
 
+            elif msg_type == "interim":
+                text = data.get("text", "").strip()
+                if not text or not settings.translation_interim_enabled:
+                    continue
+                request_id = data.get("request_id")
+
+                async def on_interim(original: str, translation: str, request_id=request_id):
+                    await scheduler.send(_tagged({
+                        "type": "translation_interim",
+                        "original": original,
+                        "text": translation,
+                    }, request_id))
+
+                speculator.interim(
+                    text, data.get("from", "en"), data.get("to", "es"),
+                    context=sessions.context(session_id) if session_id else None,
+                    on_result=on_interim,
+                    pin=pin,
+                )
+
             elif msg_type == "translate":
                 text = data.get("text", "").strip()
                 from_lang = data.get("from", "en")
                 to_lang = data.get("to", "es")
                 sid = data.get("session_id", session_id or "unknown")
+                request_id = data.get("request_id")
 
                 if not text:
                     continue
+                if session_id and not await sessions.touch(session_id):
+                    # Ended (by any device) or timed out: no more translation on it
+                    if await sessions.closed_reason(session_id) == ENDED:
+                        reason, message = "session_ended", "Session ended — please start a new session"
+                    else:
+                        reason, message = "session_timeout", "Session timed out — please start a new session"
+                    await scheduler.send(_tagged({
+                        "type": "error",
+                        "reason": reason,
+                        "message": message,
+                    }, request_id))
+                    continue
 
                 logger.info("Translating [%s->%s]: %s", from_lang, to_lang, text[:60])
 
-                translation = await pipeline.translate(text, from_lang, to_lang)
-
-                if translation:
-                    await ws.send_json({
-                        "type": "translation",
-                        "original": text,
-                        "text": translation,
-                    })
-                    logger.info("Translation sent: %s", translation[:60])
-                else:
-                    await ws.send_json({
-                        "type": "error",
-                        "message": "Translation failed — please repeat",
-                    })
+                on_partial = None
+                if data.get("stream") and settings.translation_streaming:
+                    async def on_partial(partial: str, original: str = text, request_id=request_id):
+                        await scheduler.send(_tagged({
+                            "type": "translation_partial",
+                            "original": original,
+                            "text": partial,
+                        }, request_id))
+
+                context = sessions.context(session_id) if session_id else None
+                speculation = speculator.claim(text, from_lang, to_lang)
+
+                async def work(text=text, from_lang=from_lang, to_lang=to_lang, on_partial=on_partial,
+                               context=context, speculation=speculation, pin=pin):
+                    if speculation is not None:
+                        translation = await speculator.reuse(speculation, text, from_lang, to_lang, context)
+                        if translation:
+                            return translation
+                    try:
+                        return await pipeline.translate(
+                            text, from_lang, to_lang, on_partial=on_partial, context=context, pin=pin
+                        )
+                    except UpstreamBusy as e:
+                        return e
+
+                async def deliver(translation, text=text, from_lang=from_lang, to_lang=to_lang,
+                                  request_id=request_id, shared=session_id):
+                    if isinstance(translation, UpstreamBusy):
+                        wait = translation.retry_after
+                        await scheduler.send(_tagged({
+                            "type": "error",
+                            "message": f"Translation service busy — please repeat in {math.ceil(wait)}s",
+                            "retry_after": round(wait, 1),
+                        }, request_id))
+                    elif translation:
+                        await scheduler.send(_tagged({
+                            "type": "translation",
+                            "original": text,
+                            "text": translation,
+                        }, request_id))
+                        logger.info("Translation sent: %s", translation[:60])
+                        if shared:
+                            await sessions.publish(shared, {
+                                "type": "session_translation",
+                                "origin": connection_id,
+                                "original": text,
+                                "text": translation,
+                                "from": from_lang,
+                                "to": to_lang,
+                            })
+                    else:
+                        await scheduler.send(_tagged({
+                            "type": "error",
+                            "message": "Translation failed — please repeat",
+                        }, request_id))
+
+                await scheduler.submit(f"{from_lang}-{to_lang}", work, deliver)
 
             elif msg_type == "end_session":
                 sid = data.get("session_id", session_id)
                 if sid:
-                    duration = sessions.get_duration(sid)
+                    duration = await sessions.get_duration(sid)
                     await sessions.end(sid)
                     await audit.log("session_end", sid, {"duration_seconds": duration})
                     logger.info("Session %s ended (%ds)", sid[:8], duration)
-                await ws.send_json({"type": "session_ended"})
+                await scheduler.send({"type": "session_ended"})
 
     except WebSocketDisconnect:
         logger.info("WebSocket disconnected")
     except Exception as e:
         logger.error("WebSocket error: %s", e)
     finally:
+        metrics.WS_CONNECTIONS.dec()
+        if relay:
+            relay.cancel()
+        # Abort upstream calls nobody is waiting for any more
+        await speculator.close()
+        await scheduler.close()
         if session_id:
-            await sessions.end(session_id)
+            # Other devices may still be on the session; it ends with the last one
+            await sessions.release(session_id)
+
+
+async def _relay_session(sessions, session_id: str, connection_id: str, scheduler: ConnectionScheduler):
+    """Forward translations other devices made on this session to this connection."""
+    try:
+        async for message in sessions.subscribe(session_id):
+            if message.get("origin") == connection_id:
+                continue
+            await scheduler.send({k: v for k, v in message.items() if k != "origin"})
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.warning("Session relay for %s stopped: %s", session_id[:8], e)
+
+
+def _tagged(payload: dict, request_id) -> dict:
+    """Echo the client's request_id on a reply frame, if it sent one."""
+    if request_id is not None:
+        payload["request_id"] = request_id
+    return payload
@@ -0,0 +1,278 @@
+"""
+Metrics — Prometheus counters, gauges and histograms, served on GET /metrics.
+Hand-rolled on the stdlib (no prometheus_client) and kept cheap enough for
+the hot path: a labelled observation is one dict lookup, one bisect and a
+few adds (see bench/metrics_overhead.py). Updates happen on the event loop
+only, so there is no locking; the text exposition format is rendered on
+scrape.
+"""
+import math
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from .config import settings
+
+# Seconds: covers cache hits (sub-ms) through slow NIM/Modal calls
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BYTE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+DEPTH_BUCKETS = (0, 1, 2, 4, 8, 16, 32)
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        REGISTRY.register(self)
+
+    def labels(self, *values: str):
+        """The child series for these label values (created on first use, then cached)."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in self._children.items():
+            lines.extend(child.render(self.name, self.labelnames, values))
+        return lines
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def render(self, name, labelnames, values):
+        return [f"{name}{_format_labels(labelnames, values)} {_format_value(self.value)}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+    _new_child = _CounterChild
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def set(self, value: float):
+        self.value = value
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+    _new_child = _GaugeChild
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self.labels().dec(amount)
+
+
+class _HistogramChild:
+    __slots__ = ("_bounds", "_counts", "_sum")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self._bounds = bounds
+        self._counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self._sum = 0.0
+
+    def observe(self, value: float):
+        self._counts[bisect_left(self._bounds, value)] += 1
+        self._sum += value
+
+    def render(self, name, labelnames, values):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self._bounds + (math.inf,), self._counts):
+            cumulative += count
+            le = f'le="{_format_value(bound)}"'
+            lines.append(f"{name}_bucket{_format_labels(labelnames, values, le)} {cumulative}")
+        labels = _format_labels(labelnames, values)
+        lines.append(f"{name}_sum{labels} {_format_value(self._sum)}")
+        lines.append(f"{name}_count{labels} {cumulative}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Iterable[float] = LATENCY_BUCKETS):
+        self._bounds = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self._bounds)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric):
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# Language codes arrive straight from clients: anything unsupported shares one label
+_LANGUAGES = frozenset(settings.supported_language_list)
+
+
+def pair_label(from_lang: str, to_lang: str) -> str:
+    """A language pair as a bounded label value ("en-es", or "other")."""
+    if from_lang in _LANGUAGES and to_lang in _LANGUAGES:
+        return f"{from_lang}-{to_lang}"
+    return "other"
+
+
+# ── Application metrics ────────────────────────────────────────────
+TRANSLATION_SECONDS = Histogram(
+    "medtranslate_translation_seconds",
+    "Translation latency by language pair and outcome (glossary, cache, ok, failed, speculative, reused).",
+    ["pair", "outcome"],
+)
+NIM_REQUEST_SECONDS = Histogram(
+    "medtranslate_nim_request_seconds",
+    "Successful chat-completion calls by backend and mode (complete, stream).",
+    ["backend", "mode"],
+)
+NIM_FAILURES = Counter(
+    "medtranslate_nim_failures_total",
+    "Failed chat-completion calls by backend and reason (http, timeout, error).",
+    ["backend", "reason"],
+)
+PROMPT_TOKENS = Histogram(
+    "medtranslate_prompt_tokens",
+    "Estimated prompt size per chat-completion request, with or without session history.",
+    ["kind"],
+    buckets=TOKEN_BUCKETS,
+)
+UPSTREAM_TOKENS = Counter(
+    "medtranslate_upstream_tokens_total",
+    "Token usage reported by backends (prompt, cached_prompt, completion).",
+    ["backend", "kind"],
+)
+TTS_SECONDS = Histogram(
+    "medtranslate_tts_seconds",
+    "TTS synthesis latency by backend (modal, local) and phase (full, first_byte, stream).",
+    ["backend", "phase"],
+)
+TTS_BYTES = Histogram(
+    "medtranslate_tts_response_bytes",
+    "Size of synthesized TTS responses by backend.",
+    ["backend"],
+    buckets=BYTE_BUCKETS,
+)
+TTS_FAILURES = Counter(
+    "medtranslate_tts_failures_total",
+    "Failed TTS requests by backend and reason (http, timeout, error, overloaded).",
+    ["backend", "reason"],
+)
+COALESCED = Counter(
+    "medtranslate_coalesced_requests_total",
+    "Requests served by an identical in-flight upstream call instead of a new one.",
+    ["kind"],
+)
+SPECULATIONS = Counter(
+    "medtranslate_speculations_total",
+    "Speculative translations of interim transcripts (started, cancelled, reused).",
+    ["outcome"],
+)
+WS_CONNECTIONS = Gauge("medtranslate_ws_connections", "Open /ws connections.")
+WS_IN_FLIGHT = Gauge("medtranslate_ws_in_flight", "Translate jobs running across all /ws connections.")
+WS_QUEUE_DEPTH = Histogram(
+    "medtranslate_ws_queue_depth",
+    "Jobs already in flight on a connection when a new translate request arrives.",
+    buckets=DEPTH_BUCKETS,
+)
+SESSIONS_ACTIVE = Gauge("medtranslate_sessions_active", "Active translation sessions.")
+SUPABASE_SECONDS = Histogram(
+    "medtranslate_supabase_request_seconds",
+    "Supabase REST/Storage call latency per attempt by method and status class.",
+    ["method", "status"],
+)
+SUPABASE_FAILURES = Counter(
+    "medtranslate_supabase_failures_total",
+    "Supabase calls that failed after retries, by reason (http, timeout, error).",
+    ["reason"],
+)
+AUDIT_QUEUE_DEPTH = Gauge("medtranslate_audit_queue_depth", "Audit events waiting to be written.")
+AUDIT_WAL_ERRORS = Counter(
+    "medtranslate_audit_wal_errors_total",
+    "Audit write-ahead file operations that failed, by op (spill: events lost; replay: retried later).",
+    ["op"],
+)
+STARTUP_SECONDS = Gauge(
+    "medtranslate_startup_phase_seconds",
+    "Duration of each startup phase (translation, supabase, local_tts, ...) in this process.",
+    ["phase"],
+)
+UPSTREAM_WAIT_SECONDS = Histogram(
+    "medtranslate_upstream_wait_seconds",
+    "Time a translation waited for upstream quota (PIN + global buckets) by priority.",
+    ["priority"],
+)
+UPSTREAM_SHED = Counter(
+    "medtranslate_upstream_shed_total",
+    "Translations refused because their expected quota wait was over the limit, by priority.",
+    ["priority"],
+)
+UPSTREAM_RATE = Gauge(
+    "medtranslate_upstream_rate",
+    "Current global upstream admission rate (req/s) after 429 adaptation; 0 = unlimited.",
+)
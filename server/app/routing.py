@@ -0,0 +1,283 @@
+"""
+Translation Router — spreads chat completions across several OpenAI-compatible
+backends (e.g. the 70B NIM model, a smaller fast model, a local server).
+Keeps EWMA latency and error-rate stats per backend, sends to the best one,
+and fires a hedged duplicate at the next best when the primary runs past its
+p95 latency. The first good answer wins; the loser is cancelled. Error rates
+also decay with time, so a backend demoted by one bad burst is tried again
+once it has been quiet for a while instead of never being picked again.
+Streamed translations (translation.py) only fail over, before the first
+token; they are not hedged.
+"""
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional
+
+import httpx
+
+from .admission import LIVE, UpstreamRateLimited, UpstreamScheduler, parse_retry_after
+from .metrics import NIM_FAILURES, NIM_REQUEST_SECONDS, UPSTREAM_TOKENS
+
+logger = logging.getLogger("medtranslate.routing")
+
+EWMA_ALPHA = 0.2
+ERROR_HALF_LIFE = 30.0  # seconds for a backend's error rate to halve with no new requests
+_P95_MIN_SAMPLES = 10
+
+
+@dataclass
+class Backend:
+    name: str
+    url: str  # full chat completions URL
+    model: str
+    api_key: str = ""
+    ewma_latency: float = 0.5
+    error_rate: float = 0.0
+    requests: int = 0
+    failures: int = 0
+    _samples: Deque[float] = field(default_factory=lambda: deque(maxlen=200))
+    _error_at: float = field(default_factory=time.monotonic)  # when error_rate was last brought up to date
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        return headers
+
+    @property
+    def score(self) -> float:
+        """Lower is better: expected latency, inflated by recent errors."""
+        self._decay_errors()
+        return self.ewma_latency * (1.0 + 10.0 * self.error_rate)
+
+    def _decay_errors(self):
+        now = time.monotonic()
+        self.error_rate *= 0.5 ** ((now - self._error_at) / ERROR_HALF_LIFE)
+        self._error_at = now
+
+    def p95(self, default: float) -> float:
+        if len(self._samples) < _P95_MIN_SAMPLES:
+            return default
+        ordered = sorted(self._samples)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+    def record_success(self, latency: float):
+        self.requests += 1
+        self._samples.append(latency)
+        self.ewma_latency += EWMA_ALPHA * (latency - self.ewma_latency)
+        self._decay_errors()
+        self.error_rate += EWMA_ALPHA * (0.0 - self.error_rate)
+
+    def record_abandoned(self, elapsed: float):
+        """Lost a hedge race — we only know it was at least this slow."""
+        if elapsed > self.ewma_latency:
+            self.ewma_latency += EWMA_ALPHA * (elapsed - self.ewma_latency)
+
+    def record_failure(self):
+        self.requests += 1
+        self.failures += 1
+        self._decay_errors()
+        self.error_rate += EWMA_ALPHA * (1.0 - self.error_rate)
+
+    def stats(self) -> Dict[str, object]:
+        self._decay_errors()
+        return {
+            "name": self.name,
+            "model": self.model,
+            "ewma_latency_ms": round(self.ewma_latency * 1000, 1),
+            "p95_ms": round(self.p95(0.0) * 1000, 1),
+            "error_rate": round(self.error_rate, 3),
+            "requests": self.requests,
+            "failures": self.failures,
+        }
+
+
+def record_usage(backend: str, usage: dict):
+    """Count the token usage a backend reported, including prompt tokens it served from its prefix cache."""
+    UPSTREAM_TOKENS.labels(backend, "prompt").inc(usage.get("prompt_tokens") or 0)
+    UPSTREAM_TOKENS.labels(backend, "completion").inc(usage.get("completion_tokens") or 0)
+    details = usage.get("prompt_tokens_details") or {}
+    UPSTREAM_TOKENS.labels(backend, "cached_prompt").inc(details.get("cached_tokens") or 0)
+
+
+def chat_completions_url(base_url: str) -> str:
+    if base_url and not base_url.startswith("http"):
+        base_url = "https://" + base_url
+    base_url = base_url.rstrip("/")
+    if base_url.endswith("/chat/completions"):
+        return base_url
+    return base_url + "/chat/completions"
+
+
+def load_backends(spec: str, default_url: str, default_key: str, default_model: str) -> List[Backend]:
+    """
+    Build backends from the TRANSLATION_BACKENDS JSON list, e.g.
+    [{"name": "nim-70b", "url": "...", "api_key": "...", "model": "meta/llama-3.3-70b-instruct"}, ...]
+    Falls back to the single RIVA_API_URL backend when unset.
+    """
+    if not spec:
+        return [Backend(name="nim", url=chat_completions_url(default_url),
+                        model=default_model, api_key=default_key)]
+    backends = []
+    for entry in json.loads(spec):
+        backends.append(Backend(
+            name=entry.get("name") or entry["model"],
+            url=chat_completions_url(entry.get("url") or default_url),
+            model=entry.get("model", default_model),
+            api_key=entry.get("api_key", default_key if not entry.get("url") else ""),
+        ))
+    return backends
+
+
+class TranslationRouter:
+    """Latency-aware backend selection with hedged requests and failover."""
+
+    def __init__(
+        self,
+        backends: List[Backend],
+        client: httpx.AsyncClient,
+        hedge: bool = True,
+        hedge_min_delay_ms: float = 150.0,
+        hedge_default_delay_ms: float = 1000.0,
+        admission: Optional[UpstreamScheduler] = None,
+    ):
+        if not backends:
+            raise ValueError("TranslationRouter needs at least one backend")
+        self.backends = backends
+        self._client = client
+        self._hedge = hedge and len(backends) > 1
+        self._hedge_min_delay = hedge_min_delay_ms / 1000.0
+        self._hedge_default_delay = hedge_default_delay_ms / 1000.0
+        self._admission = admission  # told about 429s and successes so it can adapt its rate
+        self.hedges_sent = 0
+        self.secondary_wins = 0
+
+    @property
+    def primary_model(self) -> str:
+        return self.backends[0].model
+
+    def ranked(self) -> List[Backend]:
+        return sorted(self.backends, key=lambda b: b.score)
+
+    def _hedge_delay(self, backend: Backend) -> float:
+        return max(self._hedge_min_delay, backend.p95(self._hedge_default_delay))
+
+    async def complete(self, payload: dict, priority: int = LIVE, pin: Optional[str] = None) -> Optional[str]:
+        """
+        Run one chat completion and return the raw message content, or None if
+        every backend failed (UpstreamRateLimited if one of them answered 429).
+        `payload["model"]` is replaced per backend. The first call was admitted
+        by the caller; a failover waits for admission at the same priority and
+        pin, and a hedge is only sent if quota is free right away.
+        """
+        candidates = self.ranked()
+        pending: Dict[asyncio.Task, Backend] = {}
+        next_index = 0
+        rate_limited = False
+
+        def launch():
+            nonlocal next_index
+            backend = candidates[next_index]
+            next_index += 1
+            pending[asyncio.create_task(self._call(backend, payload))] = backend
+
+        launch()
+        # A hedge doubles the load on a provider that is already rate limiting us
+        hedge = self._hedge and not (self._admission is not None and self._admission.throttling)
+        deadline = self._hedge_delay(candidates[0]) if hedge else None
+        try:
+            while pending:
+                done, _ = await asyncio.wait(
+                    pending, timeout=deadline, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    # Primary is past its p95 — hedge once on the next best backend
+                    deadline = None
+                    if next_index < len(candidates) and (
+                        self._admission is None or self._admission.try_acquire(priority, pin)
+                    ):
+                        logger.info("Hedging translation on %s", candidates[next_index].name)
+                        self.hedges_sent += 1
+                        launch()
+                    continue
+
+                for task in done:
+                    backend = pending.pop(task)
+                    try:
+                        content = task.result()
+                    except UpstreamRateLimited:
+                        rate_limited = True
+                        continue
+                    if content is not None:
+                        if backend is not candidates[0]:
+                            self.secondary_wins += 1
+                        return content
+
+                if not pending and next_index < len(candidates):
+                    if self._admission is not None:
+                        await self._admission.acquire(priority, pin)
+                    logger.warning("Failing over translation to %s", candidates[next_index].name)
+                    launch()
+            if rate_limited:
+                raise UpstreamRateLimited()
+            return None
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _call(self, backend: Backend, payload: dict) -> Optional[str]:
+        t0 = time.monotonic()
+        try:
+            resp = await self._client.post(
+                backend.url, headers=backend.headers, json={**payload, "model": backend.model}
+            )
+            if resp.status_code == 429:
+                retry_after = parse_retry_after(resp.headers.get("retry-after"))
+                logger.warning("%s rate limited (Retry-After: %s)", backend.name, retry_after)
+                backend.record_failure()
+                NIM_FAILURES.labels(backend.name, "rate_limited").inc()
+                if self._admission is not None:
+                    self._admission.throttled(retry_after)
+                raise UpstreamRateLimited()
+            if resp.status_code != 200:
+                logger.error("%s API error %d: %s", backend.name, resp.status_code, resp.text[:200])
+                backend.record_failure()
+                NIM_FAILURES.labels(backend.name, "http").inc()
+                return None
+            body = resp.json()
+            content = body["choices"][0]["message"]["content"]
+            if body.get("usage"):
+                record_usage(backend.name, body["usage"])
+        except asyncio.CancelledError:
+            backend.record_abandoned(time.monotonic() - t0)
+            raise
+        except UpstreamRateLimited:
+            raise
+        except httpx.TimeoutException:
+            logger.error("%s API timeout", backend.name)
+            backend.record_failure()
+            NIM_FAILURES.labels(backend.name, "timeout").inc()
+            return None
+        except Exception as e:
+            logger.error("%s API error: %s", backend.name, e)
+            backend.record_failure()
+            NIM_FAILURES.labels(backend.name, "error").inc()
+            return None
+        latency = time.monotonic() - t0
+        backend.record_success(latency)
+        NIM_REQUEST_SECONDS.labels(backend.name, "complete").observe(latency)
+        if self._admission is not None:
+            self._admission.succeeded()
+        return content
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "hedges_sent": self.hedges_sent,
+            "secondary_wins": self.secondary_wins,
+            "backends": [b.stats() for b in self.ranked()],
+        }
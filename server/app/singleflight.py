@@ -0,0 +1,192 @@
+"""
+Single-flight request coalescing.
+Concurrent callers asking for the same thing (the same scripted prompt on
+several devices, a client retry) share one upstream call instead of each
+starting their own. Every caller gets the shared result or exception; a
+caller that is cancelled just stops waiting, and the shared call is only
+cancelled once every caller has gone, so nothing runs for nobody.
+Streams are shared too: late joiners replay the chunks buffered so far,
+then follow the live stream.
+"""
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional
+
+from .metrics import COALESCED
+
+logger = logging.getLogger("medtranslate.singleflight")
+
+Notify = Callable[[Any], Awaitable[None]]
+
+
+class _Flight:
+    __slots__ = ("task", "waiters", "listeners")
+
+    def __init__(self):
+        self.task: Optional[asyncio.Task] = None
+        self.waiters = 0
+        self.listeners: List[Notify] = []
+
+
+class _SharedStream:
+    __slots__ = ("task", "opened", "chunks", "done", "error", "subscribers", "_changed")
+
+    def __init__(self):
+        self.task: Optional[asyncio.Task] = None
+        self.opened: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.chunks: List[bytes] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self._changed = asyncio.Event()
+
+    @property
+    def changed(self) -> asyncio.Event:
+        return self._changed
+
+    def wake(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+
+class SingleFlight:
+    """Deduplicates concurrent calls and streams per key, with saved-call counters."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._streams: Dict[Hashable, _SharedStream] = {}
+        self.calls = 0  # upstream calls actually started
+        self.coalesced = 0  # callers served by someone else's call (calls saved)
+        self.abandoned = 0  # shared calls cancelled because every caller left
+
+    # ── Calls ──────────────────────────────────────────────────────
+    async def do(
+        self,
+        key: Hashable,
+        fn: Callable[[Notify], Awaitable[Any]],
+        on_progress: Optional[Notify] = None,
+    ) -> Any:
+        """
+        Run fn(notify) once for all concurrent callers with this key. The
+        first caller starts it; fn may await notify(value) to pass progress
+        (e.g. streamed partials) to every caller's on_progress.
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = _Flight()
+            flight.task = asyncio.ensure_future(fn(lambda value: self._notify(flight, value)))
+            flight.task.add_done_callback(lambda _: self._forget(self._flights, key, flight))
+            self.calls += 1
+        else:
+            self.coalesced += 1
+            COALESCED.labels(self.name).inc()
+
+        flight.waiters += 1
+        if on_progress is not None:
+            flight.listeners.append(on_progress)
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if on_progress is not None:
+                flight.listeners.remove(on_progress)
+            if flight.waiters == 0 and not flight.task.done():
+                self._forget(self._flights, key, flight)
+                flight.task.cancel()
+                self.abandoned += 1
+
+    @staticmethod
+    async def _notify(flight: _Flight, value: Any):
+        for listener in list(flight.listeners):
+            try:
+                await listener(value)
+            except Exception as e:  # one caller's closed socket must not fail the others
+                logger.debug("Progress listener failed: %s", e)
+
+    # ── Streams ────────────────────────────────────────────────────
+    async def stream(
+        self, key: Hashable, open_stream: Callable[[], Awaitable[AsyncIterator[bytes]]]
+    ) -> AsyncIterator[bytes]:
+        """
+        Open the stream once for all concurrent callers with this key. Raises
+        whatever opening raised (e.g. an HTTPException) to every caller, so it
+        can still become the response status; otherwise returns this caller's
+        iterator over the shared chunks.
+        """
+        shared = self._streams.get(key)
+        if shared is None:
+            shared = self._streams[key] = _SharedStream()
+            shared.task = asyncio.create_task(self._pump(key, shared, open_stream))
+            self.calls += 1
+        else:
+            self.coalesced += 1
+            COALESCED.labels(self.name).inc()
+
+        shared.subscribers += 1
+        try:
+            await asyncio.shield(shared.opened)
+        except BaseException:
+            self._unsubscribe(key, shared)
+            raise
+        return self._follow(key, shared)
+
+    async def _pump(self, key: Hashable, shared: _SharedStream, open_stream):
+        source = None
+        try:
+            source = await open_stream()
+            shared.opened.set_result(None)
+            async for chunk in source:
+                shared.chunks.append(chunk)
+                shared.wake()
+        except asyncio.CancelledError as e:
+            shared.error = e
+            raise
+        except Exception as e:
+            shared.error = e
+            if not shared.opened.done():
+                shared.opened.set_exception(e)
+        finally:
+            if not shared.opened.done():
+                shared.opened.cancel()
+            shared.done = True
+            shared.wake()
+            self._forget(self._streams, key, shared)
+            if source is not None and hasattr(source, "aclose"):
+                await source.aclose()
+
+    async def _follow(self, key: Hashable, shared: _SharedStream) -> AsyncIterator[bytes]:
+        sent = 0
+        try:
+            while True:
+                changed = shared.changed
+                while sent < len(shared.chunks):
+                    yield shared.chunks[sent]
+                    sent += 1
+                if shared.done:
+                    if shared.error is not None:
+                        raise shared.error
+                    return
+                await changed.wait()
+        finally:
+            self._unsubscribe(key, shared)
+
+    def _unsubscribe(self, key: Hashable, shared: _SharedStream):
+        shared.subscribers -= 1
+        if shared.subscribers == 0 and not shared.done:
+            self._forget(self._streams, key, shared)
+            shared.task.cancel()
+            self.abandoned += 1
+
+    @staticmethod
+    def _forget(table: Dict[Hashable, Any], key: Hashable, entry: Any):
+        if table.get(key) is entry:
+            del table[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "upstream_calls": self.calls,
+            "calls_saved": self.coalesced,
+            "abandoned": self.abandoned,
+            "in_flight": len(self._flights) + len(self._streams),
+        }
@@ -0,0 +1,142 @@
+"""
+Speculative translation of interim ASR transcripts on the /ws socket.
+While the speaker is still talking the client sends each interim
+transcript; the words two consecutive interims agree on are treated as
+stable and translated ahead of the final result. A newer stable prefix
+cancels the in-flight request for the older one (cancelling the task closes
+its upstream HTTP request). When the final transcript matches the last
+speculated text, its translation — finished or still in flight — is reused
+instead of starting the upstream call from zero.
+"""
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+from .cache import normalize_text
+from .context import ConversationContext
+from .metrics import SPECULATIONS, TRANSLATION_SECONDS, pair_label
+
+logger = logging.getLogger("medtranslate.speculation")
+
+InterimCallback = Callable[[str, str], Awaitable[None]]
+
+
+def stable_prefix(previous: str, current: str) -> str:
+    """The leading words two consecutive interim transcripts agree on."""
+    agreed = []
+    for old, new in zip(previous.split(), current.split()):
+        if old != new:
+            break
+        agreed.append(new)
+    return " ".join(agreed)
+
+
+class _Speculation:
+    __slots__ = ("interim", "text", "task")
+
+    def __init__(self):
+        self.interim = ""  # last interim transcript received
+        self.text = ""  # stable prefix currently being (or last) translated
+        self.task: Optional[asyncio.Task] = None
+
+
+class SpeculativeTranslator:
+    """Tracks one speculation per direction ("en-es") for a single connection."""
+
+    def __init__(self, pipeline, min_words: int = 3):
+        self._pipeline = pipeline
+        self._min_words = min_words
+        self._active: Dict[str, _Speculation] = {}
+        self._claimed: Set[asyncio.Task] = set()  # handed to a final translate, not yet finished
+
+    def interim(
+        self,
+        text: str,
+        from_lang: str,
+        to_lang: str,
+        context: Optional[ConversationContext] = None,
+        on_result: Optional[InterimCallback] = None,
+        pin: Optional[str] = None,
+    ):
+        """Record an interim transcript; start a new speculation if its stable prefix grew."""
+        spec = self._active.setdefault(f"{from_lang}-{to_lang}", _Speculation())
+        stable = stable_prefix(spec.interim, text)
+        spec.interim = text
+        if len(stable.split()) < self._min_words or normalize_text(stable) == normalize_text(spec.text):
+            return
+        self._cancel(spec)
+        spec.text = stable
+        spec.task = asyncio.create_task(self._run(stable, from_lang, to_lang, context, on_result, pin))
+        SPECULATIONS.labels("started").inc()
+
+    def claim(self, text: str, from_lang: str, to_lang: str) -> Optional[asyncio.Task]:
+        """
+        Called when the final transcript arrives. Returns the speculation's
+        task if it translated exactly this text; otherwise cancels it.
+        Either way the direction is reset for the next utterance.
+        """
+        spec = self._active.pop(f"{from_lang}-{to_lang}", None)
+        if spec is None or spec.task is None:
+            return None
+        if normalize_text(spec.text) != normalize_text(text):
+            self._cancel(spec)
+            return None
+        self._claimed.add(spec.task)
+        spec.task.add_done_callback(self._claimed.discard)
+        return spec.task
+
+    async def reuse(
+        self,
+        task: asyncio.Task,
+        text: str,
+        from_lang: str,
+        to_lang: str,
+        context: Optional[ConversationContext] = None,
+    ) -> Optional[str]:
+        """Wait for a claimed speculation. Returns its translation, or None to translate normally."""
+        t0 = time.perf_counter()
+        await asyncio.wait({task})
+        if task.cancelled() or task.exception() is not None or not task.result():
+            return None
+        translation = task.result()
+        SPECULATIONS.labels("reused").inc()
+        self._pipeline.accept(text, translation, from_lang, to_lang, context)
+        TRANSLATION_SECONDS.labels(pair_label(from_lang, to_lang), "reused").observe(time.perf_counter() - t0)
+        return translation
+
+    async def _run(
+        self,
+        text: str,
+        from_lang: str,
+        to_lang: str,
+        context: Optional[ConversationContext],
+        on_result: Optional[InterimCallback],
+        pin: Optional[str],
+    ) -> Optional[str]:
+        translation = await self._pipeline.speculate(text, from_lang, to_lang, context, pin)
+        if translation and on_result is not None:
+            try:
+                await on_result(text, translation)
+            except Exception as e:
+                logger.debug("Interim translation not delivered: %s", e)
+        return translation
+
+    @staticmethod
+    def _cancel(spec: _Speculation):
+        if spec.task is not None and not spec.task.done():
+            spec.task.cancel()
+            SPECULATIONS.labels("cancelled").inc()
+        spec.task = None
+
+    async def close(self):
+        """Cancel every outstanding speculation (e.g. on disconnect)."""
+        tasks = [s.task for s in self._active.values() if s.task is not None and not s.task.done()]
+        for spec in self._active.values():
+            self._cancel(spec)
+        self._active.clear()
+        for task in list(self._claimed):
+            task.cancel()
+            tasks.append(task)
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,128 @@
+"""
+Startup Profile — where time-to-first-request goes, and what is warm yet.
+Records the CPU time spent importing the app and every startup phase (when
+it began relative to the lifespan, how long it took, how it ended). Phases
+that must finish before the server accepts connections run concurrently in
+the lifespan; heavy ones (the local TTS model, the custom-phrase glossary
+and cache prewarm) run in the background afterwards and report "loading"
+until they are done. /ready serves the per-subsystem states, and is 200
+only once every required phase is ready.
+"""
+import asyncio
+import functools
+import logging
+import ssl
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Coroutine, Dict, Optional, Set
+
+from .metrics import STARTUP_SECONDS
+
+logger = logging.getLogger("medtranslate.startup")
+
+PENDING, LOADING, READY, FAILED = "pending", "loading", "ready", "failed"
+
+
+@functools.lru_cache(maxsize=None)
+def shared_ssl_context() -> ssl.SSLContext:
+    """
+    One TLS context for the outbound HTTP/1.1 httpx clients. Each client
+    otherwise parses the CA bundle itself (~40 ms apiece, on the event loop
+    at startup). HTTP/2 clients keep their own: httpcore sets the ALPN list
+    on the context at every connect.
+    """
+    import httpx
+
+    return httpx.create_ssl_context()
+
+
+@dataclass
+class Phase:
+    name: str
+    required: bool
+    state: str = PENDING
+    started: Optional[float] = None  # seconds after the lifespan began
+    seconds: Optional[float] = None
+    error: Optional[str] = None
+
+
+class StartupProfile:
+    """Per-phase timings and warmup state for one server process."""
+
+    def __init__(self, import_cpu_seconds: float = 0.0):
+        self.import_cpu_seconds = import_cpu_seconds  # interpreter start + importing the app
+        self._t0 = time.perf_counter()
+        self._phases: Dict[str, Phase] = {}
+        self.serving_after: Optional[float] = None
+
+    def register(self, name: str, required: bool = True) -> Phase:
+        """Declare a phase that has not started yet (e.g. loaded on first use)."""
+        phase = self._phases.get(name)
+        if phase is None:
+            phase = self._phases[name] = Phase(name, required)
+        return phase
+
+    def state(self, name: str) -> Optional[str]:
+        phase = self._phases.get(name)
+        return phase.state if phase else None
+
+    async def run(self, name: str, step: Awaitable[Any], required: bool = True) -> Any:
+        """Await one startup step, recording its timing and outcome. Failures are re-raised."""
+        phase = self.register(name, required)
+        phase.state = LOADING
+        phase.started = time.perf_counter() - self._t0
+        try:
+            result = await step
+        except BaseException as e:
+            phase.state = FAILED
+            phase.error = str(e) or type(e).__name__
+            raise
+        else:
+            phase.state = READY
+            return result
+        finally:
+            phase.seconds = time.perf_counter() - self._t0 - phase.started
+            STARTUP_SECONDS.labels(name).set(phase.seconds)
+
+    def background(self, name: str, step: Coroutine[Any, Any, Any], tasks: Set[asyncio.Task], required: bool = False):
+        """Run a step after startup; its failure is logged and shown on /ready, not raised."""
+        self.register(name, required).state = LOADING
+        task = asyncio.create_task(self._quietly(name, step, required))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        task.add_done_callback(lambda _: step.close())  # never started if cancelled at once (shutdown)
+        return task
+
+    async def _quietly(self, name: str, step: Awaitable[Any], required: bool):
+        try:
+            await self.run(name, step, required)
+        except Exception as e:
+            logger.error("Background startup step %s failed: %s", name, e)
+
+    @property
+    def ready(self) -> bool:
+        return all(p.state == READY for p in self._phases.values() if p.required)
+
+    def serving(self):
+        """Mark the point the server starts accepting connections and log the profile."""
+        self.serving_after = time.perf_counter() - self._t0
+        timed = ", ".join(f"{p.name} {p.seconds:.3f}s" for p in self._phases.values() if p.seconds is not None)
+        logger.info("Startup: imports %.2fs CPU, serving after %.3fs (%s)",
+                    self.import_cpu_seconds, self.serving_after, timed or "no phases")
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "import_cpu_seconds": round(self.import_cpu_seconds, 4),
+            "serving_after_seconds": None if self.serving_after is None else round(self.serving_after, 4),
+            "subsystems": {
+                p.name: {
+                    "state": p.state,
+                    "required": p.required,
+                    "started_at": None if p.started is None else round(p.started, 4),
+                    "seconds": None if p.seconds is None else round(p.seconds, 4),
+                    **({"error": p.error} if p.error else {}),
+                }
+                for p in self._phases.values()
+            },
+        }
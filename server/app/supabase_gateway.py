@@ -0,0 +1,219 @@
+"""
+Supabase Gateway — one pooled HTTP client for every Supabase REST/Storage call.
+Created once in lifespan so handlers reuse keep-alive (HTTP/2 when `h2` is
+installed) connections instead of paying a TCP+TLS handshake per request.
+"""
+import asyncio
+import base64
+import logging
+import random
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from .metrics import SUPABASE_FAILURES, SUPABASE_SECONDS
+
+logger = logging.getLogger("medtranslate.supabase")
+
+try:
+    import h2  # noqa: F401 — only needed for httpx's HTTP/2 support
+    _HTTP2 = True
+except ImportError:
+    _HTTP2 = False
+
+_RETRY_STATUS = {429, 500, 502, 503, 504}
+# Safe to retry even for non-idempotent writes: the request never left
+_CONNECT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class SupabaseGateway:
+    """Typed access to Supabase Storage and PostgREST with retries and pool metrics."""
+
+    def __init__(
+        self,
+        url: str,
+        service_key: str,
+        max_connections: int = 20,
+        max_keepalive: int = 10,
+        retries: int = 3,
+        backoff_base: float = 0.2,
+    ):
+        self._url = url.rstrip("/")
+        self._service_key = service_key
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=30.0,
+        )
+        self._retries = retries
+        self._backoff_base = backoff_base
+        self._client: Optional[httpx.AsyncClient] = None
+        self._headers = {
+            "apikey": service_key,
+            "Authorization": f"Bearer {service_key}",
+        }
+        self._json_headers = {**self._headers, "Content-Type": "application/json"}
+        # Pool utilisation
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+
+    @property
+    def configured(self) -> bool:
+        return bool(self._url and self._service_key)
+
+    async def initialize(self):
+        self._client = httpx.AsyncClient(
+            base_url=self._url,
+            http2=_HTTP2,
+            limits=self._limits,
+            timeout=30.0,
+        )
+        logger.info("Supabase gateway ready (http2=%s, max_connections=%d)",
+                    _HTTP2, self._limits.max_connections)
+
+    async def shutdown(self):
+        if self._client:
+            await self._client.aclose()
+
+    # ── Storage ────────────────────────────────────────────────────
+    async def upload(self, bucket: str, path: str, content: Any, content_type: str) -> str:
+        """Upload an object to Storage. `content` may be bytes or an async byte iterator."""
+        await self._request(
+            "POST",
+            f"/storage/v1/object/{bucket}/{path}",
+            headers={**self._headers, "Content-Type": content_type},
+            content=content,
+            idempotent=isinstance(content, (bytes, bytearray)),
+        )
+        return path
+
+    async def resumable_create(self, bucket: str, path: str, length: int, content_type: str) -> str:
+        """Start a TUS resumable upload. Returns the upload URL for subsequent PATCHes."""
+        def meta(value: str) -> str:
+            return base64.b64encode(value.encode("utf-8")).decode("ascii")
+
+        resp = await self._request(
+            "POST",
+            "/storage/v1/upload/resumable",
+            headers={
+                **self._headers,
+                "Tus-Resumable": "1.0.0",
+                "Upload-Length": str(length),
+                "Upload-Metadata": ",".join([
+                    f"bucketName {meta(bucket)}",
+                    f"objectName {meta(path)}",
+                    f"contentType {meta(content_type)}",
+                ]),
+            },
+        )
+        return resp.headers["Location"]
+
+    async def resumable_patch(self, location: str, offset: int, content: Any) -> int:
+        """Append one chunk at `offset`. Returns the new offset reported by Storage."""
+        resp = await self._request(
+            "PATCH",
+            location,
+            headers={
+                **self._headers,
+                "Tus-Resumable": "1.0.0",
+                "Upload-Offset": str(offset),
+                "Content-Type": "application/offset+octet-stream",
+            },
+            content=content,
+            idempotent=False,
+        )
+        return int(resp.headers["Upload-Offset"])
+
+    async def resumable_offset(self, location: str) -> int:
+        """Ask Storage how many bytes of a resumable upload it already has."""
+        resp = await self._request(
+            "HEAD", location, headers={**self._headers, "Tus-Resumable": "1.0.0"}
+        )
+        return int(resp.headers["Upload-Offset"])
+
+    def public_url(self, bucket: str, path: str) -> str:
+        return f"{self._url}/storage/v1/object/public/{bucket}/{path}"
+
+    # ── PostgREST ──────────────────────────────────────────────────
+    async def insert(self, table: str, rows: Any, returning: bool = False) -> Any:
+        """Insert one row (dict) or many (list of dicts)."""
+        prefer = "return=representation" if returning else "return=minimal"
+        resp = await self._request(
+            "POST",
+            f"/rest/v1/{table}",
+            headers={**self._json_headers, "Prefer": prefer},
+            json=rows,
+            idempotent=False,
+        )
+        return resp.json() if returning else None
+
+    async def select(self, table: str, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Select rows using PostgREST query params, e.g. {"is_approved": "is.null", "limit": 10}."""
+        resp = await self._request("GET", f"/rest/v1/{table}", headers=self._headers, params=params)
+        return resp.json()
+
+    async def update(self, table: str, filters: Dict[str, Any], values: Dict[str, Any]):
+        """PATCH rows matching PostgREST filters, e.g. {"id": "eq.<uuid>"}."""
+        await self._request(
+            "PATCH",
+            f"/rest/v1/{table}",
+            headers=self._json_headers,
+            params=filters,
+            json=values,
+        )
+
+    # ── Transport ──────────────────────────────────────────────────
+    async def _request(self, method: str, path: str, idempotent: bool = True, **kwargs) -> httpx.Response:
+        """Send with exponential backoff on connection errors and retryable statuses."""
+        attempt = 0
+        while True:
+            self.requests += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            t0 = time.perf_counter()
+            status = "error"
+            try:
+                resp = await self._client.request(method, path, **kwargs)
+                status = f"{resp.status_code // 100}xx"
+                if resp.status_code not in _RETRY_STATUS or not idempotent or attempt >= self._retries:
+                    resp.raise_for_status()
+                    return resp
+                reason = f"HTTP {resp.status_code}"
+            except httpx.HTTPStatusError:
+                self.failures += 1
+                SUPABASE_FAILURES.labels("http").inc()
+                raise
+            except httpx.TransportError as e:
+                if isinstance(e, httpx.TimeoutException):
+                    status = "timeout"
+                retryable = isinstance(e, _CONNECT_ERRORS) or idempotent
+                if not retryable or attempt >= self._retries:
+                    self.failures += 1
+                    SUPABASE_FAILURES.labels(status).inc()
+                    raise
+                reason = type(e).__name__
+            finally:
+                self.in_flight -= 1
+                SUPABASE_SECONDS.labels(method, status).observe(time.perf_counter() - t0)
+
+            attempt += 1
+            self.retries += 1
+            delay = self._backoff_base * (2 ** (attempt - 1)) * (1 + random.random())
+            logger.warning("Supabase %s %s failed (%s) — retry %d in %.2fs",
+                           method, path.split("?")[0], reason, attempt, delay)
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "http2": _HTTP2,
+            "max_connections": self._limits.max_connections,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "requests": self.requests,
+            "retries": self.retries,
+            "failures": self.failures,
+        }
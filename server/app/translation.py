@@ -3,9 +3,25 @@ from __future__ import annotations
 Translation Pipeline — NVIDIA NIM API (meta/llama-3.3-70b-instruct).
 Handles EN↔ES and EN↔HT medical translation via chat completions.
 """
+import asyncio
+import json
 import logging
+import time
+from typing import Awaitable, Callable
+
 import httpx
+from .admission import (
+    BACKGROUND, LIVE, SPECULATIVE, UpstreamBusy, UpstreamRateLimited, UpstreamScheduler, parse_retry_after,
+)
+from .batching import TranslationBatcher
+from .cache import TranslationCache, normalize_text
 from .config import settings
+from .context import ConversationContext, estimate_tokens
+from .glossary import BUNDLED_DIR, MedicalGlossary
+from .metrics import NIM_FAILURES, NIM_REQUEST_SECONDS, PROMPT_TOKENS, TRANSLATION_SECONDS, pair_label
+from .routing import TranslationRouter, load_backends, record_usage
+from .singleflight import SingleFlight
+from .startup import shared_ssl_context
 
 logger = logging.getLogger("medtranslate.translation")
 
@@ -29,6 +45,92 @@ SYSTEM_PROMPT = (
     "no explanations."
 )
 
+# Wrapping the model sometimes adds around its answer
+_STRIP_PREFIXES = ['"', "'", "Translation:", "Translated:"]
+_STRIP_SUFFIXES = ['"', "'"]
+
+BATCH_SYSTEM_PROMPT = (
+    SYSTEM_PROMPT[:SYSTEM_PROMPT.index("Output ONLY")]
+    + "You will receive a JSON array of separate utterances. Translate each one "
+    "independently and output ONLY a JSON array of strings with the translations "
+    "in the same order and of the same length — no labels, no explanations."
+)
+
+PartialCallback = Callable[[str], Awaitable[None]]
+
+
+def _instruction(text: str, from_lang: str, to_lang: str) -> str:
+    from_name = LANG_NAMES.get(from_lang, from_lang)
+    to_name = LANG_NAMES.get(to_lang, to_lang)
+    return f"Translate the following text from {from_name} to {to_name}:\n\n{text}"
+
+
+def _clean_translation(translation: str) -> str:
+    """Strip quotes and labels the model might wrap around its answer."""
+    translation = translation.strip()
+    for prefix in _STRIP_PREFIXES:
+        if translation.startswith(prefix):
+            translation = translation[len(prefix):]
+    for suffix in _STRIP_SUFFIXES:
+        if translation.endswith(suffix):
+            translation = translation[:-len(suffix)]
+    return translation.strip()
+
+
+def _parse_batch(content: str, expected: int) -> list[str] | None:
+    """Extract the JSON array of translations from a batch completion."""
+    start, end = content.find("["), content.rfind("]")
+    if start < 0 or end < start:
+        return None
+    try:
+        items = json.loads(content[start:end + 1])
+    except ValueError:
+        return None
+    if not isinstance(items, list) or len(items) != expected:
+        return None
+    if not all(isinstance(item, str) for item in items):
+        return None
+    return [_clean_translation(item) or None for item in items]
+
+
+class _StreamCleaner:
+    """
+    Incremental version of _clean_translation for streamed completions.
+    Holds output back only while a leading prefix is still ambiguous
+    (e.g. "Transl…"), then emits the cleaned text seen so far.
+    """
+
+    def __init__(self):
+        self._raw = ""
+        self._body_start: int | None = None
+
+    def feed(self, delta: str) -> str | None:
+        """Add a chunk of model output. Returns the cleaned text so far, or None to hold."""
+        self._raw += delta
+        if self._body_start is None:
+            self._body_start = self._settle_prefix()
+            if self._body_start is None:
+                return None
+        body = self._raw[self._body_start:].strip()
+        for suffix in _STRIP_SUFFIXES:
+            if body.endswith(suffix):
+                body = body[:-len(suffix)]
+        return body.strip() or None
+
+    def finish(self) -> str:
+        return _clean_translation(self._raw)
+
+    def _settle_prefix(self) -> int | None:
+        head = self._raw.lstrip()
+        offset = len(self._raw) - len(head)
+        for prefix in _STRIP_PREFIXES:
+            if head.startswith(prefix):
+                head = head[len(prefix):]
+                offset += len(prefix)
+            elif prefix.startswith(head):
+                return None  # could still turn into this prefix
+        return offset
+
 
 class TranslationPipeline:
     """Translates text using NVIDIA NIM chat completions API."""
@@ -36,68 +138,434 @@ class TranslationPipeline:
     def __init__(self):
         self._client: httpx.AsyncClient | None = None
         self._model = "meta/llama-3.3-70b-instruct"
-        self._api_url = None
-        self._api_key = None
+        self.router: TranslationRouter | None = None
+        self.cache: TranslationCache | None = None
+        self.batcher: TranslationBatcher | None = None
+        self.glossary: MedicalGlossary | None = None
+        self.admission = UpstreamScheduler()
+        self.flights = SingleFlight("translation")
+        self.prompt_requests = 0
+        self.prompt_tokens = 0  # estimated, across all requests
+        self.context_tokens = 0  # the part of prompt_tokens that was session history
 
     async def initialize(self):
-        base_url = settings.riva_api_url
-        if base_url and not base_url.startswith("http"):
-            base_url = "https://" + base_url
-        self._api_url = base_url + "/chat/completions"
-        self._api_key = settings.riva_api_key
-        self._client = httpx.AsyncClient(timeout=30.0)
-        logger.info("Translation pipeline initialized (NVIDIA NIM — %s)", self._model)
+        self._client = httpx.AsyncClient(timeout=30.0, verify=shared_ssl_context())
+        self.admission = UpstreamScheduler(
+            rate=settings.translation_quota_rps,
+            burst=settings.translation_quota_burst,
+            pin_rate=settings.translation_quota_pin_rps,
+            pin_burst=settings.translation_quota_pin_burst,
+            max_wait=settings.translation_quota_max_wait_seconds,
+        )
+        backends = load_backends(
+            settings.translation_backends,
+            settings.riva_api_url,
+            settings.riva_api_key,
+            self._model,
+        )
+        self.router = TranslationRouter(
+            backends,
+            self._client,
+            hedge=settings.translation_hedge_enabled,
+            hedge_min_delay_ms=settings.translation_hedge_min_delay_ms,
+            admission=self.admission,
+        )
+        self._model = self.router.primary_model
+        if settings.translation_cache_size > 0:
+            self.cache = TranslationCache(
+                max_entries=settings.translation_cache_size,
+                ttl_seconds=settings.translation_cache_ttl_seconds,
+                disk_dir=settings.translation_cache_dir,
+                encryption_key=settings.translation_cache_key,
+                disk_bytes=settings.translation_cache_disk_mb * 1024 * 1024,
+            )
+            await self.cache.sweep()
+        if settings.glossary_enabled:
+            self.glossary = MedicalGlossary()
+            # File reads and parsing, kept off the loop while other services start
+            await asyncio.to_thread(self.glossary.load_dir, settings.glossary_dir or BUNDLED_DIR)
+        if settings.translation_batch_enabled:
+            self.batcher = TranslationBatcher(
+                self._translate_batch,
+                max_batch_size=settings.translation_batch_max_size,
+                max_wait_ms=settings.translation_batch_max_wait_ms,
+            )
+        logger.info("Translation pipeline initialized (%s)",
+                    ", ".join(f"{b.name}: {b.model}" for b in backends))
 
     async def shutdown(self):
         if self._client:
             await self._client.aclose()
             logger.info("Translation pipeline shut down")
 
-    async def translate(self, text: str, from_lang: str, to_lang: str) -> str | None:
-        """Translate text between languages. Returns translated string or None on error."""
-        from_name = LANG_NAMES.get(from_lang, from_lang)
-        to_name = LANG_NAMES.get(to_lang, to_lang)
+    def _build_request(
+        self,
+        text: str,
+        from_lang: str,
+        to_lang: str,
+        context: ConversationContext | None = None,
+        pin: str | None = None,
+    ) -> dict:
+        """
+        System prompt, then the session's history, then the new utterance.
+        Everything before the last message is identical between consecutive
+        requests on a session, so backends with prefix caching reuse it.
+        """
+        user_msg = _instruction(text, from_lang, to_lang)
+        hint = self.glossary.prompt_hint([text], from_lang, to_lang, pin) if self.glossary else ""
+        if hint:
+            user_msg = f"{hint}\n\n{user_msg}"
 
-        user_msg = f"Translate the following text from {from_name} to {to_name}:\n\n{text}"
+        history = context.messages() if context else []
+        messages = [{"role": "system", "content": SYSTEM_PROMPT}, *history, {"role": "user", "content": user_msg}]
+        self._count_prompt(messages, context.tokens if history else 0)
+        return {
+            "model": self._model,
+            "messages": messages,
+            "temperature": 0.1,
+            "max_tokens": 512,
+        }
 
-        try:
-            resp = await self._client.post(
-                self._api_url,
-                headers={
-                    "Authorization": f"Bearer {self._api_key}",
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "model": self._model,
-                    "messages": [
-                        {"role": "system", "content": SYSTEM_PROMPT},
-                        {"role": "user", "content": user_msg},
-                    ],
-                    "temperature": 0.1,
-                    "max_tokens": 512,
-                },
-            )
+    def _count_prompt(self, messages: list[dict], context_tokens: int = 0):
+        tokens = sum(estimate_tokens(m["content"]) for m in messages)
+        self.prompt_requests += 1
+        self.prompt_tokens += tokens
+        self.context_tokens += context_tokens
+        PROMPT_TOKENS.labels("context" if context_tokens else "single").observe(tokens)
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.prompt_requests,
+            "prompt_tokens": self.prompt_tokens,
+            "context_tokens": self.context_tokens,
+            "avg_prompt_tokens": round(self.prompt_tokens / self.prompt_requests, 1) if self.prompt_requests else 0,
+        }
+
+    async def translate(
+        self,
+        text: str,
+        from_lang: str,
+        to_lang: str,
+        on_partial: PartialCallback | None = None,
+        context: ConversationContext | None = None,
+        priority: int = LIVE,
+        pin: str | None = None,
+    ) -> str | None:
+        """
+        Translate text between languages. Returns translated string or None on error.
+        If on_partial is given, the completion is streamed and on_partial is awaited
+        with the cleaned translation-so-far each time it grows.
+        Glossary entries and cached phrases are returned immediately without calling NIM.
+        With a session context, earlier turns are sent along and this turn is
+        appended to it; translations that depended on history, or on the pin's
+        custom glossary entries, are neither cached nor shared with other callers.
+        Upstream calls are admitted by priority and per provider pin; raises
+        UpstreamBusy when the quota wait would be too long.
+        """
+        t0 = time.perf_counter()
+        pair = pair_label(from_lang, to_lang)
+        shared = not context and not self._custom(text, from_lang, to_lang, pin)
+        translation, outcome = await self._lookup(text, from_lang, to_lang, pin, cached=shared)
+        if outcome is None:
+            if shared:
+                translation = await self._translate_shared(text, from_lang, to_lang, on_partial, priority, pin)
+            else:
+                translation = await self._translate_uncached(
+                    text, from_lang, to_lang, on_partial, context, priority, pin
+                )
+            if translation and self.glossary:
+                translation = self.glossary.enforce(text, translation, from_lang, to_lang, pin)
+            # Keyed on the primary model whichever backend answered: the configured
+            # backends are treated as interchangeable, so a failover answer is reused
+            # rather than re-asked. Changing the primary model starts a fresh cache.
+            if translation and self.cache and shared:
+                await self.cache.put(text, from_lang, to_lang, self._model, translation)
+            outcome = "ok" if translation else "failed"
+        if translation and context is not None:
+            context.add(_instruction(text, from_lang, to_lang), translation)
+        TRANSLATION_SECONDS.labels(pair, outcome).observe(time.perf_counter() - t0)
+        return translation
 
-            if resp.status_code != 200:
-                logger.error("NIM API error %d: %s", resp.status_code, resp.text[:200])
+    async def speculate(
+        self,
+        text: str,
+        from_lang: str,
+        to_lang: str,
+        context: ConversationContext | None = None,
+        pin: str | None = None,
+    ) -> str | None:
+        """
+        Translate a still-changing interim transcript. Same as translate() but
+        leaves the cache and the session history alone: only the final
+        transcript's translation is remembered, via accept(). Admitted below
+        live requests, and simply skipped (None) when quota is short.
+        """
+        t0 = time.perf_counter()
+        shared = not context and not self._custom(text, from_lang, to_lang, pin)
+        translation, outcome = await self._lookup(text, from_lang, to_lang, pin, cached=shared)
+        if outcome is None:
+            try:
+                if shared:
+                    translation = await self._translate_shared(text, from_lang, to_lang, None, SPECULATIVE, pin)
+                else:
+                    translation = await self._translate_uncached(
+                        text, from_lang, to_lang, None, context, SPECULATIVE, pin
+                    )
+            except UpstreamBusy:
                 return None
+            if translation and self.glossary:
+                translation = self.glossary.enforce(text, translation, from_lang, to_lang, pin)
+        TRANSLATION_SECONDS.labels(pair_label(from_lang, to_lang), "speculative").observe(time.perf_counter() - t0)
+        return translation
+
+    def accept(
+        self, text: str, translation: str, from_lang: str, to_lang: str, context: ConversationContext | None = None
+    ):
+        """Adopt a speculative translation as the final one for this turn."""
+        if context is not None:
+            context.add(_instruction(text, from_lang, to_lang), translation)
+
+    def _custom(self, text: str, from_lang: str, to_lang: str, pin: str | None) -> bool:
+        """True if the pin's custom glossary entries apply to this text."""
+        return self.glossary is not None and self.glossary.has_custom(text, from_lang, to_lang, pin)
+
+    async def _lookup(
+        self, text: str, from_lang: str, to_lang: str, pin: str | None = None, cached: bool = True
+    ) -> tuple[str | None, str | None]:
+        """Glossary, then cache. Returns (translation, outcome) or (None, None) on a miss."""
+        translation = self.glossary.lookup(text, from_lang, to_lang, pin) if self.glossary else None
+        if translation is not None:
+            return translation, "glossary"
+        if self.cache and cached:
+            translation = await self.cache.get(text, from_lang, to_lang, self._model)
+            if translation is not None:
+                return translation, "cache"
+        return None, None
 
-            result = resp.json()
-            translation = result["choices"][0]["message"]["content"].strip()
-            
-            # Clean up any unwanted wrapping the model might add
-            for prefix in ['"', "'", "Translation:", "Translated:"]:
-                if translation.startswith(prefix):
-                    translation = translation[len(prefix):]
-            for suffix in ['"', "'"]:
-                if translation.endswith(suffix):
-                    translation = translation[:-len(suffix)]
-            
-            return translation.strip()
+    async def prewarm(self, phrases: list[str], pairs: list[str]) -> int:
+        """Translate phrases ahead of time so they are served from cache. Returns count warmed."""
+        warmed = 0
+        for pair in pairs:
+            from_lang, _, to_lang = pair.partition("-")
+            for phrase in phrases:
+                if await self.translate(phrase, from_lang, to_lang, priority=BACKGROUND):
+                    warmed += 1
+        logger.info("Translation cache pre-warmed with %d entries", warmed)
+        return warmed
 
+    async def _translate_shared(
+        self,
+        text: str,
+        from_lang: str,
+        to_lang: str,
+        on_partial: PartialCallback | None,
+        priority: int = LIVE,
+        pin: str | None = None,
+    ) -> str | None:
+        """
+        One upstream call for all concurrent identical requests of the same
+        priority and mode. Priority is part of the key so a live request never
+        inherits a background flight's unbounded wait or a speculative one's
+        shedding, and streaming is so a streaming caller always gets partials
+        (every caller's on_partial receives them). The call is admitted with
+        the first caller's pin.
+        """
+        streaming = on_partial is not None
+        key = (normalize_text(text), from_lang, to_lang, self._model, priority, streaming)
+        return await self.flights.do(
+            key,
+            lambda notify: self._translate_uncached(
+                text, from_lang, to_lang, notify if streaming else None, None, priority, pin
+            ),
+            on_progress=on_partial,
+        )
+
+    async def _translate_uncached(
+        self,
+        text: str,
+        from_lang: str,
+        to_lang: str,
+        on_partial: PartialCallback | None,
+        context: ConversationContext | None = None,
+        priority: int = LIVE,
+        pin: str | None = None,
+    ) -> str | None:
+        try:
+            await self.admission.acquire(priority, pin)
+            try:
+                return await self._translate_upstream(text, from_lang, to_lang, on_partial, context, priority, pin)
+            except UpstreamRateLimited:
+                # This call got a 429: wait out the provider's Retry-After in the queue and try once more
+                await self.admission.acquire(priority, pin)
+                return await self._translate_upstream(
+                    text, from_lang, to_lang, on_partial, context, priority, pin
+                )
+
+        except UpstreamBusy:
+            raise
+        except UpstreamRateLimited:
+            logger.error("NIM rate limited twice for: %s", text[:40])
+            return None
         except httpx.TimeoutException:
             logger.error("NIM API timeout for: %s", text[:40])
             return None
         except Exception as e:
             logger.error("Translation error: %s", e)
             return None
+
+    async def _translate_upstream(
+        self,
+        text: str,
+        from_lang: str,
+        to_lang: str,
+        on_partial: PartialCallback | None,
+        context: ConversationContext | None,
+        priority: int = LIVE,
+        pin: str | None = None,
+    ) -> str | None:
+        if on_partial is not None:
+            return await self._translate_stream(text, from_lang, to_lang, on_partial, context, priority, pin)
+        # A batch shares one prompt, so no history and no pin's custom glossary
+        if self.batcher is not None and not context and not self._custom(text, from_lang, to_lang, pin):
+            return await self.batcher.submit(text, from_lang, to_lang)
+        return await self._translate_single(text, from_lang, to_lang, context, priority, pin)
+
+    async def _complete(self, payload: dict, priority: int = LIVE, pin: str | None = None) -> str | None:
+        """
+        Run one chat completion through the router and return the raw message
+        content. Raises UpstreamRateLimited if it failed on a 429.
+        """
+        return await self.router.complete(payload, priority, pin)
+
+    async def _translate_single(
+        self,
+        text: str,
+        from_lang: str,
+        to_lang: str,
+        context: ConversationContext | None = None,
+        priority: int = LIVE,
+        pin: str | None = None,
+    ) -> str | None:
+        content = await self._complete(self._build_request(text, from_lang, to_lang, context, pin), priority, pin)
+        return _clean_translation(content) if content is not None else None
+
+    async def _translate_batch(
+        self, texts: list[str], from_lang: str, to_lang: str
+    ) -> list[str | None]:
+        """
+        Translate several utterances in one completion that returns a JSON array.
+        Falls back to one request per text if the model's array doesn't line up.
+        """
+        if len(texts) == 1:
+            return [await self._translate_single(texts[0], from_lang, to_lang)]
+
+        from_name = LANG_NAMES.get(from_lang, from_lang)
+        to_name = LANG_NAMES.get(to_lang, to_lang)
+        user_msg = (
+            f"Translate each item of this JSON array from {from_name} to {to_name}:\n\n"
+            + json.dumps(texts, ensure_ascii=False)
+        )
+        hint = self.glossary.prompt_hint(texts, from_lang, to_lang) if self.glossary else ""
+        if hint:
+            user_msg = f"{hint}\n\n{user_msg}"
+        messages = [
+            {"role": "system", "content": BATCH_SYSTEM_PROMPT},
+            {"role": "user", "content": user_msg},
+        ]
+        self._count_prompt(messages)
+        content = await self._complete({
+            "model": self._model,
+            "messages": messages,
+            "temperature": 0.1,
+            "max_tokens": 512 * len(texts),
+        })
+
+        results = _parse_batch(content, len(texts)) if content is not None else None
+        if results is None:
+            logger.warning("Batch of %d returned a malformed array — retrying individually", len(texts))
+            return await asyncio.gather(
+                *(self._translate_single(t, from_lang, to_lang) for t in texts)
+            )
+        return results
+
+    async def _translate_stream(
+        self,
+        text: str,
+        from_lang: str,
+        to_lang: str,
+        on_partial: PartialCallback,
+        context: ConversationContext | None = None,
+        priority: int = LIVE,
+        pin: str | None = None,
+    ) -> str | None:
+        """
+        Consume the `stream: true` SSE response token by token from the best
+        backend. Fails over to the next backend only if nothing was emitted
+        yet; each failover is a new upstream call and is admitted again.
+        Streams are not hedged: partials from two backends can't be merged.
+        Raises UpstreamRateLimited if no backend succeeded and one answered 429.
+        """
+        payload = {**self._build_request(text, from_lang, to_lang, context, pin), "stream": True}
+        last_sent = ""
+        rate_limited = False
+
+        for attempt, backend in enumerate(self.router.ranked()):
+            if attempt:
+                await self.admission.acquire(priority, pin)
+            cleaner = _StreamCleaner()  # output a failed backend held back must not leak into this one
+            t0 = time.monotonic()
+            try:
+                async with self._client.stream(
+                    "POST", backend.url, headers=backend.headers,
+                    json={**payload, "model": backend.model},
+                ) as resp:
+                    if resp.status_code == 429:
+                        retry_after = parse_retry_after(resp.headers.get("retry-after"))
+                        logger.warning("%s rate limited (Retry-After: %s)", backend.name, retry_after)
+                        backend.record_failure()
+                        NIM_FAILURES.labels(backend.name, "rate_limited").inc()
+                        self.admission.throttled(retry_after)
+                        rate_limited = True
+                        continue
+                    if resp.status_code != 200:
+                        body = await resp.aread()
+                        logger.error("%s API error %d: %s", backend.name, resp.status_code, body[:200])
+                        backend.record_failure()
+                        NIM_FAILURES.labels(backend.name, "http").inc()
+                        continue
+
+                    async for line in resp.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[len("data:"):].strip()
+                        if data == "[DONE]":
+                            break
+                        chunk = json.loads(data)
+                        if chunk.get("usage"):
+                            record_usage(backend.name, chunk["usage"])
+                        choices = chunk.get("choices") or []
+                        delta = choices[0].get("delta", {}).get("content") if choices else None
+                        if not delta:
+                            continue
+                        partial = cleaner.feed(delta)
+                        if partial and partial != last_sent:
+                            last_sent = partial
+                            await on_partial(partial)
+            except (httpx.TransportError, ValueError) as e:
+                backend.record_failure()
+                reason = "timeout" if isinstance(e, httpx.TimeoutException) else "error"
+                NIM_FAILURES.labels(backend.name, reason).inc()
+                if last_sent:
+                    raise
+                logger.warning("%s stream failed before first token (%s) — failing over", backend.name, e)
+                continue
+
+            latency = time.monotonic() - t0
+            backend.record_success(latency)
+            NIM_REQUEST_SECONDS.labels(backend.name, "stream").observe(latency)
+            self.admission.succeeded()
+            return cleaner.finish() or None
+
+        if rate_limited:
+            raise UpstreamRateLimited()
+        return None
@@ -2,86 +2,208 @@
 Local TTS service using Meta MMS (Massively Multilingual Speech).
 Generates audio for Haitian Creole using the facebook/mms-tts-hat model.
 Runs entirely on-device — no API key, no cost, correct Creole pronunciation.
-Uses MPS (Metal) GPU acceleration on Apple Silicon for fast inference.
+Inference runs on a TTSExecutor pool (see tts_executor.py); async handlers
+use generate_async / generate_stream_async and never block the event loop.
+The forward pass itself goes through a TTS engine (see tts_engines.py):
+eager torch, or the model exported to ONNX Runtime, optionally int8.
 """
-import io
+import asyncio
 import logging
 import time
-import torch
+from typing import AsyncIterator, Iterator, List
+
 import numpy as np
-from transformers import VitsModel, AutoTokenizer
+
+from .audio import split_for_tts
+from .audio_encoding import available_formats, encode, encode_segment, stream_header
+from .tts_engines import TorchEngine, build_engine, parity, parity_ok
+from .tts_executor import TTSExecutor
 
 logger = logging.getLogger("medtranslate.tts")
 
+# Checked through every exported engine against eager output at load
+PARITY_PHRASES = (
+    "Bonjou, kijan ou santi ou jodi a?",
+    "Èske ou gen doulè nan pwatrin ou?",
+    "Respire fon, epi kenbe souf ou.",
+)
+
 
 class LocalTTS:
     """Haitian Creole TTS using Meta MMS, loaded once at startup."""
 
-    def __init__(self):
+    def __init__(
+        self,
+        model_id: str = "facebook/mms-tts-hat",
+        executor: str = "thread",
+        workers: int = 1,
+        threads_per_worker: int = 0,
+        max_queue: int = 8,
+        max_batch_size: int = 1,
+        max_batch_wait_ms: float = 5.0,
+        output_rate: int = 0,
+        engine: str = "torch",
+        engine_dir: str = "",
+        parity_min_snr_db: float = 20.0,
+    ):
+        self.model_id = model_id
+        self.engine_kind = engine
+        self.engine_dir = engine_dir
+        self.parity_min_snr_db = parity_min_snr_db
+        self.engine = None
+        self.parity = None  # last parity report for an exported engine
+        self.output_rate = output_rate  # 0 = the model's native rate
         self.model = None
         self.tokenizer = None
         self.sample_rate = 16000
         self.device = "cpu"
         self._ready = False
+        self.formats = available_formats()
+        self.executor = TTSExecutor(
+            executor, workers, threads_per_worker, max_queue, max_batch_size, max_batch_wait_ms
+        )
+        self._noise = (0.667, 0.8)
 
-    async def initialize(self):
-        """Load the MMS Haitian Creole model. Called once during server startup."""
+    def load(self, threads: int = 0):
+        """Load and warm up the model in the current process (blocking). threads sizes ORT's pool."""
         # VITS architecture is sequential — MPS GPU is actually slower
         # due to data transfer overhead. CPU on Apple Silicon is fastest.
         self.device = "cpu"
+        # Imported here, on the loading thread: transformers pulls in torch, which
+        # takes seconds and would otherwise block the event loop at startup
+        from transformers import AutoTokenizer, VitsModel
 
         logger.info("Loading Meta MMS model on device=%s ...", self.device)
+        self.model = VitsModel.from_pretrained(self.model_id)
+        self.model = self.model.to(self.device)
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_id)
+        self.sample_rate = self.model.config.sampling_rate
+        self._noise = (self.model.config.noise_scale, self.model.config.noise_scale_duration)
+        self.engine = TorchEngine(self.model)
+        if self.engine_kind != "torch":
+            self._load_engine(threads)
+        self._ready = True
+
+        # Warm up with a short phrase so first real request is fast
+        logger.info("Warming up model...")
+        self._forward(["Bonjou"])
+        logger.info("MMS model ready (engine=%s, sample_rate=%d)", self.engine.name, self.sample_rate)
+
+    def _load_engine(self, threads: int):
+        """
+        Switch to the exported engine if it matches eager output on the parity
+        phrases; otherwise stay on torch, so a bad export degrades speed, not audio.
+        """
         try:
-            self.model = VitsModel.from_pretrained("facebook/mms-tts-hat")
-            self.model = self.model.to(self.device)
-            self.tokenizer = AutoTokenizer.from_pretrained("facebook/mms-tts-hat")
-            self.sample_rate = self.model.config.sampling_rate
-            self._ready = True
+            engine = build_engine(self.engine_kind, self.model, self.engine_dir, threads)
+            inputs = [self._tokenize([text]) for text in PARITY_PHRASES]
+            self.parity = parity(engine, self.engine, inputs)
+        except Exception as e:
+            logger.error("TTS engine %s unavailable, using torch: %s", self.engine_kind, e)
+            return
+        if not parity_ok(self.parity, self.parity_min_snr_db):
+            logger.error("TTS engine %s failed parity with eager (%s), using torch",
+                         self.engine_kind, self.parity)
+            return
+        logger.info("TTS engine %s passed parity (%s)", self.engine_kind, self.parity)
+        self.engine = engine
+        self.model = None  # the session holds its own weights; drop the eager copy
 
-            # Warm up with a short phrase so first real request is fast
-            logger.info("Warming up model...")
-            warmup_inputs = self.tokenizer("Bonjou", return_tensors="pt").to(self.device)
-            with torch.no_grad():
-                self.model(**warmup_inputs)
-            logger.info("MMS model ready (device=%s, sample_rate=%d)", self.device, self.sample_rate)
+    def _tokenize(self, texts: List[str]):
+        inputs = self.tokenizer(texts, return_tensors="np", padding=True)
+        return inputs["input_ids"].astype(np.int64), inputs["attention_mask"].astype(np.int64)
+
+    def _forward(self, texts: List[str]):
+        return self.engine.run(*self._tokenize(texts), *self._noise)
+
+    async def initialize(self):
+        """Start the inference pool and load the model into it. Called once during server startup."""
+        try:
+            self.sample_rate = await self.executor.start(self)
+            self._ready = True
         except Exception as e:
             logger.error("Failed to load MMS model: %s", e)
             self._ready = False
 
+    async def shutdown(self):
+        await self.executor.shutdown()
+
     @property
     def is_ready(self) -> bool:
         return self._ready
 
-    def generate(self, text: str) -> bytes:
+    def synthesize(self, text: str) -> np.ndarray:
+        """Float waveform for one piece of text. Blocking — runs on an executor worker."""
+        t0 = time.time()
+        waveforms, _ = self._forward([text])
+        waveform = waveforms[0]
+        logger.info("TTS generated %.2fs audio in %.2fs (engine=%s)",
+                    len(waveform) / self.sample_rate, time.time() - t0, self.engine.name)
+        return waveform
+
+    def synthesize_batch(self, texts: List[str]) -> List[np.ndarray]:
         """
-        Generate WAV audio bytes from Haitian Creole text.
-        Returns raw WAV file bytes ready to serve.
+        Float waveforms for several texts in one padded forward pass. VITS
+        reports each item's length in samples (sequence_lengths), so the
+        padded tail of every waveform is cut off.
+        """
+        if len(texts) == 1:
+            return [self.synthesize(texts[0])]
+
+        t0 = time.time()
+        waveforms, lengths = self._forward(texts)
+        lengths = [int(n) for n in lengths]
+        logger.info("TTS generated %d utterances (%.2fs audio) in %.2fs (engine=%s)",
+                    len(texts), sum(lengths) / self.sample_rate, time.time() - t0, self.engine.name)
+        return [waveforms[i, :n] for i, n in enumerate(lengths)]
+
+    def generate(self, text: str, fmt: str = "wav") -> bytes:
+        """
+        Generate audio bytes (WAV by default) from Haitian Creole text.
+        Returns a complete file ready to serve.
         """
         if not self._ready:
             raise RuntimeError("MMS model not loaded")
+        return encode(self.synthesize(text), self.sample_rate, fmt, self.output_rate)
 
-        t0 = time.time()
-        inputs = self.tokenizer(text, return_tensors="pt").to(self.device)
-
-        with torch.no_grad():
-            output = self.model(**inputs).waveform
-
-        waveform = output.squeeze().cpu().numpy()
-        elapsed = time.time() - t0
-        logger.info("TTS generated %.2fs audio in %.2fs (device=%s)",
-                     len(waveform) / self.sample_rate, elapsed, self.device)
-
-        # Convert to 16-bit PCM WAV
-        pcm = (waveform * 32767).astype(np.int16)
-
-        # Build WAV file in memory
-        buf = io.BytesIO()
-        import wave
-        with wave.open(buf, "wb") as wf:
-            wf.setnchannels(1)
-            wf.setsampwidth(2)  # 16-bit
-            wf.setframerate(self.sample_rate)
-            wf.writeframes(pcm.tobytes())
-
-        buf.seek(0)
-        return buf.read()
+    def generate_stream(self, text: str, fmt: str = "wav") -> Iterator[bytes]:
+        """
+        Yield a streaming WAV (header first, then 16-bit PCM one sentence at
+        a time) or per-sentence MP3, so playback can start before the whole
+        utterance is synthesized.
+        """
+        if not self._ready:
+            raise RuntimeError("MMS model not loaded")
+
+        yield stream_header(self.sample_rate, fmt, self.output_rate)
+        for chunk in split_for_tts(text):
+            yield encode_segment(self.synthesize(chunk), self.sample_rate, fmt, self.output_rate)
+
+    async def generate_async(self, text: str, fmt: str = "wav") -> bytes:
+        """generate() on the inference pool. Raises TTSOverloaded when the queue is full."""
+        if not self._ready:
+            raise RuntimeError("MMS model not loaded")
+        waveform = await self.executor.synthesize(text)
+        return await self._encode(encode, waveform, fmt)
+
+    def generate_stream_async(self, text: str, fmt: str = "wav") -> AsyncIterator[bytes]:
+        """
+        generate_stream() on the inference pool. Admission is checked here,
+        before the response starts, so an overloaded pool can still answer 503.
+        """
+        if not self._ready:
+            raise RuntimeError("MMS model not loaded")
+        self.executor.check_capacity()
+        return self._stream_async(split_for_tts(text), fmt)
+
+    async def _stream_async(self, chunks, fmt: str) -> AsyncIterator[bytes]:
+        yield stream_header(self.sample_rate, fmt, self.output_rate)
+        for chunk in chunks:
+            waveform = await self.executor.synthesize(chunk, admit=False)
+            yield await self._encode(encode_segment, waveform, fmt)
+
+    async def _encode(self, encoder, waveform: np.ndarray, fmt: str) -> bytes:
+        # WAV is a single vectorized pass; compressed codecs go to a thread
+        if fmt == "wav":
+            return encoder(waveform, self.sample_rate, fmt, self.output_rate)
+        return await asyncio.to_thread(encoder, waveform, self.sample_rate, fmt, self.output_rate)
@@ -0,0 +1,162 @@
+"""
+TTS Audio Cache — content-addressed audio storage in front of Modal and LocalTTS.
+Keys are sha256(normalized text, lang, voice, format, rate), so the key
+doubles as a strong ETag: a client holding that ETag already has the right audio.
+Two tiers: an in-memory LRU bounded by bytes, and an optional size-bounded
+disk directory served straight from the file (no copy into Python memory).
+Only phrase-library audio is written to disk by default — live utterances
+may contain PHI and stay in memory unless tts_cache_persist_live is set.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import AsyncIterator, Callable, Dict, Optional
+
+from .cache import normalize_text
+
+logger = logging.getLogger("medtranslate.tts_cache")
+
+
+class TTSCache:
+    """Two-tier (memory LRU + disk) cache of synthesized audio."""
+
+    def __init__(
+        self,
+        memory_bytes: int = 32 * 1024 * 1024,
+        disk_dir: str = "",
+        disk_bytes: int = 512 * 1024 * 1024,
+        max_item_bytes: int = 4 * 1024 * 1024,
+    ):
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._memory_limit = memory_bytes
+        self._max_item = max_item_bytes
+        self._disk_dir = Path(disk_dir) if disk_dir else None
+        self._disk: "OrderedDict[str, int]" = OrderedDict()  # key -> size, oldest first
+        self._disk_bytes = 0
+        self._disk_limit = disk_bytes
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+        if self._disk_dir is not None:
+            self._disk_dir.mkdir(parents=True, exist_ok=True)
+            files = sorted(self._disk_dir.glob("*.audio"), key=lambda p: p.stat().st_mtime)
+            for path in files:
+                size = path.stat().st_size
+                self._disk[path.stem] = size
+                self._disk_bytes += size
+            logger.info("TTS disk cache at %s (%d files, %.1f MB)",
+                        self._disk_dir, len(self._disk), self._disk_bytes / 2**20)
+
+    @staticmethod
+    def make_key(text: str, lang: str, voice: str, fmt: str = "wav", sample_rate: int = 0) -> str:
+        raw = "\x1f".join((normalize_text(text), lang, voice, fmt, str(sample_rate)))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def etag(key: str) -> str:
+        return f'"{key}"'
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Memory tier lookup."""
+        audio = self._memory.get(key)
+        if audio is not None:
+            self._memory.move_to_end(key)
+            self.hits += 1
+        return audio
+
+    def get_path(self, key: str) -> Optional[Path]:
+        """Disk tier lookup. Returns a file to serve directly, or None (counted as a miss)."""
+        if self._disk_dir is not None and key in self._disk:
+            path = self._disk_path(key)
+            if path.exists():
+                self._disk.move_to_end(key)
+                os.utime(path)  # keep recency across restarts
+                self.hits += 1
+                self.disk_hits += 1
+                return path
+            self._disk_bytes -= self._disk.pop(key)
+        self.misses += 1
+        return None
+
+    def persisted(self, key: str) -> bool:
+        """True if this audio is in the disk tier (without counting a hit or miss)."""
+        return key in self._disk
+
+    async def put(self, key: str, audio: bytes, persist: bool = False):
+        if len(audio) > self._max_item:
+            return
+        previous = self._memory.get(key)
+        self._memory_bytes += len(audio) - (len(previous) if previous is not None else 0)
+        self._memory[key] = audio
+        self._memory.move_to_end(key)
+        while self._memory_bytes > self._memory_limit and self._memory:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+        if persist and self._disk_dir is not None and key not in self._disk:
+            if not await asyncio.to_thread(self._write_file, self._disk_path(key), audio):
+                return
+            self._disk[key] = len(audio)
+            self._disk_bytes += len(audio)
+            victims = []
+            while self._disk_bytes > self._disk_limit and self._disk:
+                old_key, size = self._disk.popitem(last=False)
+                self._disk_bytes -= size
+                victims.append(self._disk_path(old_key))
+            for victim in victims:
+                await asyncio.to_thread(victim.unlink, missing_ok=True)
+
+    async def tee(
+        self,
+        key: str,
+        chunks: AsyncIterator[bytes],
+        persist: bool = False,
+        finalize: Optional[Callable[[bytes], bytes]] = None,
+    ) -> AsyncIterator[bytes]:
+        """
+        Pass a stream through unchanged and cache it once it completes
+        (after `finalize`, e.g. finalize_wav to fill in a streamed WAV's sizes).
+        Nothing is cached if the client disconnects part-way.
+        """
+        parts = []
+        total = 0
+        async for chunk in chunks:
+            yield chunk
+            total += len(chunk)
+            if total <= self._max_item:
+                parts.append(chunk)
+        if total <= self._max_item:
+            audio = b"".join(parts)
+            await self.put(key, finalize(audio) if finalize else audio, persist)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+            "disk_entries": len(self._disk),
+            "disk_bytes": self._disk_bytes,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+        }
+
+    def _disk_path(self, key: str) -> Path:
+        return self._disk_dir / f"{key}.audio"
+
+    @staticmethod
+    def _write_file(path: Path, audio: bytes) -> bool:
+        try:
+            tmp = path.with_suffix(f".{os.urandom(4).hex()}.tmp")
+            tmp.write_bytes(audio)
+            os.replace(tmp, path)
+            return True
+        except Exception as e:
+            logger.warning("TTS cache disk write failed: %s", e)
+            return False
@@ -0,0 +1,218 @@
+"""
+TTS Inference Engines — how LocalTTS runs a VITS forward pass.
+"torch" is the eager fp32 model. "onnx" exports it once to ONNX (cached on
+disk, keyed by model and config) and runs it under ONNX Runtime;
+"onnx-int8" also applies dynamic int8 quantization to the exported graph.
+ORT sessions get an explicit intra-op thread count, the same CPU partition
+the executor gives torch.
+
+Only the audio-rate stages (prior flow and HiFi-GAN decoder) are quantized.
+That is where the time goes; the phoneme-rate text encoder and duration
+predictor decide how long each sound lasts, and keeping them fp32 keeps the
+timing identical to eager so parity is a straight waveform comparison.
+"""
+import hashlib
+import inspect
+import logging
+import math
+import os
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("medtranslate.tts_engines")
+
+ENGINES = ("torch", "onnx", "onnx-int8")
+DEFAULT_DIR = Path.home() / ".cache" / "medtranslate" / "onnx"
+
+# Graph scopes left in fp32 by the int8 engine (see module docstring)
+_FP32_SCOPES = ("/text_encoder/", "/duration_predictor/")
+# Parity tolerance on output length (fraction of samples); durations are fp32 in every engine
+MAX_LENGTH_ERROR = 0.01
+
+Inputs = Tuple[np.ndarray, np.ndarray]  # int64 input_ids, attention_mask — [batch, tokens]
+
+
+class TorchEngine:
+    """Eager PyTorch forward pass; the reference the exported engines are checked against."""
+
+    name = "torch"
+
+    def __init__(self, model):
+        self.model = model
+
+    def run(
+        self, input_ids: np.ndarray, attention_mask: np.ndarray, noise_scale: float, noise_scale_duration: float
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Padded [batch, samples] waveforms and each item's length in samples."""
+        import torch
+
+        self.model.noise_scale = noise_scale
+        self.model.noise_scale_duration = noise_scale_duration
+        with torch.no_grad():
+            output = self.model(
+                input_ids=torch.from_numpy(input_ids), attention_mask=torch.from_numpy(attention_mask)
+            )
+        return output.waveform.cpu().numpy(), output.sequence_lengths.cpu().numpy()
+
+
+class OnnxEngine:
+    """An exported VITS graph on an ONNX Runtime CPU session."""
+
+    def __init__(self, name: str, path: Path, threads: int = 0):
+        import onnxruntime as ort
+
+        self.name = name
+        self.path = path
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads  # 0 = ORT default (all cores)
+        options.inter_op_num_threads = 1  # VITS is one sequential chain of ops
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        # Idle pool threads otherwise busy-wait between requests, stealing CPU from the rest of the server
+        options.add_session_config_entry("session.intra_op.allow_spinning", "0")
+        self.session = ort.InferenceSession(str(path), options, providers=["CPUExecutionProvider"])
+
+    def run(
+        self, input_ids: np.ndarray, attention_mask: np.ndarray, noise_scale: float, noise_scale_duration: float
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        waveform, lengths = self.session.run(None, {
+            "input_ids": input_ids,
+            "attention_mask": attention_mask,
+            "noise_scale": np.array(noise_scale, dtype=np.float32),
+            "noise_scale_duration": np.array(noise_scale_duration, dtype=np.float32),
+        })
+        return waveform, lengths
+
+
+# ── Export ─────────────────────────────────────────────────────────
+def _exportable(model):
+    import torch
+
+    class _Exportable(torch.nn.Module):
+        """VITS with its sampling noise scales as graph inputs instead of baked-in constants."""
+
+        def __init__(self):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask, noise_scale, noise_scale_duration):
+            self.model.noise_scale = noise_scale
+            self.model.noise_scale_duration = noise_scale_duration
+            output = self.model(input_ids=input_ids, attention_mask=attention_mask)
+            return output.waveform, output.sequence_lengths
+
+    return _Exportable().eval()
+
+
+def _model_key(model) -> str:
+    """File stem identifying the model's weights source and architecture."""
+    config = model.config
+    digest = hashlib.sha1("|".join((
+        model.name_or_path or "",
+        getattr(config, "_commit_hash", None) or "",
+        config.to_json_string(),
+    )).encode()).hexdigest()[:12]
+    name = (model.name_or_path or "vits").strip("/").replace("/", "--")
+    return f"{name}-{digest}"
+
+
+def export_onnx(model, path: Path, opset: int = 17):
+    """Trace model to an fp32 ONNX file with dynamic batch, token and sample axes."""
+    import torch
+
+    ids = torch.randint(1, model.config.vocab_size, (1, 24), dtype=torch.long)
+    mask = torch.ones_like(ids)
+    kwargs = {}
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        kwargs["dynamo"] = False  # the dynamic_axes below are for the TorchScript exporter
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    noise = model.noise_scale, model.noise_scale_duration
+    with torch.no_grad():
+        torch.onnx.export(
+            _exportable(model),
+            (ids, mask, torch.tensor(model.noise_scale), torch.tensor(model.noise_scale_duration)),
+            str(tmp),
+            input_names=["input_ids", "attention_mask", "noise_scale", "noise_scale_duration"],
+            output_names=["waveform", "sequence_lengths"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "tokens"},
+                "attention_mask": {0: "batch", 1: "tokens"},
+                "waveform": {0: "batch", 1: "samples"},
+                "sequence_lengths": {0: "batch"},
+            },
+            opset_version=opset,
+            **kwargs,
+        )
+    model.noise_scale, model.noise_scale_duration = noise  # tracing left tensors there
+    os.replace(tmp, path)  # atomic, so process-pool workers exporting at once never see a partial file
+
+
+def quantize_int8(fp32_path: Path, int8_path: Path):
+    """Dynamic int8 quantization of the audio-rate stages (activation ranges found at run time, no calibration set)."""
+    import onnx
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    graph = onnx.load(str(fp32_path), load_external_data=False).graph
+    keep_fp32 = [n.name for n in graph.node if any(scope in n.name for scope in _FP32_SCOPES)]
+    tmp = int8_path.with_name(f"{int8_path.name}.{os.getpid()}.tmp")
+    quantize_dynamic(
+        str(fp32_path),
+        str(tmp),
+        weight_type=QuantType.QUInt8,  # ORT's CPU ConvInteger kernel only takes uint8 weights
+        nodes_to_exclude=keep_fp32,
+    )
+    os.replace(tmp, int8_path)
+
+
+def build_engine(kind: str, model, cache_dir: str = "", threads: int = 0):
+    """The engine `kind` for an eager VitsModel, exporting/quantizing into cache_dir on first use."""
+    if kind not in ENGINES:
+        raise ValueError(f"unknown TTS engine: {kind}")
+    if kind == "torch":
+        return TorchEngine(model)
+
+    directory = Path(cache_dir) if cache_dir else DEFAULT_DIR
+    directory.mkdir(parents=True, exist_ok=True)
+    fp32_path = directory / f"{_model_key(model)}.onnx"
+    if not fp32_path.exists():
+        t0 = time.perf_counter()
+        export_onnx(model, fp32_path)
+        logger.info("Exported TTS model to %s in %.1fs", fp32_path, time.perf_counter() - t0)
+    path = fp32_path
+    if kind == "onnx-int8":
+        path = fp32_path.with_name(f"{fp32_path.stem}-int8.onnx")
+        if not path.exists():
+            t0 = time.perf_counter()
+            quantize_int8(fp32_path, path)
+            logger.info("Quantized TTS model to %s in %.1fs", path, time.perf_counter() - t0)
+    return OnnxEngine(kind, path, threads)
+
+
+# ── Parity ─────────────────────────────────────────────────────────
+def parity(engine, reference, inputs: Iterable[Inputs]) -> Dict[str, float]:
+    """
+    Compare engine against reference on single-utterance inputs with the
+    sampling noise switched off, so both are deterministic. Reports the worst
+    length error (fraction of samples) and the worst waveform SNR in dB.
+    """
+    worst_snr = math.inf
+    worst_length = 0.0
+    for input_ids, attention_mask in inputs:
+        ref_wave, ref_len = reference.run(input_ids, attention_mask, 0.0, 0.0)
+        out_wave, out_len = engine.run(input_ids, attention_mask, 0.0, 0.0)
+        n_ref, n_out = int(ref_len[0]), int(out_len[0])
+        worst_length = max(worst_length, abs(n_out - n_ref) / max(n_ref, 1))
+        n = min(n_ref, n_out)
+        ref = ref_wave[0, :n].astype(np.float64)
+        error = float(np.sum((ref - out_wave[0, :n]) ** 2))
+        signal = float(np.sum(ref ** 2))
+        snr = math.inf if error == 0 else 10 * math.log10(max(signal, 1e-12) / error)
+        worst_snr = min(worst_snr, snr)
+    return {"length_error": worst_length, "snr_db": worst_snr}
+
+
+def parity_ok(report: Dict[str, float], min_snr_db: float) -> bool:
+    return report["length_error"] <= MAX_LENGTH_ERROR and report["snr_db"] >= min_snr_db
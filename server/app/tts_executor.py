@@ -0,0 +1,215 @@
+"""
+TTS Inference Executor — runs LocalTTS forward passes off the event loop.
+A dedicated pool (threads sharing one model, or processes each holding
+their own copy) with intra-op threads (torch's or ONNX Runtime's)
+partitioned across workers, so concurrent requests don't oversubscribe the
+CPU. Requests wait in a bounded queue in front of the pool; once it is full
+new requests are rejected with TTSOverloaded instead of piling up behind
+the model.
+With max_batch_size > 1, texts waiting in that queue are synthesized
+together in one padded forward pass when a worker frees up.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("medtranslate.tts_executor")
+
+
+class TTSOverloaded(Exception):
+    """The inference queue is full; the caller should retry later."""
+
+
+# ── Process-pool worker side ───────────────────────────────────────
+_worker_tts = None
+
+
+def _init_worker(model_id: str, threads: int, engine: str, engine_dir: str, parity_min_snr_db: float):
+    """Runs once in each worker process: pin torch threads and load the model."""
+    global _worker_tts
+    import torch
+    from .tts import LocalTTS
+
+    torch.set_num_threads(threads)
+    _worker_tts = LocalTTS(
+        model_id=model_id, engine=engine, engine_dir=engine_dir, parity_min_snr_db=parity_min_snr_db
+    )
+    _worker_tts.load(threads)
+
+
+def _worker_sample_rate() -> int:
+    return _worker_tts.sample_rate
+
+
+def _worker_batch(texts: List[str]) -> list:
+    return _worker_tts.synthesize_batch(texts)
+
+
+class TTSExecutor:
+    """Bounded, CPU-partitioned pool for LocalTTS inference."""
+
+    def __init__(
+        self,
+        mode: str = "thread",
+        workers: int = 1,
+        threads_per_worker: int = 0,
+        max_queue: int = 8,
+        max_batch_size: int = 1,
+        max_batch_wait_ms: float = 5.0,
+    ):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"unknown TTS executor mode: {mode}")
+        self.mode = mode
+        self.workers = max(1, workers)
+        # 0 = split the host's cores evenly between workers
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // self.workers)
+        self.max_queue = max_queue
+        self.max_batch_size = max(1, max_batch_size)
+        self._max_batch_wait = max_batch_wait_ms / 1000.0
+        self._pending: Deque[Tuple[str, asyncio.Future]] = deque()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._drains: set = set()
+        self._pool: Optional[Executor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._local_tts = None
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.batches = 0
+
+    async def start(self, local_tts) -> int:
+        """Load the model into the pool. Returns the model's sample rate."""
+        self._slots = asyncio.Semaphore(self.workers)
+        loop = asyncio.get_running_loop()
+        if self.mode == "thread":
+            self._local_tts = local_tts
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="tts")
+            await loop.run_in_executor(self._pool, self._load_in_thread, local_tts)
+            sample_rate = local_tts.sample_rate
+        else:
+            # spawn, not fork: forking a process that has touched torch can deadlock
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(
+                    local_tts.model_id, self.threads_per_worker,
+                    local_tts.engine_kind, local_tts.engine_dir, local_tts.parity_min_snr_db,
+                ),
+            )
+            # Touch every worker so they all load before the first real request
+            rates = await asyncio.gather(*(
+                loop.run_in_executor(self._pool, _worker_sample_rate) for _ in range(self.workers)
+            ))
+            sample_rate = rates[0]
+        logger.info("TTS executor ready (mode=%s, workers=%d, threads/worker=%d, max_queue=%d)",
+                    self.mode, self.workers, self.threads_per_worker, self.max_queue)
+        return sample_rate
+
+    def _load_in_thread(self, local_tts):
+        """Thread mode, on a pool thread: importing torch takes seconds and would stall the event loop."""
+        import torch
+
+        # Intra-op threads are process-wide: workers x threads ≈ cores
+        torch.set_num_threads(self.threads_per_worker)
+        local_tts.load(self.threads_per_worker)
+
+    def check_capacity(self):
+        """
+        Raise TTSOverloaded if a new request would not fit in the queue. The
+        queue bound holds on its own: idle workers only mean the queue is about
+        to drain, and a burst arriving in the same tick would otherwise all get in.
+        """
+        if self.queued >= self.max_queue:
+            self.rejected += 1
+            raise TTSOverloaded(f"{self.queued} TTS requests already queued")
+
+    async def synthesize(self, text: str, admit: bool = True):
+        """
+        Float waveform for `text`. Requests queue here (not inside the pool), so
+        a caller that disconnects while waiting never reaches the model.
+        admit=False skips the capacity check, for later sentences of a
+        stream that was already admitted.
+        """
+        if admit:
+            self.check_capacity()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        self.queued += 1
+        if len(self._pending) >= self.max_batch_size or self._max_batch_wait <= 0:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self._max_batch_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        task = asyncio.create_task(self._drain())
+        self._drains.add(task)
+        task.add_done_callback(self._drains.discard)
+
+    async def _drain(self):
+        """Wait for a free worker, then take up to max_batch_size live requests."""
+        async with self._slots:
+            batch = []
+            while self._pending and len(batch) < self.max_batch_size:
+                text, future = self._pending.popleft()
+                self.queued -= 1
+                if not future.done():  # skip callers that gave up while queued
+                    batch.append((text, future))
+            if self._pending and self._timer is None:
+                self._flush()
+            if not batch:
+                return
+
+            texts = [text for text, _ in batch]
+            loop = asyncio.get_running_loop()
+            self.running += 1
+            self.batches += 1
+            try:
+                # Not cancellable by callers: a started forward pass keeps its
+                # worker until it actually finishes
+                if self.mode == "thread":
+                    results = await loop.run_in_executor(self._pool, self._local_tts.synthesize_batch, texts)
+                else:
+                    results = await loop.run_in_executor(self._pool, _worker_batch, texts)
+            except Exception as e:
+                logger.error("TTS inference failed (batch of %d): %s", len(texts), e)
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+            finally:
+                self.running -= 1
+                self.completed += len(texts)
+            for (_, future), waveform in zip(batch, results):
+                if not future.done():
+                    future.set_result(waveform)
+
+    async def shutdown(self):
+        for task in list(self._drains):
+            task.cancel()
+        if self._pool is not None:
+            await asyncio.to_thread(self._pool.shutdown, True, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "threads_per_worker": self.threads_per_worker,
+            "max_queue": self.max_queue,
+            "queued": self.queued,
+            "running": self.running,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "max_batch_size": self.max_batch_size,
+            "batches": self.batches,
+        }
@@ -0,0 +1,70 @@
+"""
+TTS Tickets — opaque URLs for audio that an <audio> element fetches by GET.
+The text to speak may be PHI, so it never goes in a URL in the clear (access
+logs, proxy logs, browser history and service-worker cache keys all record
+URLs). The client POSTs the request and gets back a ticket: the request
+itself, AES-256-GCM encrypted under tts_ticket_key. Any worker holding that
+key can open it, so nothing is stored and /api/tts/audio/<ticket> works
+behind a load balancer and across restarts.
+The nonce is derived from the request itself (synthetic IV), so a request
+always encrypts to the same ticket: a repeated phrase keeps one URL, and the
+service worker's cached copy stays addressable. The flip side is that equal
+tickets reveal equal requests, which the audio's ETag does anyway.
+"""
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import logging
+from dataclasses import dataclass
+from typing import Optional
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+logger = logging.getLogger("medtranslate.tts_tickets")
+
+_NONCE_BYTES = 12
+
+
+@dataclass
+class TTSTicket:
+    text: str
+    lang: str
+    stream: bool
+    fmt: str
+
+
+class TTSTickets:
+    """Seals TTS requests into self-verifying ticket ids and opens them again."""
+
+    def __init__(self, encryption_key: str = ""):
+        if encryption_key:
+            key = base64.b64decode(encryption_key)
+        else:
+            key = AESGCM.generate_key(bit_length=256)
+            logger.warning("No TTS ticket key set — ticket URLs are valid on this worker until it restarts")
+        self._aesgcm = AESGCM(key)
+        # A separate key for nonces, so the synthetic IV never reuses the cipher key directly
+        self._nonce_key = hmac.new(key, b"medtranslate tts ticket nonce", hashlib.sha256).digest()
+
+    def issue(self, text: str, lang: str, stream: bool, fmt: str) -> str:
+        """The ticket id for a request; always the same for the same request and key."""
+        plaintext = json.dumps([text, lang, stream, fmt], ensure_ascii=False).encode("utf-8")
+        # Derived from the whole plaintext: two different requests never share a nonce
+        nonce = hmac.new(self._nonce_key, plaintext, hashlib.sha256).digest()[:_NONCE_BYTES]
+        sealed = nonce + self._aesgcm.encrypt(nonce, plaintext, None)
+        return base64.urlsafe_b64encode(sealed).rstrip(b"=").decode("ascii")
+
+    def get(self, ticket_id: str) -> Optional[TTSTicket]:
+        """The request sealed in a ticket, or None if it is malformed or was not issued under this key."""
+        try:
+            sealed = base64.urlsafe_b64decode(ticket_id + "=" * (-len(ticket_id) % 4))
+            if len(sealed) <= _NONCE_BYTES:
+                return None
+            plaintext = self._aesgcm.decrypt(sealed[:_NONCE_BYTES], sealed[_NONCE_BYTES:], None)
+            text, lang, stream, fmt = json.loads(plaintext)
+        except (binascii.Error, InvalidTag, ValueError, TypeError):
+            return None
+        return TTSTicket(text, lang, bool(stream), fmt)
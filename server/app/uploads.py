@@ -0,0 +1,125 @@
+"""
+Training-audio uploads — streamed straight into Supabase Storage.
+Bytes are piped chunk by chunk from the incoming request to the storage
+request, so memory per upload stays at one chunk regardless of file size.
+Size limits and the SHA-256 checksum are enforced/computed on the fly.
+Large recordings can use the resumable (TUS) path, which relays each chunk
+to Supabase's resumable endpoint and tracks the offset per upload, with a
+checksum snapshot at every offset Storage has confirmed so a resync never
+pairs an offset with a hash of different bytes.
+"""
+import hashlib
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, Optional
+
+from fastapi import UploadFile
+
+logger = logging.getLogger("medtranslate.uploads")
+
+CHUNK_SIZE = 64 * 1024
+# Supabase's resumable endpoint requires every non-final chunk to be exactly 6 MB
+TUS_CHUNK_SIZE = 6 * 1024 * 1024
+
+
+class UploadTooLarge(Exception):
+    """Raised mid-stream once an upload passes its byte limit."""
+
+
+async def iter_upload_file(
+    upload: UploadFile, max_bytes: int, digest: "hashlib._Hash", chunk_size: int = CHUNK_SIZE
+) -> AsyncIterator[bytes]:
+    """Yield an UploadFile in chunks, hashing as we go and stopping at max_bytes."""
+    total = 0
+    while True:
+        chunk = await upload.read(chunk_size)
+        if not chunk:
+            break
+        total += len(chunk)
+        if total > max_bytes:
+            raise UploadTooLarge(f"upload exceeds {max_bytes} bytes")
+        digest.update(chunk)
+        yield chunk
+
+
+async def iter_body(
+    chunks: AsyncIterator[bytes], max_bytes: int, digest: "hashlib._Hash"
+) -> AsyncIterator[bytes]:
+    """Same as iter_upload_file for a raw request body stream (e.g. request.stream())."""
+    total = 0
+    async for chunk in chunks:
+        if not chunk:
+            continue
+        total += len(chunk)
+        if total > max_bytes:
+            raise UploadTooLarge(f"chunk exceeds {max_bytes} bytes")
+        digest.update(chunk)
+        yield chunk
+
+
+@dataclass
+class ResumableUpload:
+    upload_id: str
+    location: str  # Supabase TUS upload URL
+    object_path: str
+    lang: str
+    pin: str
+    length: int
+    offset: int = 0
+    digest: "hashlib._Hash" = field(default_factory=hashlib.sha256)
+    created_at: float = field(default_factory=time.monotonic)
+    # Checksum of the first N bytes, for every N Storage has confirmed
+    snapshots: Dict[int, "hashlib._Hash"] = field(default_factory=lambda: {0: hashlib.sha256()})
+
+    @property
+    def complete(self) -> bool:
+        return self.offset >= self.length
+
+    def commit(self, offset: int, digest: "hashlib._Hash"):
+        """Record that Storage holds `offset` bytes, hashing to `digest`."""
+        self.offset = offset
+        self.digest = digest
+        self.snapshots[offset] = digest.copy()
+
+    def rewind(self, offset: int) -> bool:
+        """Resync to an offset reported by Storage. False if no checksum matches it."""
+        snapshot = self.snapshots.get(offset)
+        if snapshot is None:
+            return False
+        self.offset = offset
+        self.digest = snapshot.copy()
+        return True
+
+
+class ResumableUploadRegistry:
+    """In-memory index of resumable uploads in progress. No audio is held here."""
+
+    def __init__(self, max_age_seconds: float = 24 * 3600):
+        self._uploads: Dict[str, ResumableUpload] = {}
+        self._max_age = max_age_seconds
+
+    def add(self, location: str, object_path: str, lang: str, pin: str, length: int) -> ResumableUpload:
+        self._expire()
+        upload = ResumableUpload(
+            upload_id=str(uuid.uuid4()),
+            location=location,
+            object_path=object_path,
+            lang=lang,
+            pin=pin,
+            length=length,
+        )
+        self._uploads[upload.upload_id] = upload
+        return upload
+
+    def get(self, upload_id: str) -> Optional[ResumableUpload]:
+        return self._uploads.get(upload_id)
+
+    def remove(self, upload_id: str):
+        self._uploads.pop(upload_id, None)
+
+    def _expire(self):
+        cutoff = time.monotonic() - self._max_age
+        for upload_id in [u.upload_id for u in self._uploads.values() if u.created_at < cutoff]:
+            del self._uploads[upload_id]
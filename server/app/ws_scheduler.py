@@ -0,0 +1,96 @@
+"""
+Per-connection task scheduler for the /ws translation socket.
+Lets several translate requests run at once so back-to-back utterances
+don't queue behind each other, while responses for the same speaker
+direction are still delivered in the order they were asked for.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from fastapi import WebSocket
+
+from .metrics import WS_IN_FLIGHT, WS_QUEUE_DEPTH
+
+logger = logging.getLogger("medtranslate.ws")
+
+
+class ConnectionScheduler:
+    """Runs translate jobs for one WebSocket with a cap on in-flight upstream calls."""
+
+    def __init__(self, ws: WebSocket, max_in_flight: int = 4):
+        self._ws = ws
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._send_lock = asyncio.Lock()
+        self._tasks: Set[asyncio.Task] = set()
+        # direction ("en-es") -> future resolved once its latest job has delivered
+        self._tails: Dict[str, asyncio.Future] = {}
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._tasks)
+
+    async def send(self, payload: Dict[str, Any]):
+        """Send a JSON frame. Serialised so concurrent jobs never interleave writes."""
+        async with self._send_lock:
+            await self._ws.send_json(payload)
+
+    async def submit(
+        self,
+        direction: str,
+        work: Callable[[], Awaitable[Any]],
+        deliver: Callable[[Any], Awaitable[None]],
+    ):
+        """
+        Start `work` concurrently, then `deliver` its result once every earlier
+        job for the same direction has delivered. Waits for a free slot first,
+        so a client that floods the socket is backpressured instead of NIM.
+        """
+        WS_QUEUE_DEPTH.observe(len(self._tasks))
+        await self._slots.acquire()
+        previous = self._tails.get(direction)
+        done = asyncio.get_running_loop().create_future()
+        self._tails[direction] = done
+
+        task = asyncio.create_task(self._run(direction, work, deliver, previous, done))
+        self._tasks.add(task)
+        WS_IN_FLIGHT.inc()
+        task.add_done_callback(self._finished)
+
+    def _finished(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        WS_IN_FLIGHT.dec()
+
+    async def _run(
+        self,
+        direction: str,
+        work: Callable[[], Awaitable[Any]],
+        deliver: Callable[[Any], Awaitable[None]],
+        previous: Optional[asyncio.Future],
+        done: asyncio.Future,
+    ):
+        try:
+            try:
+                result = await work()
+            finally:
+                self._slots.release()
+            if previous is not None and not previous.done():
+                await asyncio.wait({previous})
+            await deliver(result)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("WebSocket job failed [%s]: %s", direction, e)
+        finally:
+            if not done.done():
+                done.set_result(None)
+            if self._tails.get(direction) is done:
+                del self._tails[direction]
+
+    async def close(self):
+        """Cancel outstanding jobs (e.g. on disconnect) and wait for them to unwind."""
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
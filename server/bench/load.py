@@ -0,0 +1,320 @@
+"""
+Load benchmark for the /ws translation path, /api/tts and training uploads.
+
+Starts the mock upstreams (bench/mock_upstreams.py) in a background thread,
+launches the server as a separate uvicorn process pointed at them, then
+drives it with simulated clients and reports throughput and p50/p95/p99.
+
+  ws      N WebSocket clients each replay an utterance trace (with think time)
+          through /ws; latency = send -> final "translation" frame.
+          --clients takes a list, e.g. 1,8,32,64, to see how tails grow.
+  tts     concurrent streamed POST /api/tts requests; reports time to first byte and total.
+  upload  concurrent POST /api/train uploads of --size-mb each.
+
+Usage (from server/):
+  python -m bench.load ws --clients 1,8,32 --duration 20 --first-token-ms 250 --token-rate 40
+  python -m bench.load tts --concurrency 16 --requests 200
+  python -m bench.load upload --concurrency 8 --uploads 64 --size-mb 2
+  python -m bench.load all
+  python -m bench.load ws --clients 32 --nim-rps 10 --quota-rps 9   (provider quota; 429s vs admission)
+  python -m bench.load ws --target http://127.0.0.1:8000   (existing server; no mocks started)
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+import uvicorn
+import websockets
+
+from bench.mock_upstreams import MockConfig, create_app
+
+# (text, from, to): a provider/patient exchange, replayed in order by each client
+TRACE = [
+    ("Hello, my name is Doctor Smith. I will be taking care of you today.", "en", "es"),
+    ("Hola, gracias. Me duele mucho el estómago.", "es", "en"),
+    ("When did the pain start?", "en", "es"),
+    ("Anoche, después de cenar.", "es", "en"),
+    ("Can you point to where it hurts the most?", "en", "es"),
+    ("Aquí, en el lado derecho, abajo.", "es", "en"),
+    ("Have you had any fever, nausea, or vomiting?", "en", "es"),
+    ("Sí, vomité dos veces esta mañana.", "es", "en"),
+    ("Are you allergic to any medications?", "en", "es"),
+    ("Soy alérgica a la penicilina.", "es", "en"),
+    ("We are going to take a blood sample and do an ultrasound.", "en", "es"),
+    ("Está bien. ¿Cuánto tiempo va a tomar?", "es", "en"),
+    ("About one hour. The nurse will bring you something for the pain.", "en", "es"),
+]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def report(label: str, latencies: List[float], elapsed: float, errors: int, extra: str = ""):
+    ms = [v * 1000 for v in latencies]
+    print(f"{label:<14} n={len(ms):<6} err={errors:<4} {len(ms) / elapsed:>8.1f}/s  "
+          f"p50={percentile(ms, 50):>7.0f}ms p95={percentile(ms, 95):>7.0f}ms "
+          f"p99={percentile(ms, 99):>7.0f}ms max={max(ms, default=0):>7.0f}ms {extra}")
+
+
+# ── Environment ────────────────────────────────────────────────────
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_mocks(config: MockConfig) -> str:
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(create_app(config), host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+
+def start_server(
+    mock_url: str, cache: bool, log_path: str, quota_rps: float = 0.0
+) -> Tuple[subprocess.Popen, str]:
+    port = _free_port()
+    env = {
+        **os.environ,
+        "RIVA_API_URL": f"{mock_url}/v1",
+        "RIVA_API_KEY": "bench",
+        "TRANSLATION_BACKENDS": "",
+        "MODAL_TTS_URL": f"{mock_url}/tts",
+        "LOCAL_TTS_ENABLED": "false",
+        "SUPABASE_URL": mock_url,
+        "SUPABASE_SERVICE_KEY": "bench",
+        "TRANSLATION_CACHE_SIZE": "2048" if cache else "0",
+        "TRANSLATION_CACHE_DIR": "",
+        "TRANSLATION_CACHE_PREWARM_PAIRS": "",
+        "TTS_CACHE_MEMORY_MB": "32" if cache else "0",
+        "TTS_CACHE_DIR": "",
+        "SESSION_BACKEND": "memory",
+        "TRANSLATION_QUOTA_RPS": str(quota_rps),
+    }
+    log = open(log_path, "ab")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning"],
+        env=env,
+        stdout=log,
+        stderr=subprocess.STDOUT,
+    )
+    log.close()  # the child keeps its own handle
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"{url}/health", timeout=1).status_code == 200:
+                return proc, url
+        except httpx.HTTPError:
+            pass
+        if proc.poll() is not None:
+            raise RuntimeError("server exited during startup")
+        time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("server did not become healthy")
+
+
+# ── /ws ────────────────────────────────────────────────────────────
+async def ws_client(url: str, client_id: int, stop_at: float, think_ms: float, stream: bool,
+                    latencies: List[float], first_partial: List[float], counters: Dict[str, int]):
+    session_id = f"bench-{client_id}-{random.getrandbits(32):08x}"
+    async with websockets.connect(url.replace("http", "ws", 1) + "/ws", max_size=None) as ws:
+        await ws.send(json.dumps({"type": "start_session", "session_id": session_id, "from": "en", "to": "es"}))
+        await ws.recv()
+        trace = itertools.cycle(TRACE[client_id % len(TRACE):] + TRACE[:client_id % len(TRACE)])
+        seq = 0
+        while time.perf_counter() < stop_at:
+            text, from_lang, to_lang = next(trace)
+            seq += 1
+            request_id = f"{client_id}-{seq}"
+            t0 = time.perf_counter()
+            await ws.send(json.dumps({
+                "type": "translate", "text": text, "from": from_lang, "to": to_lang,
+                "session_id": session_id, "stream": stream, "request_id": request_id,
+            }))
+            seen_partial = False
+            while True:
+                msg = json.loads(await ws.recv())
+                if msg.get("request_id") != request_id:
+                    continue
+                if msg["type"] == "translation_partial" and not seen_partial:
+                    seen_partial = True
+                    first_partial.append(time.perf_counter() - t0)
+                elif msg["type"] == "translation":
+                    latencies.append(time.perf_counter() - t0)
+                    break
+                elif msg["type"] == "error":
+                    counters["errors"] += 1
+                    break
+            # Think time: the other party listening/speaking before the next utterance
+            if think_ms:
+                await asyncio.sleep(random.expovariate(1000 / think_ms))
+        await ws.send(json.dumps({"type": "end_session", "session_id": session_id}))
+
+
+async def bench_ws(url: str, clients: List[int], duration: float, think_ms: float, stream: bool):
+    print(f"/ws: duration={duration}s per level, think={think_ms}ms, stream={stream}")
+    for n in clients:
+        latencies: List[float] = []
+        first_partial: List[float] = []
+        counters = {"errors": 0}
+        t0 = time.perf_counter()
+        stop_at = t0 + duration
+        results = await asyncio.gather(*(
+            ws_client(url, i, stop_at, think_ms, stream, latencies, first_partial, counters)
+            for i in range(n)
+        ), return_exceptions=True)
+        elapsed = time.perf_counter() - t0
+        failed = sum(isinstance(r, Exception) for r in results)
+        report(f"ws c={n} final", latencies, elapsed,
+               counters["errors"] + failed, f"(client failures={failed})" if failed else "")
+        if first_partial:
+            report(f"ws c={n} first", first_partial, elapsed, 0)
+
+
+# ── /api/tts ───────────────────────────────────────────────────────
+async def bench_tts(url: str, concurrency: int, requests: int, repeat: float):
+    phrases = [text for text, _, to in TRACE if to == "en"] + [text for text, _, _ in TRACE]
+    ttfb: List[float] = []
+    total: List[float] = []
+    errors = 0
+    sem = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=60, limits=limits) as client:
+        async def one(i: int):
+            nonlocal errors
+            # A share of requests repeat earlier phrases (cache hits); the rest are unique
+            text = random.choice(phrases) if random.random() < repeat else f"{random.choice(phrases)} #{i}"
+            async with sem:
+                t0 = time.perf_counter()
+                try:
+                    body = {"text": text, "lang": "es", "stream": True}
+                    async with client.stream("POST", "/api/tts", json=body) as resp:
+                        first = None
+                        async for _ in resp.aiter_bytes():
+                            first = first or time.perf_counter()
+                        if resp.status_code != 200:
+                            errors += 1
+                            return
+                except httpx.HTTPError:
+                    errors += 1
+                    return
+                end = time.perf_counter()
+                ttfb.append((first or end) - t0)
+                total.append(end - t0)
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        elapsed = time.perf_counter() - t0
+    print(f"/api/tts: concurrency={concurrency}, repeat share={repeat:.0%}")
+    report("tts ttfb", ttfb, elapsed, errors)
+    report("tts total", total, elapsed, errors)
+
+
+# ── /api/train ─────────────────────────────────────────────────────
+async def bench_upload(url: str, concurrency: int, uploads: int, size_mb: float):
+    payload = os.urandom(int(size_mb * 1024 * 1024))
+    latencies: List[float] = []
+    errors = 0
+    sem = asyncio.Semaphore(concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=120) as client:
+        async def one():
+            nonlocal errors
+            async with sem:
+                t0 = time.perf_counter()
+                try:
+                    resp = await client.post(
+                        "/api/train",
+                        files={"audio": ("clip.webm", payload, "audio/webm")},
+                        data={"pin": "000000", "lang": "ht", "phrase": "bench"},
+                    )
+                    if resp.status_code != 200:
+                        errors += 1
+                        return
+                except httpx.HTTPError:
+                    errors += 1
+                    return
+                latencies.append(time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(uploads)))
+        elapsed = time.perf_counter() - t0
+    print(f"/api/train: concurrency={concurrency}, size={size_mb}MB")
+    report("upload", latencies, elapsed, errors,
+           f"({uploads * size_mb / elapsed:.1f} MB/s)")
+
+
+async def run(args, url: str):
+    if args.mode in ("ws", "all"):
+        clients = [int(c) for c in args.clients.split(",")]
+        await bench_ws(url, clients, args.duration, args.think_ms, not args.no_stream)
+    if args.mode in ("tts", "all"):
+        await bench_tts(url, args.concurrency, args.requests, args.repeat)
+    if args.mode in ("upload", "all"):
+        await bench_upload(url, args.concurrency, args.uploads, args.size_mb)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("mode", choices=["ws", "tts", "upload", "all"])
+    parser.add_argument("--target", help="benchmark an already running server instead of spawning one")
+    parser.add_argument("--cache", action="store_true", help="leave the translation/TTS caches on")
+    parser.add_argument("--server-log", default=os.devnull, help="where the spawned server's log goes")
+    # /ws
+    parser.add_argument("--clients", default="1,8,32")
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--think-ms", type=float, default=500.0, help="mean pause between utterances")
+    parser.add_argument("--no-stream", action="store_true", help="send translate without stream=true")
+    # /api/tts and /api/train
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--repeat", type=float, default=0.5, help="share of TTS requests that repeat a phrase")
+    parser.add_argument("--uploads", type=int, default=64)
+    parser.add_argument("--size-mb", type=float, default=1.0)
+    # mock upstream latency
+    parser.add_argument("--first-token-ms", type=float, default=250.0)
+    parser.add_argument("--token-rate", type=float, default=40.0)
+    parser.add_argument("--tts-ms", type=float, default=400.0)
+    parser.add_argument("--storage-ms", type=float, default=20.0)
+    parser.add_argument("--nim-rps", type=float, default=0.0, help="mock NIM quota; excess requests get 429")
+    parser.add_argument("--quota-rps", type=float, default=0.0, help="server's TRANSLATION_QUOTA_RPS")
+    args = parser.parse_args(argv)
+
+    if args.target:
+        asyncio.run(run(args, args.target.rstrip("/")))
+        return
+
+    mock_url = start_mocks(MockConfig(
+        first_token_ms=args.first_token_ms,
+        token_rate=args.token_rate,
+        tts_ms=args.tts_ms,
+        storage_ms=args.storage_ms,
+        nim_rps=args.nim_rps,
+    ))
+    proc, url = start_server(mock_url, args.cache, args.server_log, args.quota_rps)
+    try:
+        asyncio.run(run(args, url))
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Mock upstreams for load benchmarks: NVIDIA NIM chat completions, the Modal
+TTS endpoint and Supabase (Storage + PostgREST), in one Starlette app.
+
+Latency is configurable so the server under test sees realistic waits:
+the NIM mock sleeps first_token_ms, then emits one token every
+1/token_rate seconds (SSE when "stream" is set, one JSON body otherwise).
+Translations are deterministic ("[es] <text>"), so results can be checked.
+With nim_rps set, the NIM mock enforces a provider quota: requests beyond
+that many in the last second get 429 with Retry-After.
+"""
+import asyncio
+import json
+import re
+import time
+from collections import deque
+from dataclasses import dataclass
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from app.audio import split_for_tts, wav_header
+
+_TEXT = re.compile(r"to (\w+)[^:]*:\n\n(.*)", re.S)
+
+
+@dataclass
+class MockConfig:
+    first_token_ms: float = 250.0  # NIM time to first token
+    token_rate: float = 40.0  # NIM tokens per second after the first
+    tts_ms: float = 400.0  # Modal TTS latency per sentence
+    tts_seconds_per_char: float = 0.06  # audio length generated per input character
+    storage_ms: float = 20.0  # Supabase per-request latency
+    nim_rps: float = 0.0  # NIM quota (requests per second); 0 = unlimited
+
+
+def _translate(content: str) -> str:
+    match = _TEXT.search(content)
+    if not match:
+        return content
+    to_name, text = match.group(1), match.group(2).strip()
+    if text.startswith("["):  # batched request: JSON array in, JSON array out
+        return json.dumps([f"[{to_name}] {item}" for item in json.loads(text)], ensure_ascii=False)
+    return f"[{to_name}] {text}"
+
+
+async def chat_completions(request: Request):
+    config: MockConfig = request.app.state.config
+    if config.nim_rps:
+        window: deque = request.app.state.nim_window
+        now = time.monotonic()
+        while window and now - window[0] >= 1.0:
+            window.popleft()
+        if len(window) >= config.nim_rps:
+            return JSONResponse({"error": "rate limited"}, status_code=429, headers={"Retry-After": "1"})
+        window.append(now)
+    body = await request.json()
+    output = _translate(body["messages"][-1]["content"])
+    tokens = re.findall(r"\S+\s*", output) or [output]
+
+    if not body.get("stream"):
+        await asyncio.sleep(config.first_token_ms / 1000 + len(tokens) / config.token_rate)
+        return JSONResponse({"choices": [{"message": {"role": "assistant", "content": output}}]})
+
+    async def events():
+        await asyncio.sleep(config.first_token_ms / 1000)
+        for token in tokens:
+            chunk = {"choices": [{"delta": {"content": token}}]}
+            yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+            await asyncio.sleep(1 / config.token_rate)
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+async def tts(request: Request):
+    config: MockConfig = request.app.state.config
+    body = await request.json()
+    sentences = split_for_tts(body.get("text", "")) or [""]
+    rate = 16000
+
+    def pcm(sentence: str) -> bytes:
+        return bytes(2 * int(rate * config.tts_seconds_per_char * max(len(sentence), 1)))
+
+    if body.get("stream"):
+        async def chunks():
+            yield wav_header(rate)
+            for sentence in sentences:
+                await asyncio.sleep(config.tts_ms / 1000)
+                yield pcm(sentence)
+
+        return StreamingResponse(chunks(), media_type="audio/wav")
+
+    await asyncio.sleep(config.tts_ms / 1000 * len(sentences))
+    audio = b"".join(pcm(s) for s in sentences)
+    return Response(wav_header(rate, len(audio)) + audio, media_type="audio/wav")
+
+
+async def storage_upload(request: Request):
+    config: MockConfig = request.app.state.config
+    received = 0
+    async for chunk in request.stream():  # drain without buffering
+        received += len(chunk)
+    await asyncio.sleep(config.storage_ms / 1000)
+    return JSONResponse({"Key": request.path_params["path"], "bytes": received})
+
+
+async def rest(request: Request):
+    config: MockConfig = request.app.state.config
+    await request.body()
+    await asyncio.sleep(config.storage_ms / 1000)
+    if request.method == "GET":
+        return JSONResponse([])
+    return Response(status_code=201 if request.method == "POST" else 204)
+
+
+def create_app(config: MockConfig) -> Starlette:
+    app = Starlette(routes=[
+        Route("/v1/chat/completions", chat_completions, methods=["POST"]),
+        Route("/tts", tts, methods=["POST"]),
+        Route("/storage/v1/object/{path:path}", storage_upload, methods=["POST"]),
+        Route("/rest/v1/{table}", rest, methods=["GET", "POST", "PATCH"]),
+    ])
+    app.state.config = config
+    app.state.nim_window = deque()
+    return app
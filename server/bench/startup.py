@@ -0,0 +1,101 @@
+"""
+Startup benchmark: import time and time-to-first-request of a fresh process.
+
+Each run starts a new interpreter that imports the app, runs its lifespan
+and sends GET /ready through the ASGI transport (no socket, no uvicorn), and
+reports: wall time from spawn to that first response, CPU time spent
+importing, the lifespan's own startup profile (per-phase timings, see
+app/startup.py) and /ready's status. The import breakdown comes from
+`python -X importtime`, summed per top-level package.
+
+With --budget-ms the exit status is 1 when the median time-to-first-request
+exceeds the budget, so a startup regression fails CI like a test would.
+
+Usage (from server/):  python -m bench.startup --runs 5 --budget-ms 1500
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+CHILD = """
+import asyncio, json, time
+t0 = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+import httpx
+
+async def main():
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            status = (await client.get("/ready")).status_code
+        first = time.time()
+        print(json.dumps({
+            "first_response": first,
+            "import_s": imported - t0,
+            "ready_status": status,
+            "startup": app.state.startup.report(),
+        }), flush=True)
+
+asyncio.run(main())
+"""
+
+
+def run_once() -> dict:
+    spawned = time.time()
+    proc = subprocess.run([sys.executable, "-c", CHILD], capture_output=True, text=True, check=True)
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["first_request_s"] = result["first_response"] - spawned
+    return result
+
+
+def import_breakdown(top: int):
+    """Self import time per top-level package for `import app.main`, largest first."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"], capture_output=True, text=True, check=True
+    )
+    per_package = defaultdict(int)
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        per_package[name.split(".")[0]] += int(self_us)
+    total = sum(per_package.values())
+    print(f"\nimport app.main: {total / 1000:.0f} ms total (self time by package)")
+    for name, us in sorted(per_package.items(), key=lambda kv: -kv[1])[:top]:
+        print(f"  {name:<24} {us / 1000:>8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time-to-first-request and import profile of a fresh server")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=12, help="packages to list in the import breakdown")
+    parser.add_argument("--budget-ms", type=float, default=0, help="fail if median time-to-first-request exceeds this")
+    args = parser.parse_args()
+
+    results = [run_once() for _ in range(args.runs)]
+    print(f"{'run':>3} {'first req ms':>13} {'import ms':>10} {'serving ms':>11} {'/ready':>7}")
+    for i, r in enumerate(results, 1):
+        print(f"{i:>3} {r['first_request_s'] * 1000:>13.0f} {r['import_s'] * 1000:>10.0f} "
+              f"{r['startup']['serving_after_seconds'] * 1000:>11.0f} {r['ready_status']:>7}")
+
+    print("\nstartup phases (last run):")
+    for name, phase in results[-1]["startup"]["subsystems"].items():
+        seconds = "-" if phase["seconds"] is None else f"{phase['seconds'] * 1000:.1f} ms"
+        print(f"  {name:<14} {phase['state']:<8} {seconds:>10}{'' if phase['required'] else '  (background)'}")
+
+    import_breakdown(args.top)
+
+    median_ms = statistics.median(r["first_request_s"] for r in results) * 1000
+    print(f"\nmedian time-to-first-request: {median_ms:.0f} ms")
+    if args.budget_ms and median_ms > args.budget_ms:
+        print(f"FAIL: over the {args.budget_ms:.0f} ms budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
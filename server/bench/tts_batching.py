@@ -0,0 +1,66 @@
+"""
+LocalTTS batching benchmark: throughput vs latency on CPU.
+
+For each batch size, synthesizes the same set of phrases in batches of that
+size through LocalTTS.synthesize_batch and reports utterances/s, audio
+seconds generated per wall second, and per-batch latency (the time the last
+caller in a batch waits). Needs torch + transformers.
+
+Usage (from server/):  python -m bench.tts_batching --sizes 1,2,4,8,16 --utterances 32
+"""
+import argparse
+import itertools
+import time
+
+import torch
+
+from app.tts import LocalTTS
+
+PHRASES = [
+    "Bonjou, kijan ou santi ou jodi a?",
+    "Èske ou gen doulè nan pwatrin ou?",
+    "Montre m kote li fè ou mal.",
+    "Depi konbyen tan ou gen lafyèv?",
+    "Èske ou fè alèji ak nenpòt medikaman?",
+    "Nou pral pran san ou pou fè kèk egzamen.",
+    "Respire fon, epi kenbe souf ou.",
+    "Doktè a ap vin wè ou nan kèk minit.",
+]
+
+
+def run(tts: LocalTTS, batch_size: int, utterances: int):
+    texts = list(itertools.islice(itertools.cycle(PHRASES), utterances))
+    latencies = []
+    audio_samples = 0
+    t_start = time.perf_counter()
+    for i in range(0, len(texts), batch_size):
+        t0 = time.perf_counter()
+        waveforms = tts.synthesize_batch(texts[i:i + batch_size])
+        latencies.append(time.perf_counter() - t0)
+        audio_samples += sum(len(w) for w in waveforms)
+    wall = time.perf_counter() - t_start
+    latencies.sort()
+    audio_seconds = audio_samples / tts.sample_rate
+    print(f"{batch_size:>5} {utterances / wall:>9.2f} {audio_seconds / wall:>10.2f} "
+          f"{latencies[len(latencies) // 2] * 1000:>10.0f} {latencies[-1] * 1000:>10.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LocalTTS batch size vs throughput/latency")
+    parser.add_argument("--sizes", default="1,2,4,8,16")
+    parser.add_argument("--utterances", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=0, help="torch intra-op threads (0 = torch default)")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    tts = LocalTTS()
+    tts.load()
+    print(f"torch threads={torch.get_num_threads()}, utterances={args.utterances}")
+    print(f"{'batch':>5} {'utt/s':>9} {'audio s/s':>10} {'p50 ms':>10} {'max ms':>10}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        run(tts, size, args.utterances)
+
+
+if __name__ == "__main__":
+    main()
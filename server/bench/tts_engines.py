@@ -0,0 +1,107 @@
+"""
+TTS engine benchmark: real-time factor of torch vs ONNX vs ONNX int8 on CPU.
+
+Builds each engine from the same VITS model, checks it against eager output
+(noise off: worst length error and waveform SNR), then times single-utterance
+synthesis over a few input lengths. RTF = wall seconds / audio seconds, so
+lower is faster and < 1 is faster than real time. By default the model is a
+small randomly initialized VITS config, so it runs offline; --config mms uses
+the full MMS architecture (still random weights) and --model a real
+checkpoint. Needs torch + transformers, plus onnx + onnxruntime for the
+exported engines.
+
+Usage (from server/):  python -m bench.tts_engines --engines torch,onnx,onnx-int8 --threads 4
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+import torch
+from transformers import VitsConfig, VitsModel
+
+from app.tts_engines import build_engine, parity
+
+SMALL = dict(
+    vocab_size=48,
+    hidden_size=96,
+    num_hidden_layers=3,
+    ffn_dim=384,
+    flow_size=96,
+    spectrogram_bins=257,
+    upsample_initial_channel=256,
+    duration_predictor_filter_channels=128,
+    prior_encoder_num_wavenet_layers=2,
+    posterior_encoder_num_wavenet_layers=4,
+)
+
+
+def load_model(args) -> VitsModel:
+    if args.model:
+        return VitsModel.from_pretrained(args.model).eval()
+    torch.manual_seed(0)
+    config = VitsConfig(**SMALL) if args.config == "small" else VitsConfig()
+    return VitsModel(config).eval()
+
+
+def make_inputs(vocab_size: int, lengths):
+    rng = np.random.default_rng(0)
+    inputs = []
+    for n in lengths:
+        ids = rng.integers(1, vocab_size, size=(1, n), dtype=np.int64)
+        inputs.append((ids, np.ones_like(ids)))
+    return inputs
+
+
+def time_engine(engine, inputs, noise, sample_rate: int, runs: int):
+    for input_ids, mask in inputs:  # warm-up: first ORT run allocates its arenas
+        engine.run(input_ids, mask, *noise)
+    latencies = []
+    audio_samples = 0
+    for _ in range(runs):
+        for input_ids, mask in inputs:
+            t0 = time.perf_counter()
+            _, lengths = engine.run(input_ids, mask, *noise)
+            latencies.append(time.perf_counter() - t0)
+            audio_samples += int(lengths[0])
+    latencies.sort()
+    rtf = sum(latencies) / (audio_samples / sample_rate)
+    return rtf, latencies[len(latencies) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Real-time factor of the LocalTTS inference engines")
+    parser.add_argument("--engines", default="torch,onnx,onnx-int8")
+    parser.add_argument("--config", choices=("small", "mms"), default="small",
+                        help="architecture of the random model (ignored with --model)")
+    parser.add_argument("--model", default="", help="pretrained checkpoint instead of random weights")
+    parser.add_argument("--lengths", default="16,48,96", help="input lengths in tokens")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--threads", type=int, default=0, help="intra-op threads (0 = library default)")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    model = load_model(args)
+    config = model.config
+    noise = (config.noise_scale, config.noise_scale_duration)
+    inputs = make_inputs(config.vocab_size, [int(n) for n in args.lengths.split(",")])
+    reference = build_engine("torch", model)
+
+    print(f"model={args.model or args.config + ' (random)'}, torch threads={torch.get_num_threads()}, "
+          f"lengths={args.lengths}, runs={args.runs}")
+    print(f"{'engine':<10} {'build s':>8} {'RTF':>8} {'x real':>8} {'p50 ms':>8} {'SNR dB':>8} {'len err':>8}")
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for kind in args.engines.split(","):
+            t0 = time.perf_counter()
+            engine = build_engine(kind, model, cache_dir, args.threads)
+            build = time.perf_counter() - t0
+            report = parity(engine, reference, inputs) if kind != "torch" else {"snr_db": float("inf"),
+                                                                                 "length_error": 0.0}
+            rtf, p50 = time_engine(engine, inputs, noise, config.sampling_rate, args.runs)
+            print(f"{kind:<10} {build:>8.1f} {rtf:>8.3f} {1 / rtf:>8.1f} {p50 * 1000:>8.0f} "
+                  f"{report['snr_db']:>8.1f} {report['length_error']:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
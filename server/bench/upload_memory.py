@@ -0,0 +1,78 @@
+"""
+Training-upload memory benchmark.
+
+Fires N concurrent /api/train uploads of SIZE MB at the app in-process and
+reports peak Python heap (tracemalloc) against total bytes uploaded. Supabase
+Storage is replaced by a sink transport that just drains the request body,
+so only the server's own buffering shows up.
+
+Usage (from server/):  python -m bench.upload_memory --uploads 32 --size-mb 8
+"""
+import argparse
+import asyncio
+import os
+import time
+import tracemalloc
+
+import httpx
+
+from app.config import settings
+
+settings.supabase_url = "http://supabase.bench"
+settings.supabase_service_key = "bench"
+settings.translation_cache_prewarm_pairs = ""
+
+from app.main import app  # noqa: E402  (settings must be patched first)
+
+
+class _SinkTransport(httpx.AsyncBaseTransport):
+    """Drains request bodies chunk by chunk (httpx.MockTransport would buffer them)."""
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        received = 0
+        async for chunk in request.stream:
+            received += len(chunk)
+        return httpx.Response(200, json={"Key": request.url.path, "bytes": received})
+
+
+async def main(uploads: int, size_mb: int):
+    payload = os.urandom(size_mb * 1024 * 1024)
+
+    async with app.router.lifespan_context(app):
+        gateway = app.state.supabase
+        gateway._client = httpx.AsyncClient(
+            base_url="http://supabase.bench", transport=_SinkTransport()
+        )
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://medtranslate", timeout=120
+        )
+
+        tracemalloc.start()
+        baseline, _ = tracemalloc.get_traced_memory()
+        t0 = time.perf_counter()
+        responses = await asyncio.gather(*(
+            client.post(
+                "/api/train",
+                files={"audio": ("clip.webm", payload, "audio/webm")},
+                data={"pin": "000000", "lang": "ht"},
+            )
+            for _ in range(uploads)
+        ))
+        elapsed = time.perf_counter() - t0
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        await client.aclose()
+
+    ok = sum(r.status_code == 200 for r in responses)
+    total_mb = uploads * size_mb
+    print(f"uploads={uploads} size={size_mb}MB ok={ok} elapsed={elapsed:.2f}s")
+    # The in-process client shares this heap, so its multipart framing is counted too
+    print(f"uploaded={total_mb}MB  peak heap growth={(peak - baseline) / 2**20:.1f}MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--uploads", type=int, default=32)
+    parser.add_argument("--size-mb", type=int, default=8)
+    args = parser.parse_args()
+    asyncio.run(main(args.uploads, args.size_mb))
@@ -2,73 +2,149 @@
 MedTranslate — Haitian Creole TTS on Modal
 Serverless function running Meta MMS (facebook/mms-tts-hat).
 Scales to zero when idle ($0), wakes in ~1-2s on first request.
+The model is loaded once per container (@modal.enter) and reused by every
+request that container serves.
 
-Deploy:  modal deploy modal_tts.py
+Deploy:  modal deploy modal_tts.py  (from server/, so the shared app/ audio helpers are packaged)
 Test:    modal serve modal_tts.py  (local dev server)
+Bench:   python modal_tts.py --runs 5  (same handler on this CPU, no Modal needed)
 """
-import io
-import modal
-
-app = modal.App("medtranslate-tts")
-
-# Pre-built container image with all dependencies baked in
-tts_image = (
-    modal.Image.debian_slim(python_version="3.11")
-    .pip_install("transformers", "torch", "numpy", "scipy", "fastapi")
-    .run_commands("python -c \"from transformers import VitsModel, AutoTokenizer; VitsModel.from_pretrained('facebook/mms-tts-hat'); AutoTokenizer.from_pretrained('facebook/mms-tts-hat')\"")
-)
-
-
-@app.function(
-    image=tts_image,
-    container_idle_timeout=300,  # Keep warm for 5 min after last request
-    timeout=60,
-)
-@modal.web_endpoint(method="POST")
-def generate_tts(item: dict):
-    """
-    POST JSON: {"text": "Ki jan ou santi ou jodi a?", "lang": "ht"}
-    Returns: WAV audio bytes
-    """
-    import wave
-    import time
-    import numpy as np
-    import torch
-    from transformers import VitsModel, AutoTokenizer
-    from fastapi.responses import Response
-
-    text = item.get("text", "")
-    if not text:
-        return Response(content="Missing text", status_code=400)
-
-    t0 = time.time()
-
-    model = VitsModel.from_pretrained("facebook/mms-tts-hat")
-    tokenizer = AutoTokenizer.from_pretrained("facebook/mms-tts-hat")
-
-    inputs = tokenizer(text, return_tensors="pt")
-    with torch.no_grad():
-        output = model(**inputs).waveform
-
-    waveform = output.squeeze().cpu().numpy()
-    sample_rate = model.config.sampling_rate
-
-    # Convert to 16-bit PCM WAV
-    pcm = (waveform * 32767).astype(np.int16)
-    buf = io.BytesIO()
-    with wave.open(buf, "wb") as wf:
-        wf.setnchannels(1)
-        wf.setsampwidth(2)
-        wf.setframerate(sample_rate)
-        wf.writeframes(pcm.tobytes())
-    buf.seek(0)
-
-    elapsed = time.time() - t0
-    audio_duration = len(waveform) / sample_rate
-    print(f"Generated {audio_duration:.1f}s audio in {elapsed:.1f}s")
-
-    return Response(
-        content=buf.read(),
-        media_type="audio/wav",
-        headers={"Content-Disposition": "inline"},
+import time
+
+try:
+    import modal
+except ImportError:  # local harness only needs torch + transformers
+    modal = None
+
+MODEL_ID = "facebook/mms-tts-hat"
+
+
+class MMSService:
+    """Loads MMS once and synthesizes WAV bytes from text. Modal-agnostic."""
+
+    def load(self):
+        import torch
+        from transformers import VitsModel, AutoTokenizer
+
+        t0 = time.time()
+        self.model = VitsModel.from_pretrained(MODEL_ID).eval()
+        self.tokenizer = AutoTokenizer.from_pretrained(MODEL_ID)
+        self.sample_rate = self.model.config.sampling_rate
+        self._torch = torch
+        print(f"Loaded {MODEL_ID} in {time.time() - t0:.1f}s")
+
+    def waveform(self, text: str):
+        inputs = self.tokenizer(text, return_tensors="pt")
+        with self._torch.inference_mode():
+            return self.model(**inputs).waveform.squeeze().cpu().numpy()
+
+    def synthesize(self, text: str, fmt: str = "wav", target_rate: int = 0) -> bytes:
+        """Returns a complete audio file (WAV unless fmt is "opus" or "mp3")."""
+        from app.audio_encoding import encode
+
+        t0 = time.time()
+        waveform = self.waveform(text)
+        audio = encode(waveform, self.sample_rate, fmt, target_rate)
+
+        elapsed = time.time() - t0
+        audio_duration = len(waveform) / self.sample_rate
+        print(f"Generated {audio_duration:.1f}s audio ({fmt}, {len(audio)} bytes) in {elapsed:.1f}s")
+        return audio
+
+    def synthesize_stream(self, text: str, fmt: str = "wav", target_rate: int = 0):
+        """Yields a streaming WAV (header, then PCM per sentence) or per-sentence MP3 so playback starts early."""
+        from app.audio import split_for_tts
+        from app.audio_encoding import encode_segment, stream_header
+
+        yield stream_header(self.sample_rate, fmt, target_rate)
+        for chunk in split_for_tts(text):
+            yield encode_segment(self.waveform(chunk), self.sample_rate, fmt, target_rate)
+
+    def handle(self, item: dict):
+        """
+        POST JSON: {"text": "Ki jan ou santi ou jodi a?", "lang": "ht", "stream": false,
+                    "format": "wav" | "opus" | "mp3", "sample_rate": 0}
+        Returns: audio bytes (chunked streaming WAV/MP3 when "stream" is true)
+        """
+        from fastapi.responses import Response, StreamingResponse
+        from app.audio import AUDIO_FORMATS, STREAMABLE_FORMATS
+        from app.audio_encoding import available_formats
+
+        text = item.get("text", "")
+        if not text:
+            return Response(content="Missing text", status_code=400)
+        fmt = item.get("format") or "wav"
+        if fmt not in available_formats():
+            return Response(content=f"Unsupported format: {fmt}", status_code=400)
+        target_rate = int(item.get("sample_rate") or 0)
+
+        if item.get("stream"):
+            if fmt not in STREAMABLE_FORMATS:
+                return Response(content=f"Format cannot be streamed: {fmt}", status_code=400)
+            return StreamingResponse(
+                self.synthesize_stream(text, fmt, target_rate),
+                media_type=AUDIO_FORMATS[fmt],
+                headers={"Content-Disposition": "inline"},
+            )
+
+        return Response(
+            content=self.synthesize(text, fmt, target_rate),
+            media_type=AUDIO_FORMATS[fmt],
+            headers={"Content-Disposition": "inline"},
+        )
+
+
+if modal is not None:
+    app = modal.App("medtranslate-tts")
+
+    # Pre-built container image with all dependencies baked in
+    tts_image = (
+        modal.Image.debian_slim(python_version="3.11")
+        .pip_install("transformers", "torch", "numpy", "scipy", "fastapi", "soundfile")
+        .run_commands(f"python -c \"from transformers import VitsModel, AutoTokenizer; VitsModel.from_pretrained('{MODEL_ID}'); AutoTokenizer.from_pretrained('{MODEL_ID}')\"")
+        .add_local_python_source("app")  # shared app/audio.py + app/audio_encoding.py
+    )
+
+    @app.cls(
+        image=tts_image,
+        container_idle_timeout=300,  # Keep warm for 5 min after last request
+        timeout=60,
     )
+    class TTSEndpoint(MMSService):
+        @modal.enter()
+        def load_model(self):
+            self.load()
+
+        # Label keeps the URL of the old function-based endpoint, so MODAL_TTS_URL is unchanged
+        @modal.web_endpoint(method="POST", label="medtranslate-tts-generate-tts")
+        def generate_tts(self, item: dict):
+            return self.handle(item)
+
+
+def _bench(runs: int, text: str):
+    """Cold (load + first call) vs warm latency on the local CPU."""
+    t0 = time.perf_counter()
+    service = MMSService()
+    service.load()
+    service.synthesize(text)
+    cold = time.perf_counter() - t0
+
+    warm = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        service.synthesize(text)
+        warm.append(time.perf_counter() - t0)
+    warm.sort()
+    print(f"cold: {cold * 1000:.0f} ms")
+    print(f"warm: median {warm[len(warm) // 2] * 1000:.0f} ms, "
+          f"min {warm[0] * 1000:.0f} ms, max {warm[-1] * 1000:.0f} ms over {runs} runs")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the MMS TTS handler without Modal")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--text", default="Ki jan ou santi ou jodi a?")
+    args = parser.parse_args()
+    _bench(args.runs, args.text)
@@ -0,0 +1,28 @@
+"""TranslationBatcher: concurrent requests share one upstream call."""
+import asyncio
+import gc
+
+from app.batching import TranslationBatcher
+
+
+def test_concurrent_requests_are_flushed_as_one_batch():
+    calls = []
+
+    async def handler(texts, from_lang, to_lang):
+        calls.append(list(texts))
+        await asyncio.sleep(0.05)
+        gc.collect()  # an unreferenced batch task could be collected here
+        return [text.upper() for text in texts]
+
+    async def run():
+        batcher = TranslationBatcher(handler, max_batch_size=8, max_wait_ms=5)
+        results = await asyncio.wait_for(
+            asyncio.gather(*(batcher.submit(t, "en", "es") for t in ("a", "b", "c"))), 2.0
+        )
+        return batcher, results
+
+    batcher, results = asyncio.run(run())
+    assert results == ["A", "B", "C"]
+    assert calls == [["a", "b", "c"]]
+    assert batcher.stats()["batches_sent"] == 1
+    assert not batcher._tasks  # released once the batch finished
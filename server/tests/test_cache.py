@@ -0,0 +1,60 @@
+"""TranslationCache's encrypted disk tier: the size cap and the expiry sweep."""
+import asyncio
+import base64
+import os
+import time
+
+from app.cache import TranslationCache
+
+KEY = base64.b64encode(b"k" * 32).decode()
+
+
+def _files(tmp_path):
+    return sorted(path.stem for path in tmp_path.glob("*/*.bin"))
+
+
+def test_disk_tier_evicts_oldest_past_its_cap(tmp_path):
+    async def run():
+        cache = TranslationCache(disk_dir=str(tmp_path), encryption_key=KEY, disk_bytes=400)
+        await cache.sweep()
+        keys = []
+        for i in range(6):
+            await cache.put(f"phrase {i}", "en", "es", "m", f"frase {i}")
+            keys.append(cache.make_key(f"phrase {i}", "en", "es", "m"))
+        return cache, keys
+
+    cache, keys = asyncio.run(run())
+    stats = cache.stats()
+    assert stats["disk_bytes"] <= 400 and stats["evicted"] > 0
+    assert _files(tmp_path) == sorted(keys[-stats["disk_entries"]:])  # the newest survive
+
+
+def test_startup_sweep_drops_expired_and_indexes_the_rest(tmp_path):
+    async def write():
+        cache = TranslationCache(disk_dir=str(tmp_path), encryption_key=KEY, ttl_seconds=60)
+        await cache.put("old", "en", "es", "m", "viejo")
+        await cache.put("new", "en", "es", "m", "nuevo")
+        return cache.make_key("old", "en", "es", "m"), cache.make_key("new", "en", "es", "m")
+
+    old, new = asyncio.run(write())
+    stale = time.time() - 120
+    os.utime(next(tmp_path.glob(f"*/{old}.bin")), (stale, stale))
+
+    async def restart():
+        cache = TranslationCache(disk_dir=str(tmp_path), encryption_key=KEY, ttl_seconds=60)
+        swept = await cache.sweep()
+        return cache, swept, await cache.get("new", "en", "es", "m")
+
+    cache, swept, hit = asyncio.run(restart())
+    assert swept == 1
+    assert _files(tmp_path) == [new]
+    assert cache.stats()["disk_entries"] == 1
+    assert hit == "nuevo"
+
+
+def test_without_a_persistent_key_old_entries_are_cleared(tmp_path):
+    asyncio.run(TranslationCache(disk_dir=str(tmp_path)).put("hello", "en", "es", "m", "hola"))
+
+    cache = TranslationCache(disk_dir=str(tmp_path))
+    assert asyncio.run(cache.sweep()) == 1  # unreadable under the new random key
+    assert _files(tmp_path) == []
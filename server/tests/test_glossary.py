@@ -0,0 +1,70 @@
+"""Bundled glossary: ambiguous targets must not be reversed into prompt hints."""
+import pytest
+
+from app.glossary import MedicalGlossary
+
+# Haitian Creole words whose everyday meaning is not the medical one
+AMBIGUOUS_HT = {
+    "san": "without / hundred",
+    "grenn": "seed / grain",
+    "piki": "sting",
+}
+
+
+@pytest.fixture(scope="module")
+def glossary():
+    g = MedicalGlossary()
+    g.load_dir()
+    return g
+
+
+@pytest.mark.parametrize("word", sorted(AMBIGUOUS_HT))
+def test_ambiguous_ht_terms_are_not_reversed(glossary, word):
+    assert glossary.find(f"Li te vini {word} manje", "ht", "en") == []
+
+
+def test_ordinary_sentence_gets_no_hint(glossary):
+    # "He came without eating" — "san" here is not blood
+    assert glossary.prompt_hint(["Li te vini san manje"], "ht", "en") == ""
+
+
+def test_oneway_terms_still_translate_forwards(glossary):
+    assert "- blood = san" in glossary.prompt_hint(["Did you see any blood?"], "en", "ht")
+    assert glossary.lookup("pill", "en", "ht") == "grenn"
+
+
+def test_other_terms_are_reversed(glossary):
+    assert [t.target for t in glossary.find("Mwen gen lafyèv", "ht", "en")] == ["fever"]
+
+
+def _with_custom(rows):
+    g = MedicalGlossary()
+    g.load_dir()
+    g.load_custom_phrases(rows)
+    return g
+
+
+def test_custom_entries_apply_only_to_their_pin():
+    g = _with_custom([{
+        "provider_pin": "1111", "phrase_text": "wound check", "translated_text": "revisión de herida",
+        "from_lang": "en", "to_lang": "es",
+    }])
+    assert g.lookup("Wound check", "en", "es", pin="1111") == "Revisión de herida"
+    assert g.lookup("Wound check", "en", "es", pin="2222") is None
+    assert g.lookup("Wound check", "en", "es") is None
+    assert "wound check" in g.prompt_hint(["Time for the wound check"], "en", "es", pin="1111")
+    assert "wound check" not in g.prompt_hint(["Time for the wound check"], "en", "es", pin="2222")
+    assert g.has_custom("Time for the wound check", "en", "es", "1111")
+    assert not g.has_custom("Time for the wound check", "en", "es", "2222")
+
+
+def test_custom_entries_never_replace_bundled_terms():
+    bundled = _with_custom([]).lookup("blood pressure", "en", "es")
+    g = _with_custom([
+        {"provider_pin": "1111", "phrase_text": "blood pressure", "translated_text": "wrong",
+         "from_lang": "en", "to_lang": "es"},
+        {"phrase_text": "no pin", "translated_text": "sin pin", "from_lang": "en", "to_lang": "es"},
+    ])
+    assert bundled is not None
+    assert g.lookup("blood pressure", "en", "es", pin="1111") == bundled
+    assert g.stats()["custom_terms"] == 0
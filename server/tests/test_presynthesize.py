@@ -0,0 +1,40 @@
+"""POST /api/tts/presynthesize: admin only, and one run per language at a time."""
+import asyncio
+
+from fastapi.testclient import TestClient
+
+import app.main as main
+from app.config import settings
+from app.main import app
+
+
+def test_presynthesis_needs_the_admin_token(monkeypatch):
+    monkeypatch.setattr(settings, "admin_token", "")
+    with TestClient(app) as client:
+        assert client.post("/api/tts/presynthesize", headers={"X-Admin-Token": ""}).status_code == 403
+
+    monkeypatch.setattr(settings, "admin_token", "s3cret")
+    with TestClient(app) as client:
+        assert client.post("/api/tts/presynthesize").status_code == 403
+        assert client.post("/api/tts/presynthesize", headers={"X-Admin-Token": "wrong"}).status_code == 403
+
+
+def test_repeated_calls_share_one_run(monkeypatch):
+    runs = []
+
+    async def slow_run(lang):
+        runs.append(lang)
+        await asyncio.sleep(0.2)
+        return 0
+
+    monkeypatch.setattr(settings, "admin_token", "s3cret")
+    monkeypatch.setattr(main, "_presynthesize_phrase_library", slow_run)
+    headers = {"X-Admin-Token": "s3cret"}
+    with TestClient(app) as client:
+        first = client.post("/api/tts/presynthesize", headers=headers).json()
+        second = client.post("/api/tts/presynthesize", headers=headers).json()
+        other = client.post("/api/tts/presynthesize?lang=es", headers=headers).json()
+
+    assert first["status"] == "started" and second["status"] == "running"
+    assert other["status"] == "started"
+    assert runs == ["ht", "es"]
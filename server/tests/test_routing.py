@@ -0,0 +1,212 @@
+"""
+TranslationRouter and the streaming path against a stub OpenAI-compatible
+server on a real local socket. Each backend is a path prefix on the stub
+with its own behaviour: answer, answer slowly, fail, or break mid-stream.
+"""
+import asyncio
+import json
+import select
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from app.admission import UpstreamRateLimited
+from app.routing import ERROR_HALF_LIFE, Backend, TranslationRouter
+from app.translation import TranslationPipeline
+
+
+class StubCompletions(ThreadingHTTPServer):
+    """POST /<behaviour>/chat/completions; records calls and hedges the stub saw abandoned."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.calls = []  # behaviour names, in arrival order
+        self.abandoned = []  # behaviours whose client hung up before the answer
+        self.lock = threading.Lock()
+
+    def backend(self, behaviour: str) -> Backend:
+        return Backend(
+            name=behaviour,
+            url=f"http://127.0.0.1:{self.server_address[1]}/{behaviour}/chat/completions",
+            model=f"model-{behaviour}",
+        )
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        behaviour = self.path.split("/")[1]
+        with self.server.lock:
+            self.server.calls.append(behaviour)
+        if behaviour == "slow" and not self._wait_unless_abandoned(3.0):
+            with self.server.lock:
+                self.server.abandoned.append(behaviour)
+            return
+        if behaviour == "fail":
+            return self._json(500, {"error": "internal"})
+        if behaviour == "limited":
+            return self._json(429, {"error": "rate limited"}, {"Retry-After": "0"})
+        if body.get("stream"):
+            return self._stream(behaviour)
+        self._json(200, {"choices": [{"message": {"content": f"Hola from {behaviour}"}}]})
+
+    def _wait_unless_abandoned(self, seconds: float) -> bool:
+        """Sleep, but return False as soon as the client closes the connection."""
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            readable, _, _ = select.select([self.connection], [], [], 0.02)
+            if readable and self.connection.recv(1, socket.MSG_PEEK) == b"":
+                return False
+        return True
+
+    def _json(self, status, payload, headers=None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _stream(self, behaviour):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for delta in ("Hola, ", "¿cómo está ", "usted?"):
+            self._chunk(f"data: {json.dumps({'choices': [{'delta': {'content': delta}}]})}\n\n")
+            if behaviour == "breaks":
+                time.sleep(0.05)
+                self.connection.shutdown(socket.SHUT_RDWR)  # dies after the first token
+                return
+        self._chunk("data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _chunk(self, text):
+        data = text.encode()
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    server = StubCompletions()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+PAYLOAD = {"messages": [{"role": "user", "content": "Hello"}]}
+
+
+async def _complete(backends, **kwargs):
+    async with httpx.AsyncClient(timeout=10.0) as client:
+        router = TranslationRouter(backends, client, **kwargs)
+        t0 = time.monotonic()
+        content = await router.complete(dict(PAYLOAD))
+        return router, content, time.monotonic() - t0
+
+
+def test_slow_primary_is_hedged_and_the_loser_cancelled(stub):
+    slow, fast = stub.backend("slow"), stub.backend("ok")
+    router, content, elapsed = asyncio.run(
+        _complete([slow, fast], hedge_min_delay_ms=50, hedge_default_delay_ms=100)
+    )
+    time.sleep(0.2)  # let the stub notice the hang-up
+    assert content == "Hola from ok"
+    assert elapsed < 1.0
+    assert router.hedges_sent == 1 and router.secondary_wins == 1
+    assert stub.calls == ["slow", "ok"]
+    assert stub.abandoned == ["slow"]
+    assert slow.ewma_latency >= 0.1 and slow.failures == 0  # slow, not broken
+
+
+def test_no_hedge_while_the_primary_is_within_its_p95(stub):
+    router, content, _ = asyncio.run(
+        _complete([stub.backend("ok"), stub.backend("slow")], hedge_default_delay_ms=1000)
+    )
+    assert content == "Hola from ok"
+    assert router.hedges_sent == 0
+    assert stub.calls == ["ok"]
+
+
+def test_failing_primary_fails_over(stub):
+    failing, good = stub.backend("fail"), stub.backend("ok")
+    router, content, _ = asyncio.run(_complete([failing, good], hedge=False))
+    assert content == "Hola from ok"
+    assert stub.calls == ["fail", "ok"]
+    assert failing.failures == 1 and failing.error_rate > 0
+    assert router.ranked()[0] is good  # the failure demoted it
+
+
+def test_rate_limited_everywhere_raises(stub):
+    async def run():
+        async with httpx.AsyncClient() as client:
+            router = TranslationRouter([stub.backend("limited")], client)
+            with pytest.raises(UpstreamRateLimited):
+                await router.complete(dict(PAYLOAD))
+
+    asyncio.run(run())
+    assert stub.calls == ["limited"]
+
+
+def _pipeline(client, backends):
+    pipeline = TranslationPipeline()
+    pipeline._client = client
+    pipeline.router = TranslationRouter(backends, client)
+    return pipeline
+
+
+async def _stream(backends):
+    partials = []
+
+    async def on_partial(partial):
+        partials.append(partial)
+
+    async with httpx.AsyncClient(timeout=10.0) as client:
+        pipeline = _pipeline(client, backends)
+        translation = await pipeline.translate("Hello, how are you?", "en", "es", on_partial=on_partial)
+    return translation, partials
+
+
+def test_stream_fails_over_before_the_first_token(stub):
+    translation, partials = asyncio.run(_stream([stub.backend("fail"), stub.backend("ok")]))
+    assert translation == "Hola, ¿cómo está usted?"
+    assert partials and partials[-1] == translation
+    assert stub.calls == ["fail", "ok"]
+
+
+def test_stream_does_not_fail_over_after_the_first_token(stub):
+    translation, partials = asyncio.run(_stream([stub.backend("breaks"), stub.backend("ok")]))
+    assert partials  # the caller already saw text from the first backend
+    assert translation is None
+    assert stub.calls == ["breaks"]  # a second backend would contradict what was shown
+
+
+def test_demoted_backend_recovers_once_its_errors_age(monkeypatch):
+    clock = [time.monotonic()]
+    monkeypatch.setattr(time, "monotonic", lambda: clock[0])
+    primary = Backend(name="primary", url="http://primary", model="m", ewma_latency=0.3)
+    secondary = Backend(name="secondary", url="http://secondary", model="m", ewma_latency=0.6)
+    router = TranslationRouter([primary, secondary], client=None)
+    for _ in range(5):
+        primary.record_failure()
+    assert router.ranked()[0] is secondary
+
+    clock[0] += 10 * ERROR_HALF_LIFE  # no traffic to the primary meanwhile
+    assert router.ranked()[0] is primary
+    assert primary.stats()["error_rate"] < 0.01
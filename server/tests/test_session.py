@@ -0,0 +1,55 @@
+"""In-memory SessionManager, and how the /ws handler reports a closed session."""
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from app.hipaa.session import ENDED, SessionManager
+from app.main import app
+
+
+def test_closed_reason_tells_ended_from_timed_out():
+    async def run():
+        sessions = SessionManager(timeout_minutes=1)
+        await sessions.create("ended", "en", "es")
+        await sessions.create("idle", "en", "es")
+        await sessions.end("ended")
+        deadline = sessions._expiry[0][0]
+        await sessions.reap(now=deadline + 1)
+        return (
+            await sessions.touch("ended"),
+            await sessions.closed_reason("ended"),
+            await sessions.touch("idle"),
+            await sessions.closed_reason("idle"),
+            await sessions.closed_reason("never-existed"),
+        )
+
+    ended_touch, ended, idle_touch, idle, unknown = asyncio.run(run())
+    assert not ended_touch and ended == ENDED
+    assert not idle_touch and idle == "idle"
+    assert unknown is None
+
+
+def test_reusing_a_closed_id_clears_its_reason():
+    async def run():
+        sessions = SessionManager()
+        await sessions.create("s1", "en", "es")
+        await sessions.end("s1")
+        await sessions.create("s1", "en", "es")
+        return await sessions.touch("s1"), await sessions.closed_reason("s1")
+
+    assert asyncio.run(run()) == (True, None)
+
+
+def test_translate_after_end_session_reports_ended_not_timed_out():
+    with TestClient(app) as client, client.websocket_connect("/ws") as ws:
+        ws.send_json({"type": "start_session", "session_id": "ws-ended", "from": "en", "to": "es"})
+        assert ws.receive_json()["type"] == "session_started"
+        ws.send_json({"type": "end_session"})
+        assert ws.receive_json()["type"] == "session_ended"
+        ws.send_json({"type": "translate", "text": "Take one pill", "request_id": 7})
+        reply = ws.receive_json()
+
+    assert reply["type"] == "error"
+    assert reply["reason"] == "session_ended"
+    assert reply["message"].startswith("Session ended")
+    assert reply["request_id"] == 7
@@ -0,0 +1,198 @@
+"""
+RedisSessionManager against fakeredis: two managers on one fake server stand
+in for two workers sharing a Redis.
+"""
+import asyncio
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from app.hipaa.session import ENDED  # noqa: E402
+from app.hipaa.session_redis import RedisSessionManager  # noqa: E402
+
+
+class RecordingAudit:
+    def __init__(self):
+        self.events = []
+
+    async def log(self, event_type, session_id, details=None):
+        self.events.append((event_type, session_id, details))
+
+
+def _workers(count=2, audit=None, **kwargs):
+    server = fakeredis.FakeServer()
+    return [
+        RedisSessionManager(
+            "redis://fake",
+            audit=audit,
+            reap_interval=3600,  # tests call reap() directly
+            client=fakeredis.aioredis.FakeRedis(server=server, decode_responses=True),
+            **kwargs,
+        )
+        for _ in range(count)
+    ]
+
+
+async def _started(workers):
+    for worker in workers:
+        await worker.start()
+    return workers
+
+
+async def _stopped(workers):
+    for worker in workers:
+        await worker.shutdown()
+
+
+def test_create_is_shared_and_keeps_start_time():
+    async def run():
+        a, b = await _started(_workers())
+        try:
+            await a.create("s1", "en", "es")
+            created = await a._redis.hget(a._key("s1"), "created")
+            await b.create("s1", "en", "ht")  # second device, other worker
+            return (
+                await b.is_active("s1"),
+                await b._redis.hgetall(b._key("s1")),
+                created,
+                await a.active_count(),
+                a.context("s1") is not None and b.context("s1") is not None,
+            )
+        finally:
+            await _stopped([a, b])
+
+    active, row, created, count, contexts = asyncio.run(run())
+    assert active
+    assert row["created"] == created
+    assert row["to"] == "ht"
+    assert row["connections"] == "2"
+    assert count == 1
+    assert contexts
+
+
+def test_touch_pushes_the_idle_deadline_out():
+    async def run():
+        a, b = await _started(_workers())
+        try:
+            await a.create("s1", "en", "es")
+            before = await a._redis.zscore(a._deadlines, "s1")
+            await asyncio.sleep(0.01)
+            touched = await b.touch("s1")
+            after = await a._redis.zscore(a._deadlines, "s1")
+            return touched, before, after, await b.touch("unknown")
+        finally:
+            await _stopped([a, b])
+
+    touched, before, after, unknown = asyncio.run(run())
+    assert touched
+    assert after > before
+    assert not unknown
+
+
+def test_idle_session_expires_once_across_workers():
+    audit = RecordingAudit()
+
+    async def run():
+        a, b = await _started(_workers(audit=audit, timeout_minutes=1))
+        try:
+            await a.create("s1", "en", "es")
+            await a.create("s2", "en", "es")
+            deadline = await a._redis.zscore(a._deadlines, "s1")
+            expired = await a.reap(now=deadline + 1) + await b.reap(now=deadline + 1)
+            return (
+                expired,
+                await b.is_active("s1"),
+                await b.touch("s1"),
+                await b.closed_reason("s1"),
+                await a.active_count(),
+            )
+        finally:
+            await _stopped([a, b])
+
+    expired, active, touched, reason, count = asyncio.run(run())
+    assert expired == 2
+    assert not active and not touched
+    assert reason == "idle"
+    assert count == 0
+    assert sorted(e[1] for e in audit.events) == ["s1", "s2"]
+    assert all(e[0] == "session_timeout" and e[2]["reason"] == "idle" for e in audit.events)
+
+
+def test_session_lasts_until_the_last_device_releases():
+    async def run():
+        a, b = await _started(_workers())
+        try:
+            await a.create("s1", "en", "es")
+            await b.create("s1", "es", "en")
+            first = await a.release("s1")
+            still_active = await b.is_active("s1")
+            last = await b.release("s1")
+            return first, still_active, last, await a.is_active("s1"), await a.active_count()
+        finally:
+            await _stopped([a, b])
+
+    first, still_active, last, active, count = asyncio.run(run())
+    assert not first and still_active
+    assert last and not active
+    assert count == 0
+
+
+def test_translation_published_on_one_worker_reaches_the_other():
+    async def run():
+        a, b = await _started(_workers())
+        try:
+            await a.create("s1", "en", "es")
+            await b.create("s1", "es", "en")
+            stream = b.subscribe("s1")
+            receive = asyncio.create_task(stream.__anext__())
+            await asyncio.sleep(0.05)  # let the subscriber register
+            await a.publish("s1", {"type": "session_translation", "text": "Hola"})
+            await a.publish("s2", {"type": "session_translation", "text": "other session"})
+            message = await asyncio.wait_for(receive, 2.0)
+            await stream.aclose()
+            return message
+        finally:
+            await _stopped([a, b])
+
+    assert asyncio.run(run()) == {"type": "session_translation", "text": "Hola"}
+
+
+def test_end_on_one_worker_ends_the_session_everywhere():
+    async def run():
+        a, b = await _started(_workers())
+        try:
+            await a.create("s1", "en", "es")
+            await b.create("s1", "es", "en")
+            await a.end("s1")
+            return (
+                await b.is_active("s1"),
+                await b.touch("s1"),
+                await b.closed_reason("s1"),
+                await b.release("s1"),
+                await a.active_count(),
+                a.context("s1"),
+            )
+        finally:
+            await _stopped([a, b])
+
+    active, touched, reason, released, count, context = asyncio.run(run())
+    assert not active and not touched
+    assert reason == ENDED
+    assert not released  # nothing left to end
+    assert count == 0
+    assert context is None
+
+
+def test_reusing_a_closed_id_clears_its_reason():
+    async def run():
+        a, b = await _started(_workers())
+        try:
+            await a.create("s1", "en", "es")
+            await a.end("s1")
+            await b.create("s1", "en", "es")
+            return await a.touch("s1"), await a.closed_reason("s1")
+        finally:
+            await _stopped([a, b])
+
+    assert asyncio.run(run()) == (True, None)
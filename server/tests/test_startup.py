@@ -0,0 +1,39 @@
+"""
+Startup regressions: /ready must come up, and a fresh process must answer
+its first request within the budget (STARTUP_BUDGET_MS, default 3000 ms;
+bench/startup.py gives the breakdown when this fails).
+"""
+import asyncio
+import os
+import statistics
+
+import httpx
+
+from app.main import app
+from bench.startup import run_once
+
+BUDGET_MS = float(os.environ.get("STARTUP_BUDGET_MS", "3000"))
+RUNS = 3
+
+
+def test_ready_once_required_subsystems_start():
+    async def check():
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.get("/ready")
+
+    resp = asyncio.run(check())
+    assert resp.status_code == 200
+    report = resp.json()
+    assert report["ready"] is True
+    assert report["serving_after_seconds"] is not None
+    for name in ("translation", "supabase", "audit", "sessions"):
+        assert report["subsystems"][name]["state"] == "ready", name
+
+
+def test_time_to_first_request_within_budget():
+    results = [run_once() for _ in range(RUNS)]
+    assert all(r["ready_status"] == 200 for r in results)
+    median_ms = statistics.median(r["first_request_s"] for r in results) * 1000
+    assert median_ms <= BUDGET_MS, f"median time-to-first-request {median_ms:.0f} ms > {BUDGET_MS:.0f} ms"
@@ -0,0 +1,97 @@
+"""Single-flight translation: only requests with the same priority and mode share an upstream call."""
+import asyncio
+
+from app.admission import BACKGROUND, LIVE, SPECULATIVE, UpstreamBusy
+from app.translation import TranslationPipeline
+
+
+class FakeUpstream:
+    """Stands in for _translate_uncached: records each call and holds it until released."""
+
+    def __init__(self):
+        self.calls = []
+        self.release = asyncio.Event()
+
+    async def __call__(self, text, from_lang, to_lang, on_partial, context=None, priority=LIVE, pin=None):
+        self.calls.append((priority, on_partial is not None))
+        if on_partial is not None:
+            await on_partial("Tome")
+        await self.release.wait()
+        if priority == SPECULATIVE:
+            raise UpstreamBusy(1.0)  # the speculative call is shed
+        return "Tome una pastilla"
+
+
+def _pipeline():
+    pipeline = TranslationPipeline()
+    pipeline._translate_uncached = FakeUpstream()
+    return pipeline
+
+
+async def _started(*coros):
+    tasks = [asyncio.ensure_future(c) for c in coros]
+    await asyncio.sleep(0)  # let every caller join (or start) its flight
+    return tasks
+
+
+def test_identical_requests_share_one_call():
+    async def run():
+        pipeline = _pipeline()
+        tasks = await _started(*(pipeline.translate("Take one pill", "en", "es") for _ in range(3)))
+        pipeline._translate_uncached.release.set()
+        return await asyncio.gather(*tasks), pipeline._translate_uncached.calls
+
+    results, calls = asyncio.run(run())
+    assert results == ["Tome una pastilla"] * 3
+    assert calls == [(LIVE, False)]
+
+
+def test_live_request_does_not_join_a_background_flight():
+    async def run():
+        pipeline = _pipeline()
+        tasks = await _started(
+            pipeline.translate("Take one pill", "en", "es", priority=BACKGROUND),
+            pipeline.translate("Take one pill", "en", "es"),
+        )
+        pipeline._translate_uncached.release.set()
+        await asyncio.gather(*tasks)
+        return pipeline._translate_uncached.calls
+
+    assert asyncio.run(run()) == [(BACKGROUND, False), (LIVE, False)]
+
+
+def test_live_request_is_not_shed_with_a_speculative_flight():
+    async def run():
+        pipeline = _pipeline()
+        tasks = await _started(
+            pipeline.speculate("Take one pill", "en", "es"),
+            pipeline.translate("Take one pill", "en", "es"),
+        )
+        pipeline._translate_uncached.release.set()
+        return await asyncio.gather(*tasks), pipeline._translate_uncached.calls
+
+    (speculative, live), calls = asyncio.run(run())
+    assert speculative is None  # shed
+    assert live == "Tome una pastilla"
+    assert calls == [(SPECULATIVE, False), (LIVE, False)]
+
+
+def test_streaming_request_gets_partials_next_to_a_plain_flight():
+    partials = []
+
+    async def on_partial(partial):
+        partials.append(partial)
+
+    async def run():
+        pipeline = _pipeline()
+        tasks = await _started(
+            pipeline.translate("Take one pill", "en", "es"),
+            pipeline.translate("Take one pill", "en", "es", on_partial=on_partial),
+        )
+        pipeline._translate_uncached.release.set()
+        return await asyncio.gather(*tasks), pipeline._translate_uncached.calls
+
+    results, calls = asyncio.run(run())
+    assert results == ["Tome una pastilla"] * 2
+    assert calls == [(LIVE, False), (LIVE, True)]
+    assert partials == ["Tome"]
@@ -0,0 +1,72 @@
+"""
+Exported TTS engines against eager output on a tiny randomly initialised VITS,
+so export, int8 quantization and the parity gate run in seconds without the
+MMS download. Skipped unless torch, transformers, onnx and onnxruntime are installed.
+"""
+import pytest
+
+np = pytest.importorskip("numpy")
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+pytest.importorskip("onnx")
+pytest.importorskip("onnxruntime")
+
+from app.config import settings  # noqa: E402
+from app.tts_engines import TorchEngine, build_engine, parity, parity_ok  # noqa: E402
+
+VOCAB = 40
+
+
+@pytest.fixture(scope="module")
+def tiny_vits():
+    torch.manual_seed(0)
+    config = transformers.VitsConfig(
+        vocab_size=VOCAB,
+        hidden_size=32,
+        num_hidden_layers=2,
+        num_attention_heads=2,
+        window_size=4,
+        ffn_dim=64,
+        flow_size=32,
+        spectrogram_bins=33,
+        upsample_initial_channel=32,
+        upsample_rates=[4, 4],
+        upsample_kernel_sizes=[8, 8],
+        resblock_kernel_sizes=[3],
+        resblock_dilation_sizes=[[1, 3]],
+        prior_encoder_num_flows=2,
+        prior_encoder_num_wavenet_layers=2,
+        posterior_encoder_num_wavenet_layers=2,
+        duration_predictor_num_flows=2,
+        duration_predictor_filter_channels=32,
+        depth_separable_num_layers=2,
+        sampling_rate=16000,
+    )
+    return transformers.VitsModel(config).eval()
+
+
+@pytest.fixture(scope="module")
+def inputs():
+    rng = np.random.default_rng(0)
+    shapes = (8, 17, 31)  # different lengths, as the parity phrases have
+    return [
+        (rng.integers(1, VOCAB, size=(1, n)).astype(np.int64), np.ones((1, n), dtype=np.int64))
+        for n in shapes
+    ]
+
+
+@pytest.mark.parametrize("kind", ["onnx", "onnx-int8"])
+def test_exported_engine_passes_parity(tiny_vits, inputs, tmp_path, kind):
+    engine = build_engine(kind, tiny_vits, str(tmp_path), threads=1)
+    report = parity(engine, TorchEngine(tiny_vits), inputs)
+    assert engine.name == kind
+    assert parity_ok(report, settings.local_tts_parity_min_snr_db), report
+
+
+def test_exported_model_is_reused_from_the_cache_dir(tiny_vits, tmp_path):
+    build_engine("onnx", tiny_vits, str(tmp_path), threads=1)
+    exported = {path: path.stat().st_mtime_ns for path in tmp_path.glob("*.onnx")}
+    build_engine("onnx-int8", tiny_vits, str(tmp_path), threads=1)
+    assert len(exported) == 1
+    assert all(path.stat().st_mtime_ns == mtime for path, mtime in exported.items())
+    assert len(list(tmp_path.glob("*-int8.onnx"))) == 1
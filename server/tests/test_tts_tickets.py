@@ -0,0 +1,32 @@
+"""TTS tickets are self-contained: any worker with the shared key opens them, nothing is stored."""
+import base64
+import os
+
+from app.tts_tickets import TTSTickets
+
+KEY = base64.b64encode(os.urandom(32)).decode()
+TEXT = "Bonjou, kijan ou santi ou jodi a?"
+
+
+def test_ticket_opens_on_another_worker_with_the_same_key():
+    ticket = TTSTickets(KEY).issue(TEXT, "ht", True, "wav")
+    opened = TTSTickets(KEY).get(ticket)
+    assert (opened.text, opened.lang, opened.stream, opened.fmt) == (TEXT, "ht", True, "wav")
+
+
+def test_same_request_keeps_one_url():
+    first, restarted = TTSTickets(KEY), TTSTickets(KEY)
+    assert first.issue(TEXT, "ht", False, "wav") == restarted.issue(TEXT, "ht", False, "wav")
+    assert first.issue(TEXT, "ht", False, "wav") != first.issue(TEXT, "ht", True, "wav")
+    assert first.issue(TEXT, "ht", False, "wav") != first.issue(TEXT.lower(), "ht", False, "wav")
+
+
+def test_ticket_hides_the_text_and_rejects_tampering():
+    tickets = TTSTickets(KEY)
+    ticket = tickets.issue(TEXT, "ht", False, "wav")
+    assert "Bonjou" not in ticket and "Bonjou" not in base64.urlsafe_b64decode(ticket + "==").decode("latin-1")
+    tampered = ticket[:-3] + ("A" if ticket[-3] != "A" else "B") + ticket[-2:]
+    assert tickets.get(tampered) is None
+    assert tickets.get("not-a-ticket") is None
+    assert tickets.get("") is None
+    assert TTSTickets(base64.b64encode(os.urandom(32)).decode()).get(ticket) is None
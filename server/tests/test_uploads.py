@@ -0,0 +1,104 @@
+"""Resumable training uploads: offset resyncs, the checksum, and Storage failures."""
+import hashlib
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+
+class FakeStorage:
+    """Stands in for SupabaseGateway's resumable calls; keeps `short` bytes fewer when told to."""
+
+    configured = True
+
+    def __init__(self):
+        self.stored = b""
+        self.short = 0
+        self.offset_error = None
+        self.insert_error = None
+        self.rows = []
+
+    async def resumable_create(self, bucket, path, length, content_type):
+        return "/upload/fake"
+
+    async def resumable_patch(self, location, offset, content):
+        data = b"".join([chunk async for chunk in content])
+        self.stored += data[: len(data) - self.short]
+        return len(self.stored)
+
+    async def resumable_offset(self, location):
+        if self.offset_error:
+            raise self.offset_error
+        return len(self.stored)
+
+    async def insert(self, table, rows, returning=False):
+        if self.insert_error:
+            raise self.insert_error
+        self.rows.append(rows)
+
+    def public_url(self, bucket, path):
+        return f"https://storage/{bucket}/{path}"
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as client:
+        real = app.state.supabase
+        app.state.supabase = FakeStorage()
+        try:
+            yield client
+        finally:
+            app.state.supabase = real
+
+
+def _start(client, length):
+    resp = client.post("/api/train/uploads", data={"length": str(length), "pin": "1234"})
+    assert resp.status_code == 200
+    return resp.json()["upload_id"]
+
+
+def _patch(client, upload_id, offset, data):
+    return client.patch(f"/api/train/uploads/{upload_id}", content=data, headers={"Upload-Offset": str(offset)})
+
+
+def test_complete_upload_returns_the_checksum_and_records_it(client):
+    upload_id = _start(client, 5)
+    resp = _patch(client, upload_id, 0, b"audio")
+    assert resp.status_code == 200
+    assert resp.json()["sha256"] == hashlib.sha256(b"audio").hexdigest()
+    assert len(app.state.supabase.rows) == 1
+
+
+def test_short_write_rewinds_the_checksum_with_the_offset(client):
+    storage = app.state.supabase
+    upload_id = _start(client, 5)
+    storage.short = 5  # Storage kept none of the chunk
+    resp = _patch(client, upload_id, 0, b"audio")
+    assert resp.status_code == 409 and resp.headers["Upload-Offset"] == "0"
+
+    storage.short = 0
+    resp = _patch(client, upload_id, 0, b"audio")
+    assert resp.json()["sha256"] == hashlib.sha256(b"audio").hexdigest()
+
+
+def test_partial_write_refuses_to_resync(client):
+    storage = app.state.supabase
+    upload_id = _start(client, 5)
+    storage.short = 2  # Storage kept 3 of the 5 hashed bytes
+    assert _patch(client, upload_id, 0, b"audio").status_code == 409
+    assert client.head(f"/api/train/uploads/{upload_id}").status_code == 409
+
+
+def test_offset_query_failure_is_a_bad_gateway(client):
+    upload_id = _start(client, 5)
+    app.state.supabase.offset_error = httpx.ConnectError("down")
+    assert client.head(f"/api/train/uploads/{upload_id}").status_code == 502
+
+
+def test_failed_record_still_forgets_the_upload(client):
+    upload_id = _start(client, 5)
+    app.state.supabase.insert_error = httpx.ConnectError("down")
+    assert _patch(client, upload_id, 0, b"audio").status_code == 502
+    assert app.state.uploads.get(upload_id) is None
@@ -0,0 +1,10 @@
+-- Custom phrase translations for the medical glossary.
+-- A custom phrase with a translation is a glossary entry: the server uses it
+-- verbatim when the whole utterance matches and as a fixed term otherwise.
+
+ALTER TABLE public.custom_phrases
+    ADD COLUMN IF NOT EXISTS translated_text TEXT,
+    ADD COLUMN IF NOT EXISTS from_lang TEXT DEFAULT 'en',
+    ADD COLUMN IF NOT EXISTS to_lang TEXT;
+
+-- End Migration